@@ -0,0 +1,132 @@
+import tensorflow as tf
+
+from data_generators import base_go_problem, get_problem_class
+from hparams import get_hparams
+from utils import shard_utils
+
+import multiprocessing
+import argparse
+import time
+import os
+
+COMPRESSION_TYPES = ['', 'GZIP', 'ZLIB']
+
+
+def write_shards(problem, filenames, data_dir, num_shards):
+    """Generates the train shards of the sgf filenames to data_dir with the compression of problem.
+
+    Returns:
+        (int), bytes on disk of the shards
+    """
+    paths = problem.training_filepaths(data_dir, num_shards, shuffled=False)
+    shard_utils.generate_files(problem.generator([("gogod", filenames)]), paths, problem.compression)
+    shard_utils.shuffle_dataset(paths, problem.compression)
+
+    paths = problem.training_filepaths(data_dir, num_shards, shuffled=True)
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def _time_iterator(tensors, count_fn):
+    """Runs tensors until the end of the dataset.
+
+    Returns:
+        (int, float) the sum of count_fn over the results and the seconds
+    """
+    count = 0
+    with tf.Session() as sess:
+        start = time.time()
+        while True:
+            try:
+                count += count_fn(sess.run(tensors))
+            except tf.errors.OutOfRangeError:
+                break
+        return count, time.time() - start
+
+
+def decode_throughput(problem, data_dir, num_threads):
+    """Reads and decodes all train records.
+
+    Returns:
+        (float), decoded examples per second
+    """
+    with tf.Graph().as_default():
+        pattern = problem.filepattern(data_dir, tf.estimator.ModeKeys.TRAIN)
+        dataset = tf.data.TFRecordDataset(shard_utils.data_files(pattern), compression_type=problem.compression,
+                                          buffer_size=8 * 1024 * 1024)
+        dataset = dataset.map(problem.decode_example, num_parallel_calls=num_threads).prefetch(num_threads)
+        example = dataset.make_one_shot_iterator().get_next()
+
+        examples, seconds = _time_iterator(example['game_length'], lambda _: 1)
+
+    return examples / seconds
+
+
+def input_throughput(problem, hparams, data_dir):
+    """Runs the full training input pipeline of problem.input_fn over the train records once.
+
+    Returns:
+        (float), examples per second
+    """
+    with tf.Graph().as_default():
+        dataset = problem.input_fn(tf.estimator.ModeKeys.TRAIN, hparams, data_dir=data_dir, prevent_repeat=True)
+        features = dataset.make_one_shot_iterator().get_next()
+
+        examples, seconds = _time_iterator(features['inputs'], lambda inputs: inputs.shape[0])
+
+    return examples / seconds
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--tmp_dir',
+                    help="Tmp directory containing the unzipped GoGoD sgf files", required=True, type=str)
+parser.add_argument('--out_dir',
+                    help="Directory to write the benchmark records to, one sub directory per codec",
+                    required=True, type=str)
+parser.add_argument('--problem',
+                    help="Problem to use", default="GoProblem19Rnn", type=str)
+parser.add_argument('--hparams',
+                    help="Hyper parameters to use", default="go_hparams_19_rnn", type=str)
+parser.add_argument('--max_files',
+                    help="Number of sgf files to generate records from", default=1000, type=int)
+parser.add_argument('--num_shards',
+                    help="Number of train shards", default=4, type=int)
+parser.add_argument('--num_threads',
+                    help="Number of parallel decode calls", default=multiprocessing.cpu_count(), type=int)
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    tf.logging.set_verbosity(tf.logging.WARN)
+
+    problem_class = get_problem_class(args.problem)
+    hparams_fn = get_hparams(args.hparams)
+    filenames = None
+
+    # Note: the records are read right after writing them, so they are likely in the page cache
+    for compression in COMPRESSION_TYPES:
+        name = compression or "NONE"
+        data_dir = os.path.join(args.out_dir, name.lower())
+        tf.gfile.MakeDirs(data_dir)
+
+        # generate with a problem without get_hparams, which already reads the data files
+        hparams = hparams_fn()
+        problem = problem_class()
+        problem.num_generate_workers = hparams.num_generate_workers
+        problem.generate_chunk_size = hparams.generate_chunk_size
+        problem.legal_moves_encoding = hparams.legal_moves_encoding
+        problem.positions_encoding = hparams.positions_encoding
+        problem.record_format = hparams.record_format
+        problem.compression = compression
+        if filenames is None:
+            filenames = base_go_problem.get_gogod_filenames(args.tmp_dir, problem.board_size)[:args.max_files]
+        size = write_shards(problem, filenames, data_dir, args.num_shards)
+
+        hparams = hparams_fn()
+        hparams.data_dir = data_dir
+        hparams.compression = compression
+        problem = problem_class()
+        hparams = problem.get_hparams(hparams)
+
+        print("{}:".format(name))
+        print("- bytes on disk:               {:.1f} MB".format(size / 2 ** 20))
+        print("- decode examples/s:           {:.1f}".format(decode_throughput(problem, data_dir, args.num_threads)))
+        print("- training input examples/s:   {:.1f}".format(input_throughput(problem, hparams, data_dir)))
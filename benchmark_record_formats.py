@@ -0,0 +1,111 @@
+import tensorflow as tf
+
+from data_generators import base_go_problem, get_problem_class
+from utils import shard_utils
+
+import multiprocessing
+import argparse
+import hashlib
+import time
+import os
+
+# (name, record_format, positions_encoding, legal_moves_encoding) of the benchmarked record formats,
+# the first one is the reference
+RECORD_CONFIGS = [
+    ('positions-raw', 'positions', 'raw', 'raw'),
+    ('positions-packed', 'positions', 'raw', 'packed'),
+    ('positions-exceptions', 'positions', 'raw', 'exceptions'),
+    ('positions-deltas-packed', 'positions', 'deltas', 'packed'),
+    ('positions-packed-packed', 'positions', 'packed', 'packed'),
+    ('moves', 'moves', 'raw', 'raw'),
+]
+
+
+def write_records(problem, filenames, path):
+    """Generates the records of the sgf filenames to path with the record options and compression of problem, the same
+    way GoProblem.generate_split writes its shards, without shuffling the records."""
+    shard_utils.generate_shard(problem.generator([("gogod", filenames)]), path, problem.compression, shuffle=False)
+
+
+def read_records(problem, path, num_threads, epochs):
+    """Reads and decodes the records of path and measures the throughput.
+
+    Returns:
+        dict with the number of games, positions and seconds and the sha1 of the inputs and legal_moves of
+        every game
+    """
+    with tf.Graph().as_default():
+        dataset = tf.data.TFRecordDataset(path, compression_type=problem.compression, buffer_size=8 * 1024 * 1024)
+        dataset = dataset.map(problem.decode_example, num_parallel_calls=num_threads)
+        dataset = dataset.repeat(epochs).prefetch(num_threads)
+        example = dataset.make_one_shot_iterator().get_next()
+
+        stats = {'games': 0, 'positions': 0, 'seconds': 0., 'hashes': []}
+        with tf.Session() as sess:
+            start = time.time()
+            while True:
+                try:
+                    inputs, legal_moves = sess.run([example['inputs'], example['legal_moves']])
+                except tf.errors.OutOfRangeError:
+                    break
+                stats['games'] += 1
+                stats['positions'] += inputs.shape[0]
+                stats['hashes'].append(hashlib.sha1(inputs.tostring() + legal_moves.tostring()).hexdigest())
+            stats['seconds'] = time.time() - start
+
+    return stats
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--tmp_dir',
+                    help="Tmp directory containing the unzipped GoGoD sgf files", required=True, type=str)
+parser.add_argument('--out_dir',
+                    help="Directory to write the benchmark records to", required=True, type=str)
+parser.add_argument('--problem',
+                    help="Problem to use", default="GoProblem19Rnn", type=str)
+parser.add_argument('--max_files',
+                    help="Number of sgf files to generate records from", default=1000, type=int)
+parser.add_argument('--num_threads',
+                    help="Number of parallel decode calls", default=multiprocessing.cpu_count(), type=int)
+parser.add_argument('--replay_workers',
+                    help="Number of processes replaying move list records", default=multiprocessing.cpu_count(),
+                    type=int)
+parser.add_argument('--compression',
+                    help="Compression of the TFRecord files, '', 'GZIP' or 'ZLIB'", default='', type=str)
+parser.add_argument('--epochs',
+                    help="Number of passes over the records", default=1, type=int)
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    tf.logging.set_verbosity(tf.logging.WARN)
+    tf.gfile.MakeDirs(args.out_dir)
+
+    problem = get_problem_class(args.problem)()
+    problem.num_generate_workers = multiprocessing.cpu_count()
+    problem.generate_chunk_size = 16
+    problem.replay_workers = args.replay_workers
+    problem.compression = args.compression
+
+    filenames = base_go_problem.get_gogod_filenames(args.tmp_dir, problem.board_size)[:args.max_files]
+
+    # Note: the records are read right after writing them, so they are likely in the page cache
+    reference = None
+    for name, record_format, positions_encoding, legal_moves_encoding in RECORD_CONFIGS:
+        problem.record_format = record_format
+        problem.positions_encoding = positions_encoding
+        problem.legal_moves_encoding = legal_moves_encoding
+
+        path = os.path.join(args.out_dir, "benchmark-{}.tfrecord".format(name))
+        write_records(problem, filenames, path)
+        size = os.path.getsize(path)
+
+        stats = read_records(problem, path, args.num_threads, args.epochs)
+        if reference is None:
+            reference = stats['hashes']
+
+        print("{}:".format(name))
+        print("- size:       {:.1f} MB, {:.1f} bytes/position"
+              .format(size / 2 ** 20, size * args.epochs / max(stats['positions'], 1)))
+        print("- games/s:    {:.1f}".format(stats['games'] / stats['seconds']))
+        print("- positions/s {:.1f}".format(stats['positions'] / stats['seconds']))
+        print("- identical to {}: {}".format(RECORD_CONFIGS[0][0], stats['hashes'] == reference))
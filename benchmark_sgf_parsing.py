@@ -0,0 +1,96 @@
+from data_generators import base_go_problem
+from utils import sgf_utils
+
+import argparse
+import sys
+import time
+
+
+def compare_sgf_readers(filenames):
+    """Reads every sgf with the fast scanner and with sgfmill, times both and compares the results.
+
+    Args:
+        filenames: list of (str), paths of the sgf files
+    Returns:
+        dict with the number of files, the files accepted by the fast scanner, the files where both readers
+        differ and the seconds spent in every reader
+    """
+    stats = {
+        'files': 0,
+        'fast_path': 0,
+        'fallback': 0,
+        'sgfmill_errors': 0,
+        'fast_seconds': 0.,
+        'sgfmill_seconds': 0.,
+        'mismatches': []
+    }
+
+    for filename in filenames:
+        with open(filename, "rb") as f:
+            sgf_src = f.read()
+        stats['files'] += 1
+
+        start = time.time()
+        fast_game = sgf_utils.scan_sgf(sgf_src)
+        stats['fast_seconds'] += time.time() - start
+
+        start = time.time()
+        try:
+            sgfmill_game = sgf_utils.read_game_sgfmill(sgf_src)
+        except Exception:
+            sgfmill_game = None
+            stats['sgfmill_errors'] += 1
+        stats['sgfmill_seconds'] += time.time() - start
+
+        if fast_game is None:
+            stats['fallback'] += 1
+            continue
+
+        stats['fast_path'] += 1
+        if fast_game != sgfmill_game:
+            stats['mismatches'].append(filename)
+
+    return stats
+
+
+def print_stats(dataset_name, stats):
+    files = max(stats['files'], 1)
+    fast_path = max(stats['fast_path'], 1)
+
+    print("{} sgf files: {}".format(dataset_name, stats['files']))
+    print("- accepted by the fast scanner: {} ({:.2%})".format(stats['fast_path'], stats['fast_path'] / files))
+    print("- sgfmill fallback:             {}".format(stats['fallback']))
+    print("- sgfmill errors:               {}".format(stats['sgfmill_errors']))
+    print("- fast scanner:                 {:.1f} files/s".format(stats['files'] / max(stats['fast_seconds'], 1e-9)))
+    print("- sgfmill:                      {:.1f} files/s".format(stats['files'] / max(stats['sgfmill_seconds'], 1e-9)))
+    print("- mismatches:                   {} ({:.2%} of accepted)"
+          .format(len(stats['mismatches']), len(stats['mismatches']) / fast_path))
+    for filename in stats['mismatches']:
+        print("  - {}".format(filename))
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--tmp_dir',
+                    help="Tmp directory containing the unzipped GoGoD and KGS sgf files", required=True, type=str)
+parser.add_argument('--board_size',
+                    help="Board sizes of the sgf files", default=19, type=int)
+parser.add_argument('--max_files',
+                    help="Only read the first max_files files of every dataset, all if 0", default=0, type=int)
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    datasets = [('GoGoD', base_go_problem.get_gogod_filenames(args.tmp_dir, args.board_size))]
+    if args.board_size == 19:
+        datasets.append(('KGS', base_go_problem.get_kgs_filenames(args.tmp_dir)))
+
+    num_mismatches = 0
+    for name, filenames in datasets:
+        if args.max_files:
+            filenames = filenames[:args.max_files]
+        dataset_stats = compare_sgf_readers(filenames)
+        print_stats(name, dataset_stats)
+        num_mismatches += len(dataset_stats['mismatches'])
+
+    # non-zero exit code if the fast scanner differs from sgfmill on any accepted file
+    sys.exit(1 if num_mismatches else 0)
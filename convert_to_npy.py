@@ -0,0 +1,29 @@
+import tensorflow as tf
+
+from data_generators import get_problem_class
+from hparams import get_hparams
+
+import multiprocessing
+import argparse
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--data_dir',
+                    help="Data directory containing the TFRecord files", required=True, type=str)
+parser.add_argument('--problem',
+                    help="Problem to use", default="GoProblem19Cnn", type=str)
+parser.add_argument('--hparams',
+                    help="Hyper parameters to use", default="go_hparams_19_cnn", type=str)
+parser.add_argument('--num_threads',
+                    help="Number of parallel decode calls", default=multiprocessing.cpu_count(), type=int)
+
+if __name__ == '__main__':
+    """Converts the existing TFRecord files of a problem to the numpy game stores of the 'npy' data backend."""
+    args = parser.parse_args()
+    tf.logging.set_verbosity(tf.logging.INFO)
+
+    # set up the problem without get_hparams, which already reads the dataset stats
+    hparams = get_hparams(args.hparams)()
+    problem = get_problem_class(args.problem)()
+    problem.read_hparams(hparams)
+
+    problem.convert_to_npy(args.data_dir, args.num_threads)
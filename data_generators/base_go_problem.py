@@ -1,4 +1,14 @@
 import tensorflow as tf
+import numpy as np
+
+import multiprocessing
+import collections
+import itertools
+import traceback
+import threading
+import atexit
+import copy
+import queue as queue_module
 import zipfile
 import tarfile
 import random
@@ -6,22 +16,37 @@ import math
 import os
 import re
 
-from tensor2tensor.data_generators import generator_utils
-from tensor2tensor.data_generators import problem
+from tensor2tensor.data_generators import generator_utils, problem
 from tensor2tensor.utils import data_reader
 
+from data_generators import go_preprocessing
 from hparams.go_hparams_cnn import base_go_hparams_cnn
-from utils import data_utils, sgf_utils
+from utils import archive_utils, cache_utils, data_utils, index_utils, manifest_utils, npy_utils, quarantine_utils, \
+    record_utils, sampler_utils, shard_utils, sgf_utils
 
 _GOGOD_ZIP_NAME = 'GoGoDSpring2018.zip'
 _GOGOD_FILENAMES_GLOB = '/*.sgf'
 _GOGOD_PREFIX = 'GoGoD/Database/'
 _GOGOD_FOLDER = 'GoGoD/'
+_GOGOD_ARCHIVE_PREFIX = 'Database/'
 
 _KGS_ZIP_NAMES_GLOB = 'KGS*.tar.gz'
 _KGS_FILENAMES_GLOB = '*/*.sgf'
 _KGS_FOLDER = 'KGS/'
 
+_GAME_CACHE_FOLDER = 'game_cache/'
+_NPY_FOLDER = 'npy/'
+
+# backends the datasets are read from
+# * tfrecord: the TFRecord files
+# * npy: memory mapped numpy stores of the decoded games, converted from the TFRecord files, see npy_utils
+DATA_BACKENDS = ['tfrecord', 'npy']
+
+# (num_workers, multiprocessing.Pool) replaying the games of move list records, one per process
+_REPLAY_POOL = None
+# guards _REPLAY_POOL, tf.data calls the tf.py_func replaying the games from several threads
+_REPLAY_POOL_LOCK = threading.Lock()
+
 
 def _unzip(tmp_dir, out_dir, filename, extracted=None, remove=False):
     path = os.path.join(tmp_dir, filename)
@@ -72,7 +97,7 @@ def maybe_unzip_kgs(tmp_dir):
         _unzip(tmp_dir, out_dir, file, extracted)
 
 
-def get_gogod_filenames(tmp_dir, board_size):
+def get_gogod_filenames(tmp_dir, board_size, skip_quarantined=True):
     """Find all GoGoD sgf filenames.
 
     Searches at tmp_dir/GoGoD/Database/board_size_path/*.sgf
@@ -81,6 +106,7 @@ def get_gogod_filenames(tmp_dir, board_size):
     Args:
         tmp_dir: (str), directory containing the unzipped files
         board_size: (int), board size of the go game
+        skip_quarantined: (bool), skips the files in the quarantine manifest of tmp_dir, see quarantine_utils
     Returns:
         list of (str), gogod filenames
     """
@@ -102,16 +128,20 @@ def get_gogod_filenames(tmp_dir, board_size):
 
     filenames.sort()
 
+    if skip_quarantined:
+        filenames = quarantine_utils.remove_quarantined(tmp_dir, filenames)
+
     return filenames
 
 
-def get_kgs_filenames(tmp_dir):
+def get_kgs_filenames(tmp_dir, skip_quarantined=True):
     """Find all KGS sgf filenames.
 
     Searches at tmp_dir/KGS/*/*.sgf
 
     Args:
         tmp_dir: (str), temporary directory
+        skip_quarantined: (bool), skips the files in the quarantine manifest of tmp_dir, see quarantine_utils
     Returns:
         list of (str), kgs filenames
     """
@@ -119,6 +149,71 @@ def get_kgs_filenames(tmp_dir):
     filenames = tf.gfile.Glob(filepath + _KGS_FILENAMES_GLOB)
     filenames.sort()
 
+    if skip_quarantined:
+        filenames = quarantine_utils.remove_quarantined(tmp_dir, filenames)
+
+    return filenames
+
+
+def get_gogod_archive_filenames(tmp_dir, board_size, skip_quarantined=True):
+    """Find all GoGoD sgf filenames inside the GoGoD zip without extracting it.
+
+    Selects the same files as get_gogod_filenames, as archive member paths (see archive_utils) in the same order.
+
+    Args:
+        tmp_dir: (str), directory containing the GoGoD zip
+        board_size: (int), board size of the go game
+        skip_quarantined: (bool), skips the files in the quarantine manifest of tmp_dir, see quarantine_utils
+    Returns:
+        list of (str), gogod filenames
+    """
+    assert board_size in [9, 13, 15, 19, 21]
+
+    archive_path = os.path.join(tmp_dir, _GOGOD_ZIP_NAME)
+
+    filenames = []
+    for member in archive_utils.list_members(archive_path):
+        if not member.startswith(_GOGOD_ARCHIVE_PREFIX):
+            continue
+        parts = member[len(_GOGOD_ARCHIVE_PREFIX):].split('/')
+
+        if board_size == 19:
+            is_valid = len(parts) == 2 and not parts[0].startswith('Non')
+        else:
+            is_valid = len(parts) == 3 and parts[0] == "Non19x19Boards" and parts[1].startswith(str(board_size))
+
+        if is_valid:
+            filenames.append(archive_utils.member_path(archive_path, member))
+
+    if skip_quarantined:
+        filenames = quarantine_utils.remove_quarantined(tmp_dir, filenames)
+
+    return filenames
+
+
+def get_kgs_archive_filenames(tmp_dir, skip_quarantined=True):
+    """Find all KGS sgf filenames inside the KGS tar.gz archives without extracting them.
+
+    Selects the same files as get_kgs_filenames, as archive member paths (see archive_utils) in the same order.
+
+    Args:
+        tmp_dir: (str), directory containing the KGS archives
+        skip_quarantined: (bool), skips the files in the quarantine manifest of tmp_dir, see quarantine_utils
+    Returns:
+        list of (str), kgs filenames
+    """
+    filenames = []
+    for archive_path in tf.gfile.Glob(tmp_dir + _KGS_ZIP_NAMES_GLOB):
+        for member in archive_utils.list_members(archive_path):
+            if len(member.split('/')) == 2:
+                filenames.append(archive_utils.member_path(archive_path, member))
+
+    # sort by member name, which matches the order of the extracted filenames
+    filenames.sort(key=lambda filename: archive_utils.split_archive_path(filename)[1])
+
+    if skip_quarantined:
+        filenames = quarantine_utils.remove_quarantined(tmp_dir, filenames)
+
     return filenames
 
 
@@ -149,17 +244,186 @@ def split_dataset(filenames, split_fractions):
     return train_split, dev_split, test_split
 
 
+def split_dataset_by_hash(filenames, split_fractions, dataset_name):
+    """Split dataset into train, dev and test by the hash of the game key of every file, see manifest_utils.
+
+    Unlike split_dataset the split of a file doesn't depend on the other files, so adding files never moves
+    files to another split.
+
+    Args:
+        filenames: (str), paths to split
+        split_fractions: dict<DatasetSplit, fraction>,
+        dataset_name: (str), either 'gogod' or 'kgs'
+    Return:
+        paths split into train, dev and test according to split fractions, in the original order
+    """
+    fractions = {
+        "train": split_fractions[problem.DatasetSplit.TRAIN],
+        "dev": split_fractions[problem.DatasetSplit.EVAL],
+        "test": split_fractions[problem.DatasetSplit.TEST]
+    }
+
+    splits = {split: [] for split in manifest_utils.SPLITS}
+    for filename in filenames:
+        key = manifest_utils.game_key(dataset_name, filename)
+        splits[manifest_utils.hash_split(key, fractions)].append(filename)
+
+    return splits["train"], splits["dev"], splits["test"]
+
+
+def _parse_sgf_task(task):
+    """Parses one (dataset_name, filename, sgf_src, board_size, cache_dir, record_options) task, used by the
+    serial and the process pool generator.
+
+    Returns:
+        (str, str, dict) dataset name, filename and game dict or None, see sgf_utils.parse_sgf
+    """
+    dataset_name, filename, sgf_src, board_size, cache_dir, record_options = task
+
+    game = cache_utils.replay_sgf_cached(filename, board_size, sgf_src, cache_dir, record_options['aux_planes'])
+    if game is None:
+        return dataset_name, filename, None
+
+    return dataset_name, filename, sgf_utils.game_to_features(game, dataset_name, **record_options)
+
+
+def _sgf_tasks(datasets, board_size, cache_dir, quarantined, record_options):
+    """Creates the parse tasks of the generator.
+
+    Archive members are read here, so that only the main process opens the archives, see archive_utils.read_members.
+    Quarantined files are skipped before they are read.
+    """
+    for dataset_name, filenames in datasets:
+        if quarantined:
+            filenames = [file for file in filenames if not quarantine_utils.is_quarantined(file, quarantined)]
+        for file, sgf_src in archive_utils.read_members(filenames):
+            yield dataset_name, file, sgf_src, board_size, cache_dir, record_options
+
+
+def _generate_shard_task(task):
+    """Generates one shard from its (datasets, path, board_size, cache_dir, quarantined, record_options, compression,
+    shuffle) task in a shard worker process, see GoProblem.generate_split.
+
+    Returns:
+        (str, list) path of the shard and dataset_name, filename tuples of its games
+    """
+    datasets, path, board_size, cache_dir, quarantined, record_options, compression, shuffle = task
+
+    generated = []
+
+    def _games():
+        for dataset_name, filename, data in map(_parse_sgf_task, _sgf_tasks(datasets, board_size, cache_dir,
+                                                                            quarantined, record_options)):
+            if data is not None:
+                generated.append((dataset_name, filename))
+                yield data
+
+    shard_utils.generate_shard(_games(), path, compression, shuffle)
+    return path, generated
+
+
+def _split_budgets(num_workers, sizes):
+    """Divides num_workers processes between the splits by their sizes, every split gets at least one process.
+
+    Args:
+        num_workers: (int), number of processes
+        sizes: dict<str, int> split -> size
+    Returns:
+        dict<str, int> split -> number of processes
+    """
+    largest = max(sizes, key=sizes.get)
+    total = max(1, sum(sizes.values()))
+    budgets = {split: max(1, int(round(num_workers * size / total)))
+               for split, size in sizes.items() if split != largest}
+    budgets[largest] = max(1, num_workers - sum(budgets.values()))
+    return budgets
+
+
+def _generate_split_process(go_problem, queue, num_generate_workers, shard_workers, kwargs):
+    """Generates a split in a process of GoProblem.generate_splits with its share of the worker processes.
+
+    Sends ('start', split, number of shards), ('shard', split, shard filename, shard) for every shard and
+    ('done', split, number of generated shards) or ('error', split, traceback) to queue.
+    """
+    split = kwargs['split']
+    try:
+        go_problem.num_generate_workers = num_generate_workers
+        go_problem.shard_workers = shard_workers
+        num_generated = go_problem.generate_split(shard_queue=queue, **kwargs)
+        queue.put(('done', split, num_generated))
+    except Exception:
+        queue.put(('error', split, traceback.format_exc()))
+
+
+def _replay_pool(num_workers):
+    """Returns the process pool of num_workers processes replaying move list records, one per process.
+
+    The pool is created on the first call and terminated at exit. Its processes are spawned instead of forked,
+    because forking a process running a tf session is not safe.
+    """
+    global _REPLAY_POOL
+
+    with _REPLAY_POOL_LOCK:
+        if _REPLAY_POOL is None or _REPLAY_POOL[0] != num_workers:
+            if _REPLAY_POOL is None:
+                atexit.register(_close_replay_pool)
+            else:
+                _REPLAY_POOL[1].terminate()
+            _REPLAY_POOL = (num_workers, multiprocessing.get_context('spawn').Pool(num_workers))
+
+        return _REPLAY_POOL[1]
+
+
+def _close_replay_pool():
+    global _REPLAY_POOL
+
+    with _REPLAY_POOL_LOCK:
+        if _REPLAY_POOL is not None:
+            _REPLAY_POOL[1].terminate()
+            _REPLAY_POOL = None
+
+
+def _replay_move_list(setup, p_targets, to_play, board_size, num_workers):
+    """Replays a move list record in a tf.py_func, in the process pool of _replay_pool if num_workers > 1."""
+    if num_workers <= 1:
+        return sgf_utils.replay_move_list(setup, p_targets, to_play, board_size)
+
+    return _replay_pool(num_workers).apply(sgf_utils.replay_move_list, (setup, p_targets, to_play, board_size))
+
+
 class GoProblem(problem.Problem):
     """Abstract Go Problem."""
+    def __init__(self, was_reversed=False, was_copy=False):
+        super(GoProblem, self).__init__(was_reversed, was_copy)
+        # filename -> game hash of the selected sgf files, see select_filenames
+        self._game_hashes = {}
+        # True while a generation task runs, the tasks only read tmp_dir, see prepare_data
+        self._read_only_tmp_dir = False
+        # the data files are uncompressed until get_hparams reads the compression
+        self._compression = ''
+        # the records have no auxiliary feature planes until get_hparams reads aux_planes
+        self._aux_planes = False
+        # the problem has default_train_shards train files until get_hparams reads train_shards
+        self._train_shards = 0
+
     @property
     def board_size(self):
         """Board Size of the Go games (int)."""
         raise NotImplementedError
 
+    @property
+    def default_train_shards(self):
+        """Number of train tf_records files if the hparams don't set train_shards (int)."""
+        raise NotImplementedError
+
     @property
     def train_shards(self):
         """Number of train tf_records files (int)."""
-        raise NotImplementedError
+        return self._train_shards or self.default_train_shards
+
+    @train_shards.setter
+    def train_shards(self, train_shards):
+        self._train_shards = train_shards
 
     @property
     def is_small(self):
@@ -222,47 +486,413 @@ class GoProblem(problem.Problem):
     def sort_sequence_by_color(self, sort_sequence_by_color):
         self._sort_sequence_by_color = sort_sequence_by_color
 
-    def generator(self, datasets):
+    @property
+    def num_generate_workers(self):
+        """Number of processes parsing sgf files during data generation, serial if <= 1 (int)."""
+        return self._num_generate_workers
+
+    @num_generate_workers.setter
+    def num_generate_workers(self, num_generate_workers):
+        self._num_generate_workers = num_generate_workers
+
+    @property
+    def generate_chunk_size(self):
+        """Number of sgf files sent to a parsing process at once (int)."""
+        return self._generate_chunk_size
+
+    @generate_chunk_size.setter
+    def generate_chunk_size(self, generate_chunk_size):
+        self._generate_chunk_size = max(1, generate_chunk_size)
+
+    @property
+    def use_game_cache(self):
+        """True to cache the replayed games by sgf content in tmp_dir/game_cache, see cache_utils (bool)."""
+        return self._use_game_cache
+
+    @use_game_cache.setter
+    def use_game_cache(self, use_game_cache):
+        self._use_game_cache = use_game_cache
+
+    @property
+    def sgf_filter(self):
+        """Filter expression over the columns of the sgf index selecting the files to generate, see index_utils (str).
+
+        All files are used if it is empty.
+        """
+        return self._sgf_filter
+
+    @sgf_filter.setter
+    def sgf_filter(self, sgf_filter):
+        self._sgf_filter = sgf_filter
+
+    @property
+    def remove_duplicates(self):
+        """True to remove duplicate games, including rotated or mirrored copies, by their game hash (bool)."""
+        return self._remove_duplicates
+
+    @remove_duplicates.setter
+    def remove_duplicates(self, remove_duplicates):
+        self._remove_duplicates = remove_duplicates
+
+    @property
+    def legal_moves_encoding(self):
+        """Record encoding of the generated legal_moves, see record_utils.LEGAL_MOVES_ENCODINGS (str)."""
+        return self._legal_moves_encoding
+
+    @legal_moves_encoding.setter
+    def legal_moves_encoding(self, legal_moves_encoding):
+        if legal_moves_encoding not in record_utils.LEGAL_MOVES_ENCODINGS:
+            raise ValueError("Unknown legal_moves encoding '{}'".format(legal_moves_encoding))
+        self._legal_moves_encoding = legal_moves_encoding
+
+    @property
+    def positions_encoding(self):
+        """Record encoding of the generated positions, see record_utils.POSITIONS_ENCODINGS (str)."""
+        return self._positions_encoding
+
+    @positions_encoding.setter
+    def positions_encoding(self, positions_encoding):
+        if positions_encoding not in record_utils.POSITIONS_ENCODINGS:
+            raise ValueError("Unknown positions encoding '{}'".format(positions_encoding))
+        self._positions_encoding = positions_encoding
+
+    @property
+    def record_format(self):
+        """Format of the generated records, see record_utils.RECORD_FORMATS (str)."""
+        return self._record_format
+
+    @record_format.setter
+    def record_format(self, record_format):
+        if record_format not in record_utils.RECORD_FORMATS:
+            raise ValueError("Unknown record format '{}'".format(record_format))
+        self._record_format = record_format
+
+    @property
+    def replay_workers(self):
+        """Number of processes replaying move list records in the input pipeline, replays in the
+        tf.py_func threads if <= 1 (int)."""
+        return self._replay_workers
+
+    @replay_workers.setter
+    def replay_workers(self, replay_workers):
+        self._replay_workers = replay_workers
+
+    @property
+    def record_options(self):
+        """Keyword arguments of sgf_utils.game_to_features selecting the record encodings (dict)."""
+        return {
+            'legal_moves_encoding': self.legal_moves_encoding,
+            'positions_encoding': self.positions_encoding,
+            'record_format': self.record_format,
+            'aux_planes': self.aux_planes,
+        }
+
+    @property
+    def aux_planes(self):
+        """True to store the auxiliary feature planes of every position in the generated records, see
+        record_utils.AUX_PLANES (bool)."""
+        return self._aux_planes
+
+    @aux_planes.setter
+    def aux_planes(self, aux_planes):
+        self._aux_planes = aux_planes
+
+    @property
+    def use_aux_planes(self):
+        """True to append the stored auxiliary feature planes to the inputs in preprocess_example, the records
+        must be generated with aux_planes (bool)."""
+        return self._use_aux_planes
+
+    @use_aux_planes.setter
+    def use_aux_planes(self, use_aux_planes):
+        self._use_aux_planes = use_aux_planes
+
+    @property
+    def compression(self):
+        """Compression type of the TFRecord files, '', 'GZIP' or 'ZLIB' (str)."""
+        return self._compression
+
+    @compression.setter
+    def compression(self, compression):
+        if compression not in shard_utils.COMPRESSION_TYPES:
+            raise ValueError("Unknown compression type '{}'".format(compression))
+        self._compression = compression
+
+    def tfrecord_options(self):
+        """TFRecordOptions to read and write the TFRecord files of this problem."""
+        return shard_utils.record_options(self.compression)
+
+    def dataset_filename(self):
+        """Name of the TFRecord files, compressed files have the lower case compression type as suffix."""
+        if self.compression:
+            return "{}_{}".format(self.name, self.compression.lower())
+        return self.name
+
+    @property
+    def extract_archives(self):
+        """True to extract the GoGoD and KGS archives to tmp_dir, else reads sgf files straight from them (bool)."""
+        return self._extract_archives
+
+    @extract_archives.setter
+    def extract_archives(self, extract_archives):
+        self._extract_archives = extract_archives
+
+    @property
+    def split_by_hash(self):
+        """True to assign every sgf file to a split by the hash of its game key instead of shuffling all files,
+        see split_dataset_by_hash (bool)."""
+        return self._split_by_hash
+
+    @split_by_hash.setter
+    def split_by_hash(self, split_by_hash):
+        self._split_by_hash = split_by_hash
+
+    @property
+    def append_data(self):
+        """True to only generate the sgf files that are not in the manifest of the existing dataset yet and write
+        them to new shards, see generate_data (bool)."""
+        return self._append_data
+
+    @append_data.setter
+    def append_data(self, append_data):
+        self._append_data = append_data
+
+    @property
+    def shard_workers(self):
+        """Number of processes generating whole shards in parallel, see generate_split (int)."""
+        return self._shard_workers
+
+    @shard_workers.setter
+    def shard_workers(self, shard_workers):
+        self._shard_workers = shard_workers
+
+    @property
+    def shuffle_memory_mb(self):
+        """Memory budget in MB of shuffling the records across all shards of a split, 0 to only shuffle the records
+        of every shard in memory, see shuffle_split (int)."""
+        return self._shuffle_memory_mb
+
+    @shuffle_memory_mb.setter
+    def shuffle_memory_mb(self, shuffle_memory_mb):
+        self._shuffle_memory_mb = shuffle_memory_mb
+
+    @property
+    def parallel_splits(self):
+        """True to generate the train, dev and test splits at the same time in separate processes, see
+        generate_splits (bool)."""
+        return self._parallel_splits
+
+    @parallel_splits.setter
+    def parallel_splits(self, parallel_splits):
+        self._parallel_splits = parallel_splits
+
+    @property
+    def sample_positions(self):
+        """True to train CNNs on single positions drawn uniformly from all positions of the train shards instead of
+        splitting whole games into positions, see position_dataset (bool)."""
+        return self._sample_positions
+
+    @sample_positions.setter
+    def sample_positions(self, sample_positions):
+        self._sample_positions = sample_positions
+
+    @property
+    def sample_threads(self):
+        """Number of threads reading the records of the sampled positions (int)."""
+        return self._sample_threads
+
+    @sample_threads.setter
+    def sample_threads(self, sample_threads):
+        self._sample_threads = sample_threads
+
+    @property
+    def data_backend(self):
+        """Backend the datasets are read from, see DATA_BACKENDS (str)."""
+        return self._data_backend
+
+    @data_backend.setter
+    def data_backend(self, data_backend):
+        if data_backend not in DATA_BACKENDS:
+            raise ValueError("Unknown data backend '{}'".format(data_backend))
+        self._data_backend = data_backend
+
+    def npy_dirpath(self, data_dir, dataset_split):
+        """Directory of the numpy game store of a split, data_dir/npy/{dataset_filename}-{train/dev/test}.
+
+        The stores are in a sub directory, so that the filepattern of the TFRecord files doesn't match them.
+        """
+        if dataset_split == problem.DatasetSplit.TRAIN:
+            suffix = "train"
+        elif dataset_split in [problem.DatasetSplit.EVAL, tf.estimator.ModeKeys.PREDICT]:
+            suffix = "dev"
+        else:
+            suffix = "test"
+        return os.path.join(data_dir, _NPY_FOLDER, "{}-{}".format(self.dataset_filename(), suffix))
+
+    def generator(self, datasets, cache_dir=None, quarantined=None, filenames_out=None):
         """Go game generator from sgf format.
 
         Args:
             datasets: List of (str, str) tuples, Dataset name and path to sgf files to generate go games from
+            cache_dir: (str) optional, directory of a cache_utils.GameCache to look up and store replayed games
+            quarantined: set of (str) optional, normalised paths of known bad files that are skipped without
+                reading them, see quarantine_utils.quarantined_paths
+            filenames_out: list optional, the dataset name and filename of every yielded game are appended to it
 
         Yields:
             A dictionary representing a go game with the following fields:
             * positions: (str) of np.array [game_length, 3, board_size, board_size], encoded game positions
             * p_targets: (list) of ints [game_length], index of the played move (incl. pass move)
             * legal_moves: (str) of np.array [game_length, num_moves], encoded legal_moves at every position
+            * legal_moves_encoding: (int), record encoding of legal_moves, see record_utils
+            * positions_encoding: (int), record encoding of positions, see record_utils
+            * record_format: (int), 'positions' or 'moves' record, 'moves' records contain setup instead of
+                positions and legal_moves, see record_utils
+            * aux_planes: (str) optional, bit-packed auxiliary feature planes of every position if self.aux_planes,
+                see record_utils.AUX_PLANES
             * to_play: (str) of np.array [game_length], current player at each position, BLACK: 1, WHITE: -1
             * game_length: (int), game length
             * winner: (int), winner of the game, BLACK: 1, WHITE: -1, DRAW: 0
             * dataset_name: (str), either 'kgs' or 'gogod'
             Fields positions, legal_moves, to_play, game_length, winner and dataset_name
                 is actually a list of the corresponding type.
+
+        If self.num_generate_workers > 1 the sgf files are parsed by a process pool, sending
+        self.generate_chunk_size files at once to every process. The games are yielded in the original file
+        order in both cases, so the generated files are identical to serial generation.
+        Files that fail to parse are counted per dataset and skipped.
+        """
+        num_files = sum(len(filenames) for _, filenames in datasets)
+        tasks = _sgf_tasks(datasets, self.board_size, cache_dir, quarantined, self.record_options)
+
+        pool = None
+        if self.num_generate_workers > 1:
+            tf.logging.info("Parsing {} sgf files with {} processes".format(num_files, self.num_generate_workers))
+            # the processes must not share the file handles of opened zip archives
+            archive_utils.close_archives()
+            pool = multiprocessing.Pool(self.num_generate_workers)
+            games = pool.imap(_parse_sgf_task, tasks, chunksize=self.generate_chunk_size)
+        else:
+            games = map(_parse_sgf_task, tasks)
+
+        num_skipped = {dataset_name: 0 for dataset_name, _ in datasets}
+        try:
+            for dataset_name, filename, data in games:
+                if data is None:
+                    num_skipped[dataset_name] += 1
+                    continue
+                if filenames_out is not None:
+                    filenames_out.append((dataset_name, filename))
+                yield data
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+            skipped = ", ".join("{}: {}".format(k, v) for k, v in sorted(num_skipped.items()))
+            tf.logging.info("Skipped {} of {} sgf files that failed to parse ({})"
+                            .format(sum(num_skipped.values()), num_files, skipped))
+
+    def select_filenames(self, tmp_dir, filenames, dataset_name):
+        """Selects the sgf files of a dataset that pass self.sgf_filter and removes duplicate games.
+
+        Both use the sgf index in tmp_dir, see index_utils. Of every group of duplicate games with the same game
+        hash the first file in the sorted filenames is kept. The hashes of the kept files are stored to remove
+        duplicates across datasets and splits later, see remove_duplicates_across_datasets.
+
+        Args:
+            tmp_dir: (str), directory of the sgf index
+            filenames: list of (str), sorted sgf filenames of the dataset
+            dataset_name: (str), either 'gogod' or 'kgs'
+        Returns:
+            list of (str), selected filenames in the same order
+        """
+        if not self.sgf_filter and not self.remove_duplicates:
+            return filenames
+
+        index = index_utils.update_index(tmp_dir, filenames, dataset_name, self.num_generate_workers,
+                                         self.generate_chunk_size, read_only=self._read_only_tmp_dir)
+
+        mask = np.ones(len(filenames), dtype=np.bool_)
+        if self.sgf_filter:
+            mask = index_utils.filter_index(index, self.sgf_filter)
+            tf.logging.info("Selected {} of {} {} sgf files with filter '{}'"
+                            .format(int(mask.sum()), len(filenames), dataset_name, self.sgf_filter))
+
+        if self.remove_duplicates:
+            unique = index_utils.first_occurrences(index['game_hash'], mask)
+            tf.logging.info("Removed {} duplicate games from {} {} sgf files"
+                            .format(int(mask.sum() - unique.sum()), int(mask.sum()), dataset_name))
+            mask = unique
+
+            for filename, game_hash in zip(index['filename'][mask], index['game_hash'][mask]):
+                self._game_hashes[str(filename)] = str(game_hash)
+
+        return [filename for filename, selected in zip(filenames, mask) if selected]
+
+    def remove_duplicates_across_datasets(self, data):
+        """Removes games that are duplicates of a game in an earlier dataset or split.
+
+        Duplicates within a dataset are already removed before splitting by select_filenames, this removes the
+        remaining duplicates between the datasets, e.g. a KGS game that is also in GoGoD. The first occurrence is
+        kept going through the splits in the order train, dev, test and the datasets in the order of data.
+
+        Args:
+            data: dict<str, list> of split and list of dataset_name, filenames tuple, see generate_dataset
+        Returns:
+            dict<str, list> data without the duplicates
         """
-        for dataset_name, filenames in datasets:
-            for file in filenames:
-                yield sgf_utils.parse_sgf(file, self.board_size, dataset_name)
+        if not self.remove_duplicates:
+            return data
+
+        seen = set()
+        for split in ["train", "dev", "test"]:
+            datasets = []
+            for dataset_name, filenames in data[split]:
+                unique = []
+                for filename in filenames:
+                    game_hash = self._game_hashes.get(filename, '')
+                    if game_hash and game_hash in seen:
+                        continue
+                    seen.add(game_hash)
+                    unique.append(filename)
+
+                tf.logging.info("Removed {} {} {} games that are duplicates of games in other datasets"
+                                .format(len(filenames) - len(unique), dataset_name, split))
+                datasets.append((dataset_name, unique))
+            data[split] = datasets
+
+        return data
 
     def get_gogod_dataset(self, tmp_dir, unzip=True):
         """Find and split gogod sgf filenames into train, dev and test dataset splits.
 
         Args:
             tmp_dir: (str), path to directory containing the zipped/unzipped files
-            unzip: (bool), default True, If true will unzip the files first
+            unzip: (bool), default True, If true will unzip the files first, ignored if not self.extract_archives
         Returns:
             dict<str, list> of split and list of dataset_name, filenames tuple, gogod filenames split into
                 train, dev and test splits
         """
-        # unzip gogod zips if not already done
-        if unzip:
-            maybe_unzip_gogod(tmp_dir)
+        if self.extract_archives:
+            # unzip gogod zips if not already done
+            if unzip:
+                maybe_unzip_gogod(tmp_dir)
+
+            # search all sgf files in the gogod dataset and shuffle the filnames
+            filenames_gogod = get_gogod_filenames(tmp_dir, self.board_size)
+        else:
+            # search all sgf files in the gogod zip
+            filenames_gogod = get_gogod_archive_filenames(tmp_dir, self.board_size)
 
-        # search all sgf files in the gogod dataset and shuffle the filnames
-        filenames_gogod = get_gogod_filenames(tmp_dir, self.board_size)
+        # select the files that pass the filter expression and remove duplicate games
+        filenames_gogod = self.select_filenames(tmp_dir, filenames_gogod, "gogod")
 
         # split gogod filenames into train, dev and test
-        train_gogod, dev_gogod, test_gogod = split_dataset(filenames_gogod, self.split_fractions)
+        if self.split_by_hash:
+            train_gogod, dev_gogod, test_gogod = split_dataset_by_hash(filenames_gogod, self.split_fractions, "gogod")
+        else:
+            train_gogod, dev_gogod, test_gogod = split_dataset(filenames_gogod, self.split_fractions)
         tf.logging.info("Split GoGoD data into train: {}, dev: {}, test: {} files!"
                         .format(len(train_gogod), len(dev_gogod), len(test_gogod)))
 
@@ -277,20 +907,30 @@ class GoProblem(problem.Problem):
 
         Args:
             tmp_dir: (str), path to directory containing the zipped/unzipped files
-            unzip: (bool), default True, If true will unzip the files first
+            unzip: (bool), default True, If true will unzip the files first, ignored if not self.extract_archives
         Returns:
             dict<str, list> of split and list of dataset_name, filenames tuple, kgs filenames split into
                 train, dev and test splits
         """
-        # unzip kgs zips if not already done
-        if unzip:
-            maybe_unzip_kgs(tmp_dir)
+        if self.extract_archives:
+            # unzip kgs zips if not already done
+            if unzip:
+                maybe_unzip_kgs(tmp_dir)
+
+            # search all sgf files in the kgs dataset and shuffle the filnames
+            filenames_kgs = get_kgs_filenames(tmp_dir)
+        else:
+            # search all sgf files in the kgs archives
+            filenames_kgs = get_kgs_archive_filenames(tmp_dir)
 
-        # search all sgf files in the kgs dataset and shuffle the filnames
-        filenames_kgs = get_kgs_filenames(tmp_dir)
+        # select the files that pass the filter expression and remove duplicate games
+        filenames_kgs = self.select_filenames(tmp_dir, filenames_kgs, "kgs")
 
         # split kgs filenames into train, dev and test
-        train_kgs, dev_kgs, test_kgs = split_dataset(filenames_kgs, self.split_fractions)
+        if self.split_by_hash:
+            train_kgs, dev_kgs, test_kgs = split_dataset_by_hash(filenames_kgs, self.split_fractions, "kgs")
+        else:
+            train_kgs, dev_kgs, test_kgs = split_dataset(filenames_kgs, self.split_fractions)
         tf.logging.info("Split KGS data into train: {}, dev: {}, test: {} files!"
                         .format(len(train_kgs), len(dev_kgs), len(test_kgs)))
 
@@ -300,7 +940,7 @@ class GoProblem(problem.Problem):
             "test": [("kgs", test_kgs)]
         }
 
-    def generate_data(self, data_dir, tmp_dir, task_id=-1):
+    def generate_data(self, data_dir, tmp_dir, task_id=-1, num_tasks=1):
         """Generates sharded Train, Dev and Test splits of the KGS and GoGoD Datasets.
 
         Assumes GoGoD zip from https://gogodonline.co.uk/ and
@@ -308,59 +948,591 @@ class GoProblem(problem.Problem):
 
         Uses split fractions defined in self.split_fractions and
         num shards per split defined in self.{train/dev/test]_shards.
+        Every shard is generated from every num_shards-th sgf file of its split and is complete once it exists.
+        The completed shards are saved in the manifest of the dataset, see manifest_utils, so a restarted generation
+        skips them and generates the same dataset as an uninterrupted one. If self.append_data only the sgf files
+        that are not in the manifest are generated, to new shards next to the existing ones, which needs the splits
+        to be assigned by hash.
+        If task_id >= 0 only the shards task_id, task_id + num_tasks, ... of the shards of all splits are generated
+        and saved in the manifest of the task, so that num_tasks processes, also on several machines sharing
+        data_dir, generate the dataset together. The tasks only read tmp_dir, which has to be prepared by
+        prepare_data before, so they don't use the game cache either. merge_data then checks and merges the shards
+        of all tasks.
         Args:
             data_dir: (str), final data directory.
             tmp_dir: (str), directory containing KGS and GoGoD zips
-            task_id: (int), task id.
+            task_id: (int), task id, -1 generates all shards
+            num_tasks: (int), number of tasks, ignored if task_id is -1
         """
-        data = self.generate_dataset(tmp_dir)
+        if task_id >= 0:
+            # the archives are extracted and indexed by prepare_data before the tasks start
+            self._read_only_tmp_dir = True
+            try:
+                data = self.generate_dataset(tmp_dir, unzip=False)
+            finally:
+                self._read_only_tmp_dir = False
+        else:
+            data = self.generate_dataset(tmp_dir)
+        data = self.remove_duplicates_across_datasets(data)
 
         for k, v in data.items():
             if v == []:
                 raise ValueError("No {} files found!".format(k))
 
-        # generate sharded TFRecord files of the train sgf's and shuffle
-        tf.logging.info("Generating GoGoD and KGS train data")
-        train_gen = self.generator(data["train"])
-        train_paths = self.training_filepaths(data_dir, self.train_shards, shuffled=False)
-        generator_utils.generate_files(train_gen, train_paths)
-        generator_utils.shuffle_dataset(train_paths)
-
-        # generate sharded TFRecord files of the dev sgf's and shuffle
-        tf.logging.info("Generating GoGoD and KGS dev data")
-        dev_gen = self.generator(data["dev"])
-        dev_paths = self.dev_filepaths(data_dir, self.dev_shards, shuffled=False)
-        generator_utils.generate_files(dev_gen, dev_paths)
-        generator_utils.shuffle_dataset(dev_paths)
-
-        # generate sharded TFRecord files of the test sgf's and shuffle
-        tf.logging.info("Generating GoGoD and KGS test data")
-        test_gen = self.generator(data["test"])
-        test_paths = self.test_filepaths(data_dir, self.test_shards, shuffled=False)
-        generator_utils.generate_files(test_gen, test_paths)
-        generator_utils.shuffle_dataset(test_paths)
+        # the tasks don't write to the shared tmp_dir
+        cache_dir = os.path.join(tmp_dir, _GAME_CACHE_FOLDER) if self.use_game_cache and task_id < 0 else None
+        quarantined = quarantine_utils.quarantined_paths(tmp_dir)
+
+        manifest = manifest_utils.load_manifest(data_dir, self.dataset_filename())
+        append = self.append_data and bool(manifest_utils.completed_shards(manifest))
+        if self.append_data and not append:
+            tf.logging.warning("No manifest of an existing dataset found in {}, generating all files"
+                               .format(data_dir))
+        if append and not self.split_by_hash:
+            raise ValueError("Appending to a dataset needs split_by_hash, else the splits of the games change")
+
+        append_id = 0
+        if append:
+            known = manifest_utils.known_games(manifest)
+            data = {split: [(dataset_name, [f for f in filenames
+                                            if manifest_utils.game_key(dataset_name, f) not in known])
+                            for dataset_name, filenames in datasets]
+                    for split, datasets in data.items()}
+            append_id = manifest['appends'] + 1
+
+        split_paths = {}
+        for split in manifest_utils.SPLITS:
+            num_files = sum(len(filenames) for _, filenames in data[split])
+            if append and num_files == 0:
+                tf.logging.info("No new {} files to append".format(split))
+                continue
+            split_paths[split] = self.split_filepaths(data_dir, split, manifest, append_id, num_files)
+
+        if task_id < 0:
+            task_manifest = manifest
+            task_paths = None
+        else:
+            # the plan is the same for all tasks, it is checked by merge_data
+            plan = {
+                'append': append_id,
+                'num_tasks': num_tasks,
+                'paths': {split: [os.path.basename(path) for path in paths] for split, paths in split_paths.items()}
+            }
+            task_manifest = manifest_utils.load_manifest(data_dir, self.dataset_filename(), task_id)
+            if task_manifest.get('plan') != plan:
+                task_manifest = copy.deepcopy(manifest)
+                task_manifest['plan'] = plan
+
+            all_paths = [path for split in manifest_utils.SPLITS for path in split_paths.get(split, [])]
+            task_paths = all_paths[task_id::num_tasks]
+            tf.logging.info("Generating {} of {} shards as task {} of {}"
+                            .format(len(task_paths), len(all_paths), task_id, num_tasks))
+
+        changed = self.generate_splits(data, split_paths, task_manifest, append_id, data_dir, cache_dir, quarantined,
+                                       task_id, task_paths)
+
+        if task_id >= 0:
+            manifest_utils.save_manifest(task_manifest, data_dir, self.dataset_filename(), task_id)
+            tf.logging.info("Generated the shards of task {}, merge the shards of all {} tasks with merge_data"
+                            .format(task_id, num_tasks))
+            return
+
+        self.finish_data(data_dir, manifest, split_paths, append_id, changed)
+
+    def prepare_data(self, tmp_dir):
+        """Extracts the archives and builds the sgf index in tmp_dir once before the generation tasks start, which
+        only read tmp_dir, see generate_data."""
+        self.generate_dataset(tmp_dir)
+
+    def merge_data(self, data_dir, num_tasks):
+        """Checks that all tasks generated their shards and merges their manifests into the manifest of the
+        dataset, see generate_data and finish_data.
+
+        Args:
+            data_dir: (str), final data directory
+            num_tasks: (int), number of tasks that generated the dataset
+        Raises:
+            ValueError: if a task is missing, the tasks have different plans or shards are missing
+        """
+        task_manifests = []
+        for task_id in range(num_tasks):
+            task_manifest = manifest_utils.load_manifest(data_dir, self.dataset_filename(), task_id)
+            if 'plan' not in task_manifest:
+                raise ValueError("No manifest of task {} found in {}".format(task_id, data_dir))
+            task_manifests.append(task_manifest)
+
+        plan = task_manifests[0]['plan']
+        if plan['num_tasks'] != num_tasks or any(m['plan'] != plan for m in task_manifests):
+            raise ValueError("The tasks generated different datasets, run all tasks again with the same hparams")
+
+        manifest = manifest_utils.load_manifest(data_dir, self.dataset_filename())
+        all_filenames = [filename for split in manifest_utils.SPLITS for filename in plan['paths'].get(split, [])]
+
+        changed = {split: False for split in plan['paths']}
+        missing = []
+        for i, filename in enumerate(all_filenames):
+            shard = task_manifests[i % num_tasks]['shards'].get(filename)
+            if shard is None or not tf.gfile.Exists(os.path.join(data_dir, filename)):
+                missing.append(filename)
+                continue
+            changed[shard['split']] |= manifest['shards'].get(filename) != shard
+            manifest['shards'][filename] = shard
+
+        if missing:
+            raise ValueError("{} of {} shards are missing, e.g. {}, run their tasks again"
+                             .format(len(missing), len(all_filenames), ", ".join(missing[:3])))
+
+        tf.logging.info("Merging the {} shards of {} tasks".format(len(all_filenames), num_tasks))
+        split_paths = {split: [os.path.join(data_dir, filename) for filename in filenames]
+                       for split, filenames in plan['paths'].items()}
+        self.finish_data(data_dir, manifest, split_paths, plan['append'], changed)
+
+        for task_id in range(num_tasks):
+            tf.gfile.Remove(manifest_utils.manifest_path(data_dir, self.dataset_filename(), task_id))
+
+    def finish_data(self, data_dir, manifest, split_paths, append_id, changed):
+        """Removes stale shards, shuffles the splits across their shards and saves the manifest of the dataset.
+
+        Args:
+            data_dir: (str), final data directory
+            manifest: dict with all generated shards, see manifest_utils.load_manifest
+            split_paths: dict<str, list> split -> filepaths of the generated shards of the split
+            append_id: (int), number of the append, 0 for a new dataset
+            changed: dict<str, bool> split -> True if shards of the split were generated
+        """
+        # shards of earlier appends or with another number of shards, of an append the shards of an interrupted
+        # append with other sgf files
+        keep = [path for paths in split_paths.values() for path in paths]
+        if append_id:
+            keep += [name for name, shard in manifest['shards'].items() if shard['append'] < append_id]
+        self.remove_stale_shards(data_dir, manifest, keep)
+
+        for split in manifest_utils.SPLITS:
+            if split in split_paths and self.shuffle_memory_mb:
+                self.shuffle_split(split_paths[split], manifest, data_dir, resume=not changed[split])
+
+        if split_paths:
+            manifest['appends'] = append_id
+        manifest_utils.save_manifest(manifest, data_dir, self.dataset_filename())
+
+        if any(changed.values()):
+            # the stats and the numpy stores of the changed dataset have to be created again
+            data_utils.remove_dataset_stats(self, data_dir)
+            for dataset_split in [problem.DatasetSplit.TRAIN, problem.DatasetSplit.EVAL, problem.DatasetSplit.TEST]:
+                store_dir = self.npy_dirpath(data_dir, dataset_split)
+                if tf.gfile.Exists(store_dir):
+                    tf.gfile.DeleteRecursively(store_dir)
+
+        if self.data_backend == "npy":
+            self.convert_to_npy(data_dir)
+
+    def remove_stale_shards(self, data_dir, manifest, paths):
+        """Removes the shards of the manifest that are not in paths, with their sidecar indices, and their entries.
+
+        Args:
+            data_dir: (str), final data directory
+            manifest: dict, see manifest_utils.load_manifest
+            paths: list of (str), paths or filenames of the shards to keep
+        """
+        keep = {os.path.basename(path) for path in paths}
+        for shard_filename in list(manifest['shards']):
+            if shard_filename in keep:
+                continue
+            path = os.path.join(data_dir, shard_filename)
+            for p in [path, shard_utils.index_path(path)]:
+                if tf.gfile.Exists(p):
+                    tf.logging.info("Removing stale shard {}".format(p))
+                    tf.gfile.Remove(p)
+            del manifest['shards'][shard_filename]
+
+    def split_filepaths(self, data_dir, split, manifest, append_id=0, num_new_files=0):
+        """Filepaths of the shards of a split.
+
+        Appended shards are named {dataset_filename}-{split}-{append number}-{shard}-of-{num_shards}, so that they
+        match the filepattern of the split. An append has one dev and test shard and a number of train shards
+        proportional to the number of new games, at most self.train_shards.
+
+        Args:
+            data_dir: (str), final data directory
+            split: (str), 'train', 'dev' or 'test'
+            manifest: dict, see manifest_utils.load_manifest
+            append_id: (int), number of the append, 0 for a new dataset
+            num_new_files: (int), number of new sgf files of an append
+        Returns:
+            list of (str), shuffled filepaths
+        """
+        if not append_id:
+            if split == "train":
+                return self.training_filepaths(data_dir, self.train_shards, shuffled=True)
+            elif split == "dev":
+                return self.dev_filepaths(data_dir, self.dev_shards, shuffled=True)
+            return self.test_filepaths(data_dir, self.test_shards, shuffled=True)
+
+        num_shards = 1
+        if split == "train":
+            num_existing = max(1, manifest_utils.num_games(manifest, split))
+            num_shards = max(1, min(self.train_shards, int(math.ceil(self.train_shards * num_new_files
+                                                                       / num_existing))))
+
+        base = os.path.join(data_dir, "{}-{}-{:03d}".format(self.dataset_filename(), split, append_id))
+        return [generator_utils.sharded_name(base, shard, num_shards) for shard in range(num_shards)]
+
+    def generate_splits(self, data, split_paths, manifest, append_id, data_dir, cache_dir=None, quarantined=None,
+                        task_id=-1, task_paths=None):
+        """Generates the shards of the splits, see generate_split.
+
+        If self.parallel_splits every split is generated by its own process at the same time. The
+        self.num_generate_workers and self.shard_workers processes are divided between the splits by their number of
+        files, so that the splits together don't use more processes than a single split. The split processes send
+        their shards to this process, which saves them in the manifest and logs the progress of every split.
+
+        Args:
+            data: dict<str, list> of split and list of dataset_name, filenames tuples, see generate_dataset
+            split_paths: dict<str, list> split -> filepaths of the shards of the split
+            manifest: dict, see manifest_utils.load_manifest
+            append_id: (int), number of the append, 0 for a new dataset
+            data_dir: (str), final data directory of the manifest
+            cache_dir: (str) optional, directory of the game cache
+            quarantined: set of (str) optional, normalised paths of known bad files
+            task_id: (int), task id of the manifest, -1 for the manifest of the dataset
+            task_paths: list of (str) optional, filepaths of the shards generated by the task, all shards if None
+        Returns:
+            dict<str, bool> split -> True if shards of the split were generated
+        """
+        # split -> number of sgf files of the shards generated by the task
+        sizes = {}
+        for split, paths in split_paths.items():
+            num_files = sum(len(filenames) for _, filenames in data[split])
+            num_task_paths = len(paths) if task_paths is None else len([path for path in paths if path in task_paths])
+            sizes[split] = num_files * num_task_paths // len(paths)
+
+        kwargs = {split: dict(datasets=data[split], paths=split_paths[split], split=split, manifest=manifest,
+                              append_id=append_id, data_dir=data_dir, cache_dir=cache_dir, quarantined=quarantined,
+                              task_id=task_id, task_paths=task_paths)
+                  for split in split_paths}
+
+        changed = {split: False for split in split_paths}
+        splits = [split for split in manifest_utils.SPLITS if sizes.get(split)]
+        if not self.parallel_splits or len(splits) <= 1:
+            for split in splits:
+                tf.logging.info("Generating GoGoD and KGS {} data".format(split))
+                changed[split] = self.generate_split(**kwargs[split]) > 0
+            return changed
+
+        generate_workers = _split_budgets(self.num_generate_workers, {split: sizes[split] for split in splits})
+        shard_workers = _split_budgets(self.shard_workers, {split: sizes[split] for split in splits})
+
+        # the processes must not share the file handles of opened zip archives
+        archive_utils.close_archives()
+        queue = multiprocessing.Queue()
+        processes = {}
+        for split in splits:
+            tf.logging.info("Generating GoGoD and KGS {} data with {} parse workers and {} shard workers"
+                            .format(split, generate_workers[split], shard_workers[split]))
+            processes[split] = multiprocessing.Process(
+                target=_generate_split_process,
+                args=(self, queue, generate_workers[split], shard_workers[split], kwargs[split]))
+            processes[split].start()
+
+        # split -> number of generated shards and shards to generate
+        progress = {split: [0, 0] for split in splits}
+        done = set()
+        try:
+            while len(done) < len(splits):
+                try:
+                    message = queue.get(timeout=10)
+                except queue_module.Empty:
+                    for split, process in processes.items():
+                        if split not in done and process.exitcode:
+                            raise RuntimeError("The process generating the {} data exited with code {}"
+                                               .format(split, process.exitcode))
+                    continue
+
+                kind, split = message[:2]
+                if kind == 'start':
+                    progress[split][1] = message[2]
+                elif kind == 'shard':
+                    manifest['shards'][message[2]] = message[3]
+                    manifest_utils.save_manifest(manifest, data_dir, self.dataset_filename(), task_id)
+                    progress[split][0] += 1
+                    tf.logging.info("Progress: " + ", ".join("{}: {} of {} shards".format(s, *progress[s])
+                                                             for s in splits))
+                elif kind == 'done':
+                    changed[split] = message[2] > 0
+                    done.add(split)
+                    tf.logging.info("Generated the {} data".format(split))
+                else:
+                    raise RuntimeError("Generating the {} data failed:\n{}".format(split, message[2]))
+        finally:
+            for process in processes.values():
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+        return changed
+
+    def generate_split(self, datasets, paths, split, manifest, append_id, data_dir, cache_dir=None,
+                       quarantined=None, task_id=-1, task_paths=None, shard_queue=None):
+        """Generates the shards of a split that are not complete and saves them in the manifest.
+
+        Shard i of n is generated from the sgf files i, i + n, i + 2n, ... of the split. Its records are shuffled
+        in memory if self.shuffle_memory_mb is 0, else they are shuffled across all shards by shuffle_split.
+        If self.shard_workers > 1
+        the shards are generated in parallel by a process pool, every process parsing and writing whole shards,
+        else one shard after the other with the sgf files parsed by self.num_generate_workers processes. The shards
+        are identical in both cases.
+
+        Args:
+            datasets: list of dataset_name, filenames tuples of the split, see generate_dataset
+            paths: list of (str), shuffled filepaths of the shards
+            split: (str), 'train', 'dev' or 'test'
+            manifest: dict, see manifest_utils.load_manifest
+            append_id: (int), number of the append, 0 for a new dataset
+            data_dir: (str), final data directory of the manifest
+            cache_dir: (str) optional, directory of the game cache
+            quarantined: set of (str) optional, normalised paths of known bad files
+            task_id: (int), task id of the manifest, -1 for the manifest of the dataset
+            task_paths: list of (str) optional, filepaths of the shards generated by the task, all shards if None
+            shard_queue: multiprocessing.Queue optional, sends the shards to the process saving the manifest instead
+                of saving it, see generate_splits
+        Returns:
+            (int), number of generated shards
+        """
+        files = [(dataset_name, filename) for dataset_name, filenames in datasets for filename in filenames]
+
+        # path -> dataset_name, filenames tuples, game keys and inputs digest of the shards
+        shards = collections.OrderedDict()
+        for shard, path in enumerate(paths):
+            shard_files = files[shard::len(paths)]
+            keys = [manifest_utils.game_key(dataset_name, filename) for dataset_name, filename in shard_files]
+            shard_datasets = [(dataset_name, [filename for _, filename in group])
+                              for dataset_name, group in itertools.groupby(shard_files, key=lambda file: file[0])]
+            shards[path] = (shard_datasets, keys, manifest_utils.inputs_digest(keys))
+
+        pending = collections.OrderedDict((path, shard) for path, shard in shards.items()
+                                          if not manifest_utils.is_complete(manifest, path, shard[2]))
+        if pending and any(manifest['shards'][os.path.basename(path)]['shuffled'] for path in paths
+                           if path not in pending):
+            # the games of the complete shards were shuffled across all shards, so all shards are generated again
+            pending = shards
+        if task_paths is not None:
+            pending = collections.OrderedDict((path, shard) for path, shard in pending.items() if path in task_paths)
+        for path in paths if task_paths is None else task_paths:
+            if path in shards and path not in pending:
+                tf.logging.info("Skipping {} because it is complete".format(path))
+
+        if shard_queue is not None:
+            shard_queue.put(('start', split, len(pending)))
+        num_done = [0]
+
+        def _add_shard(path, generated):
+            _, keys, inputs = pending[path]
+            game_keys = [manifest_utils.game_key(dataset_name, filename) for dataset_name, filename in generated]
+            # files that were quarantined or failed to parse are known as well, so appends don't parse them again
+            generated_keys = set(game_keys)
+            skipped_keys = [key for key in keys if key not in generated_keys]
+
+            manifest_utils.add_shard(manifest, path, split, append_id, inputs, game_keys, skipped_keys)
+            if shard_queue is not None:
+                shard_filename = os.path.basename(path)
+                shard_queue.put(('shard', split, shard_filename, manifest['shards'][shard_filename]))
+            else:
+                manifest_utils.save_manifest(manifest, data_dir, self.dataset_filename(), task_id)
+                num_done[0] += 1
+                tf.logging.info("Progress: {}: {} of {} shards".format(split, num_done[0], len(pending)))
+
+        # the records are shuffled across the shards afterwards, see shuffle_split
+        shuffle = not self.shuffle_memory_mb
+
+        num_workers = min(self.shard_workers, len(pending))
+        if num_workers > 1:
+            tf.logging.info("Generating {} shards with {} processes".format(len(pending), num_workers))
+            tasks = [(shard_datasets, path, self.board_size, cache_dir, quarantined, self.record_options,
+                      self.compression, shuffle) for path, (shard_datasets, _, _) in pending.items()]
+            archive_utils.close_archives()
+            pool = multiprocessing.Pool(num_workers)
+            try:
+                for path, generated in pool.imap_unordered(_generate_shard_task, tasks):
+                    _add_shard(path, generated)
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            for path, (shard_datasets, _, _) in pending.items():
+                generated = []
+                gen = self.generator(shard_datasets, cache_dir, quarantined, filenames_out=generated)
+                shard_utils.generate_shard(gen, path, self.compression, shuffle)
+                _add_shard(path, generated)
+
+        return len(pending)
+
+    def shuffle_split(self, paths, manifest, data_dir, resume=False):
+        """Shuffles the records across the shards of a split that aren't shuffled yet with self.shuffle_memory_mb
+        of memory, see shard_utils.external_shuffle, and marks them as shuffled in the manifest.
+
+        Args:
+            paths: list of (str), filepaths of the shards
+            manifest: dict, see manifest_utils.load_manifest
+            data_dir: (str), final data directory of the manifest
+            resume: (bool), the shards weren't generated again, so an interrupted shuffle can be resumed
+        """
+        if manifest_utils.is_shuffled(manifest, paths):
+            return
+
+        shard_utils.external_shuffle(paths, paths, self.compression, self.shuffle_memory_mb * 1024 ** 2,
+                                     seed=os.path.basename(paths[0]), resume=resume)
+        manifest_utils.set_shuffled(manifest, paths)
+        manifest_utils.save_manifest(manifest, data_dir, self.dataset_filename())
+
+    def decoded_games(self, data_files, num_threads=None):
+        """Reads and decodes the records of TFRecord files with decode_example.
+
+        Yields:
+            dict<str, np.array> decoded example of every record in file order
+        """
+        with tf.Graph().as_default():
+            dataset = tf.data.TFRecordDataset(data_files, compression_type=self.compression,
+                                              buffer_size=8 * 1024 * 1024)
+            dataset = dataset.map(self.decode_example, num_parallel_calls=num_threads).prefetch(64)
+            example = dataset.make_one_shot_iterator().get_next()
+
+            with tf.Session() as sess:
+                while True:
+                    try:
+                        yield sess.run(example)
+                    except tf.errors.OutOfRangeError:
+                        break
+
+    def convert_to_npy(self, data_dir, num_threads=None):
+        """Converts the TFRecord files of the train, dev and test splits to numpy game stores, see npy_utils.
+
+        Splits that already have a store are skipped.
+
+        Args:
+            data_dir: (str), data directory of the TFRecord files and the stores
+            num_threads: (int) optional, number of parallel decode calls
+        """
+        for dataset_split in [problem.DatasetSplit.TRAIN, problem.DatasetSplit.EVAL, problem.DatasetSplit.TEST]:
+            store_dir = self.npy_dirpath(data_dir, dataset_split)
+            if npy_utils.store_exists(store_dir):
+                tf.logging.info("Skipping conversion because the numpy store '{}' exists".format(store_dir))
+                continue
+
+            data_files = shard_utils.data_files(self.filepattern(data_dir, dataset_split))
+            # the sidecar indices give the number of positions to allocate the memory mapped arrays
+            num_positions = sum(int(shard_utils.load_shard_index(path, self.compression)['game_length'].sum())
+                                for path in data_files)
+
+            tf.logging.info("Converting {} {} files to the numpy store '{}'"
+                            .format(len(data_files), dataset_split, store_dir))
+            npy_utils.write_store(self.decoded_games(data_files, num_threads), store_dir, num_positions,
+                                  self.board_size, self.aux_planes)
 
     def example_reading_spec(self):
         data_fields = {
-            'positions': tf.FixedLenFeature((), tf.string),
+            'positions': tf.FixedLenFeature((), tf.string, default_value=''),
+            'positions_encoding': tf.FixedLenFeature((), tf.int64, default_value=0),
             'p_targets': tf.VarLenFeature(tf.int64),
-            'legal_moves': tf.FixedLenFeature((), tf.string),
+            'legal_moves': tf.FixedLenFeature((), tf.string, default_value=''),
+            'legal_moves_encoding': tf.FixedLenFeature((), tf.int64, default_value=0),
             'game_length': tf.FixedLenFeature((), tf.int64),
             'dataset_name': tf.FixedLenFeature((), tf.string),
             'to_play': tf.FixedLenFeature((), tf.string),
             'winner': tf.FixedLenFeature((), tf.int64),
+            'record_format': tf.FixedLenFeature((), tf.int64, default_value=0),
+            'setup': tf.FixedLenFeature((), tf.string, default_value=''),
+            'aux_planes': tf.FixedLenFeature((), tf.string, default_value=''),
         }
         data_items_to_decoders = {
-            'inputs': NumpyHandler('positions', [-1, self.board_size, self.board_size], dtype=tf.int8),
+            'inputs': PositionsHandler(self.board_size),
             'p_targets': tf.contrib.slim.tfexample_decoder.Tensor('p_targets'),
-            'legal_moves': NumpyHandler('legal_moves', [-1, self.num_moves], dtype=tf.uint8),
+            'legal_moves': LegalMovesHandler(self.board_size),
             'game_length': tf.contrib.slim.tfexample_decoder.Tensor('game_length'),
             'dataset_name': tf.contrib.slim.tfexample_decoder.Tensor('dataset_name'),
             'to_play': NumpyHandler('to_play', [-1], dtype=tf.int8),
             'winner': tf.contrib.slim.tfexample_decoder.Tensor('winner'),
+            'record_format': tf.contrib.slim.tfexample_decoder.Tensor('record_format'),
+            'setup': NumpyHandler('setup', [-1, 2], dtype=tf.int16),
+            'aux_planes': AuxPlanesHandler(self.board_size),
         }
         return data_fields, data_items_to_decoders
 
+    def decode_example(self, serialized_example):
+        """Decodes a record and replays it if it is a move list record, see replay_move_lists."""
+        example = super(GoProblem, self).decode_example(serialized_example)
+        return self.replay_move_lists(example)
+
+    def replay_move_lists(self, example):
+        """Replays the inputs and legal_moves of 'moves' records, see record_utils.RECORD_FORMATS.
+
+        The games are replayed with the go engine in a tf.py_func, in a process pool of self.replay_workers
+        processes, and are identical to the inputs and legal_moves of 'positions' records.
+        Removes the record_format and setup fields from the example.
+        """
+        record_format = example.pop('record_format')
+        setup = example.pop('setup')
+
+        if self.record_format == 'moves' and self.replay_workers > 1:
+            # create the pool once while the dataset is built instead of in the tf.data threads
+            _replay_pool(self.replay_workers)
+
+        def _replay():
+            inputs, legal_moves = tf.py_func(
+                lambda *args: _replay_move_list(*args, board_size=self.board_size, num_workers=self.replay_workers),
+                [setup, example['p_targets'], example['to_play']], [tf.int8, tf.uint8],
+                stateful=False, name='replay_move_list')
+            return inputs, legal_moves
+
+        def _decoded():
+            return example['inputs'], example['legal_moves']
+
+        inputs, legal_moves = tf.cond(tf.equal(record_format, record_utils.RECORD_FORMATS['moves']),
+                                      _replay, _decoded)
+        inputs.set_shape([None, self.board_size, self.board_size])
+        legal_moves.set_shape([None, self.num_moves])
+
+        example['inputs'] = inputs
+        example['legal_moves'] = legal_moves
+
+        return example
+
+    def format_inputs(self, example, hparams):
+        """Formats the inputs of a game for the RNN or CNN models, see preprocess_example.
+
+        Only the first min_length positions are used if split_to_min_length is True in hparams. The auxiliary
+        feature planes are appended to the formatted inputs if self.use_aux_planes. Removes the aux_planes field
+        from the example.
+
+        Args:
+            example: dict<str, tf.Tensor> of a decoded game
+            hparams: tf.contrib.training.HParams
+        Returns:
+            example formatted with go_preprocessing.format_example_rnn or format_example_cnn
+        """
+        aux_planes = example.pop("aux_planes")
+
+        if hasattr(hparams, "split_to_min_length") and hparams.split_to_min_length:
+            example["game_length"] = tf.constant(hparams.min_length, tf.int64)
+            example["inputs"] = example["inputs"][:hparams.min_length]
+            example["to_play"] = example["to_play"][:hparams.min_length]
+            example["p_targets"] = example["p_targets"][:hparams.min_length]
+            example["legal_moves"] = example["legal_moves"][:hparams.min_length]
+            aux_planes = aux_planes[:hparams.min_length]
+
+        if self.is_recurrent:
+            example = go_preprocessing.format_example_rnn(example)
+            num_planes = 3
+        else:
+            example = go_preprocessing.format_example_cnn(example, hparams)
+            num_planes = hparams.history_length * 2 + 1
+
+        if self.use_aux_planes:
+            example = go_preprocessing.append_aux_planes(example, aux_planes)
+
+        example["inputs"].set_shape([None, num_planes + hparams.num_aux_planes, self.board_size, self.board_size])
+
+        return example
+
     def get_hparams(self, hparams=None):
         """Returns problem_hparams."""
         if hparams is None:
@@ -372,6 +1544,22 @@ class GoProblem(problem.Problem):
         hparams.add_hparam("board_size", self.board_size)
         hparams.add_hparam("num_moves", self.num_moves)
 
+        self.read_hparams(hparams)
+        hparams.add_hparam("num_aux_planes", len(record_utils.AUX_PLANES) if self.use_aux_planes else 0)
+
+        ret = self.add_hparams(hparams)
+        if ret is not None:
+            raise ValueError("The Problem subclass hp function should mutate "
+                             "the defaults passed in and return None.")
+
+        self._hparams = hparams
+        return self._hparams
+
+    def read_hparams(self, hparams):
+        """Sets the properties of the problem from the hparams, missing hparams get their defaults.
+
+        Unlike get_hparams doesn't read the dataset stats, so it can set up the problem to generate data.
+        """
         if hasattr(hparams, "sort_sequence_by_color"):
             if self.is_recurrent:
                 self.sort_sequence_by_color = hparams.sort_sequence_by_color
@@ -390,13 +1578,115 @@ class GoProblem(problem.Problem):
         else:
             self.use_kgs_data = False
 
-        ret = self.add_hparams(hparams)
-        if ret is not None:
-            raise ValueError("The Problem subclass hp function should mutate "
-                             "the defaults passed in and return None.")
+        if hasattr(hparams, "num_generate_workers"):
+            self.num_generate_workers = hparams.num_generate_workers
+        else:
+            self.num_generate_workers = 1
 
-        self._hparams = hparams
-        return self._hparams
+        if hasattr(hparams, "generate_chunk_size"):
+            self.generate_chunk_size = hparams.generate_chunk_size
+        else:
+            self.generate_chunk_size = 16
+
+        if hasattr(hparams, "extract_archives"):
+            self.extract_archives = hparams.extract_archives
+        else:
+            self.extract_archives = True
+
+        if hasattr(hparams, "use_game_cache"):
+            self.use_game_cache = hparams.use_game_cache
+        else:
+            self.use_game_cache = False
+
+        if hasattr(hparams, "sgf_filter"):
+            self.sgf_filter = hparams.sgf_filter
+        else:
+            self.sgf_filter = ""
+
+        if hasattr(hparams, "legal_moves_encoding"):
+            self.legal_moves_encoding = hparams.legal_moves_encoding
+        else:
+            self.legal_moves_encoding = 'raw'
+
+        if hasattr(hparams, "positions_encoding"):
+            self.positions_encoding = hparams.positions_encoding
+        else:
+            self.positions_encoding = 'raw'
+
+        if hasattr(hparams, "record_format"):
+            self.record_format = hparams.record_format
+        else:
+            self.record_format = 'positions'
+
+        if hasattr(hparams, "replay_workers"):
+            self.replay_workers = hparams.replay_workers
+        else:
+            self.replay_workers = 1
+
+        if hasattr(hparams, "compression"):
+            self.compression = hparams.compression
+        else:
+            self.compression = ''
+
+        if hasattr(hparams, "remove_duplicates"):
+            self.remove_duplicates = hparams.remove_duplicates
+        else:
+            self.remove_duplicates = False
+
+        if hasattr(hparams, "train_shards"):
+            self.train_shards = hparams.train_shards
+        else:
+            self.train_shards = 0
+
+        if hasattr(hparams, "shard_workers"):
+            self.shard_workers = hparams.shard_workers
+        else:
+            self.shard_workers = 1
+
+        if hasattr(hparams, "parallel_splits"):
+            self.parallel_splits = hparams.parallel_splits
+        else:
+            self.parallel_splits = False
+
+        if hasattr(hparams, "shuffle_memory_mb"):
+            self.shuffle_memory_mb = hparams.shuffle_memory_mb
+        else:
+            self.shuffle_memory_mb = 0
+
+        if hasattr(hparams, "split_by_hash"):
+            self.split_by_hash = hparams.split_by_hash
+        else:
+            self.split_by_hash = False
+
+        if hasattr(hparams, "append_data"):
+            self.append_data = hparams.append_data
+        else:
+            self.append_data = False
+
+        if hasattr(hparams, "data_backend"):
+            self.data_backend = hparams.data_backend
+        else:
+            self.data_backend = "tfrecord"
+
+        if hasattr(hparams, "aux_planes"):
+            self.aux_planes = hparams.aux_planes
+        else:
+            self.aux_planes = False
+
+        if hasattr(hparams, "use_aux_planes"):
+            self.use_aux_planes = hparams.use_aux_planes
+        else:
+            self.use_aux_planes = False
+
+        if hasattr(hparams, "sample_positions"):
+            self.sample_positions = hparams.sample_positions and not self.is_recurrent
+        else:
+            self.sample_positions = False
+
+        if hasattr(hparams, "sample_threads"):
+            self.sample_threads = hparams.sample_threads
+        else:
+            self.sample_threads = 4
 
     def add_hparams(self, hparams):
         # add train, dev and test sizes to hparams
@@ -468,6 +1758,26 @@ class GoProblem(problem.Problem):
         def gpu_valid_size(example):
             return data_utils.example_valid_size(example, hparams.min_length, hparams.max_length)
 
+        def _filter_and_preprocess(_dataset):
+            """Filters and preprocesses a dataset of decoded examples."""
+            # Filter min lengths if hparams are given
+            if hparams and hasattr(hparams, "min_length") and \
+                    hasattr(hparams, "max_length") and hparams.max_length:
+                _dataset = _dataset.filter(gpu_valid_size)
+            # Preprocess if requested.
+            # Note that preprocessing should happen per-file as order may matter.
+            if preprocess:
+                _dataset = self.preprocess(_dataset, mode, hparams, interleave=shuffle_files)
+            return _dataset
+
+        if self.data_backend == "npy":
+            # slice the decoded games from the memory mapped store instead of reading the TFRecord files
+            dataset = self.npy_dataset(data_dir, dataset_split, shuffle_files, partition_id, num_partitions)
+            dataset = _filter_and_preprocess(dataset).take(max_records)
+            if output_buffer_size:
+                dataset = dataset.prefetch(output_buffer_size)
+            return dataset
+
         data_filepattern = self.filepattern(data_dir, dataset_split, shard=shard)
         if only_last:
             imprv_data_filepattern = data_filepattern + r"10.[\d+]"
@@ -475,29 +1785,20 @@ class GoProblem(problem.Problem):
             imprv_data_filepattern = data_filepattern
         tf.logging.info("Reading data files from %s", data_filepattern)
         try:
-            data_files = sorted(tf.contrib.slim.parallel_reader.get_data_files(
-                imprv_data_filepattern))
+            data_files = shard_utils.data_files(imprv_data_filepattern)
         except ValueError:
-            data_files = sorted(tf.contrib.slim.parallel_reader.get_data_files(
-                data_filepattern))
+            data_files = shard_utils.data_files(data_filepattern)
 
         # Functions used in dataset transforms below. `filenames` can be either a
         # `tf.string` tensor or `tf.data.Dataset` containing one or more filenames.
         def _load_records_and_preprocess(filenames):
             """Reads files from a string tensor or a dataset of filenames."""
             # Load records from file(s) with an 8MiB read buffer.
-            _dataset = tf.data.TFRecordDataset(filenames, buffer_size=8 * 1024 * 1024)
+            _dataset = tf.data.TFRecordDataset(filenames, compression_type=self.compression,
+                                               buffer_size=8 * 1024 * 1024)
             # Decode.
             _dataset = _dataset.map(self.decode_example, num_parallel_calls=num_threads)
-            # Filter min lengths if hparams are given
-            if hparams and hasattr(hparams, "min_length") and \
-                    hasattr(hparams, "max_length") and hparams.max_length:
-                _dataset = _dataset.filter(gpu_valid_size)
-            # Preprocess if requested.
-            # Note that preprocessing should happen per-file as order may matter.
-            if preprocess:
-                _dataset = self.preprocess(_dataset, mode, hparams, interleave=shuffle_files)
-            return _dataset
+            return _filter_and_preprocess(_dataset)
 
         if len(data_files) < num_partitions:
             raise ValueError(
@@ -510,14 +1811,18 @@ class GoProblem(problem.Problem):
         if shuffle_files:
             random.shuffle(data_files)
 
-        dataset = tf.data.Dataset.from_tensor_slices(tf.constant(data_files))
-        # Create data-set from files by parsing, pre-processing and interleaving.
-        if shuffle_files:
-            dataset = dataset.apply(
-                tf.contrib.data.parallel_interleave(
-                    _load_records_and_preprocess, sloppy=True, cycle_length=8))
+        if self.sample_positions and is_training and preprocess:
+            # draw single positions from the files instead of reading them sequentially
+            dataset = self.position_dataset(data_files, mode, hparams, num_threads)
         else:
-            dataset = _load_records_and_preprocess(dataset)
+            dataset = tf.data.Dataset.from_tensor_slices(tf.constant(data_files))
+            # Create data-set from files by parsing, pre-processing and interleaving.
+            if shuffle_files:
+                dataset = dataset.apply(
+                    tf.contrib.data.parallel_interleave(
+                        _load_records_and_preprocess, sloppy=True, cycle_length=8))
+            else:
+                dataset = _load_records_and_preprocess(dataset)
 
         dataset = dataset.take(max_records)
         if output_buffer_size:
@@ -525,6 +1830,116 @@ class GoProblem(problem.Problem):
 
         return dataset
 
+    def npy_dataset(self, data_dir, dataset_split, shuffle=False, partition_id=0, num_partitions=1):
+        """Dataset of the decoded games of the numpy game store of a split, see npy_utils.
+
+        The games are sliced from the memory mapped arrays, so the examples are identical to the decoded records
+        of the TFRecord files without parsing them.
+
+        Args:
+            data_dir: (str), data directory of the stores
+            dataset_split: DatasetSplit, which split to read
+            shuffle: (bool), reads the games in a new random order every pass instead of the stored order
+            partition_id: integer - which partition of the games to read
+            num_partitions: how many partitions of the games
+        Returns:
+            Dataset of decoded examples, see decode_example
+        """
+        store_dir = self.npy_dirpath(data_dir, dataset_split)
+        tf.logging.info("Reading numpy game store from %s", store_dir)
+        store = npy_utils.GameStore(store_dir)
+
+        games = np.arange(store.num_games)[partition_id::num_partitions]
+        tf.logging.info("partition: %d num_games: %d" % (partition_id, len(games)))
+
+        def _generator():
+            for i in (np.random.permutation(games) if shuffle else games):
+                game = store.game(i)
+                game['p_targets'] = game['p_targets'].astype(np.int64)
+                yield game
+
+        output_types = {
+            'inputs': tf.int8,
+            'legal_moves': tf.uint8,
+            'p_targets': tf.int64,
+            'to_play': tf.int8,
+            'game_length': tf.int64,
+            'winner': tf.int64,
+            'dataset_name': tf.string,
+            'aux_planes': tf.uint8,
+        }
+        output_shapes = {
+            'inputs': tf.TensorShape([None, self.board_size, self.board_size]),
+            'legal_moves': tf.TensorShape([None, self.num_moves]),
+            'p_targets': tf.TensorShape([None]),
+            'to_play': tf.TensorShape([None]),
+            'game_length': tf.TensorShape([]),
+            'winner': tf.TensorShape([]),
+            'dataset_name': tf.TensorShape([]),
+            'aux_planes': tf.TensorShape([None, len(record_utils.AUX_PLANES), self.board_size, self.board_size]),
+        }
+        return tf.data.Dataset.from_generator(_generator, output_types, output_shapes)
+
+    def position_dataset(self, data_files, mode, hparams, num_threads=None):
+        """Dataset of single CNN positions drawn uniformly from all positions of the data files.
+
+        A sampler_utils.PositionSampler seeks straight to the records of the drawn games with the sidecar indices,
+        so consecutive positions come from different games without a shuffle buffer. Every pass over the dataset
+        draws as many positions as the data files contain. The games are filtered by min_length and max_length
+        and only the first min_length positions are used if split_to_min_length, like in dataset and
+        preprocess_example.
+
+        Args:
+            data_files: list of (str), paths of the uncompressed data files
+            mode: tf.estimator.ModeKeys, random augmentation in TRAIN mode
+            hparams: tf.contrib.training.HParams
+            num_threads: int, number of threads to use for the decode and preprocess Dataset.map call
+        Returns:
+            Dataset of single positions, see go_preprocessing.sample_position_cnn
+        Raises:
+            ValueError: if the data files are compressed, their records can't be read at a byte offset
+        """
+        if self.compression:
+            raise ValueError("Sampling positions needs uncompressed data files, but the compression is '{}'"
+                             .format(self.compression))
+
+        min_length, max_length = 0, 0
+        if hasattr(hparams, "min_length") and hasattr(hparams, "max_length") and hparams.max_length:
+            min_length, max_length = hparams.min_length, hparams.max_length
+        split = hasattr(hparams, "split_to_min_length") and hparams.split_to_min_length
+
+        sampler = sampler_utils.PositionSampler(data_files, min_length, max_length,
+                                                max_positions=hparams.min_length if split else 0,
+                                                num_threads=self.sample_threads)
+        tf.logging.info("Sampling {} positions of {} games per epoch".format(sampler.num_positions,
+                                                                             sampler.num_games))
+
+        def _decode_and_preprocess(record, position):
+            example = self.decode_example(record)
+            aux_planes = example.pop("aux_planes")
+            if split:
+                example["game_length"] = tf.constant(hparams.min_length, tf.int64)
+
+            example = go_preprocessing.sample_position_cnn(example, position, hparams)
+            if self.use_aux_planes:
+                example = go_preprocessing.append_aux_planes(example, aux_planes[position])
+
+            example["inputs"].set_shape([hparams.history_length * 2 + 1 + hparams.num_aux_planes,
+                                         self.board_size, self.board_size])
+            example["legal_moves"].set_shape([self.num_moves])
+
+            example["inputs"] = tf.cast(example["inputs"], tf.float32)
+            example["legal_moves"] = tf.cast(example["legal_moves"], tf.float32)
+            example["v_targets"] = tf.cast(example["v_targets"], tf.float32)
+
+            if mode == tf.estimator.ModeKeys.TRAIN:
+                example = go_preprocessing.random_augmentation(example, self.board_size, "cnn")
+            return example
+
+        dataset = tf.data.Dataset.from_generator(sampler, (tf.string, tf.int64),
+                                                 (tf.TensorShape([]), tf.TensorShape([])))
+        return dataset.map(_decode_and_preprocess, num_parallel_calls=num_threads)
+
     def input_fn(self,
                  mode,
                  hparams,
@@ -632,3 +2047,53 @@ class NumpyHandler(tf.contrib.slim.tfexample_decoder.ItemHandler):
         array = tf.reshape(array, self._shape)
 
         return array
+
+
+class LegalMovesHandler(tf.contrib.slim.tfexample_decoder.ItemHandler):
+    def __init__(self, board_size):
+        """Initializes the legal_moves Handler, decodes legal_moves in the encoding stored in legal_moves_encoding.
+        Args:
+            board_size: board size of the go game.
+        """
+        super(LegalMovesHandler, self).__init__(['legal_moves', 'legal_moves_encoding',
+                                                 'positions', 'positions_encoding', 'game_length'])
+        self._positions_handler = PositionsHandler(board_size)
+        self._board_size = board_size
+
+    def tensors_to_item(self, keys_to_tensors):
+        """See base class."""
+        return record_utils.decode_legal_moves(keys_to_tensors['legal_moves'],
+                                               keys_to_tensors['legal_moves_encoding'],
+                                               self._board_size * self._board_size + 1,
+                                               lambda: self._positions_handler.tensors_to_item(keys_to_tensors))
+
+
+class PositionsHandler(tf.contrib.slim.tfexample_decoder.ItemHandler):
+    def __init__(self, board_size):
+        """Initializes the positions Handler, decodes positions in the encoding stored in positions_encoding.
+        Args:
+            board_size: board size of the go game.
+        """
+        super(PositionsHandler, self).__init__(['positions', 'positions_encoding', 'game_length'])
+        self._board_size = board_size
+
+    def tensors_to_item(self, keys_to_tensors):
+        """See base class."""
+        return record_utils.decode_positions(keys_to_tensors['positions'],
+                                             keys_to_tensors['positions_encoding'],
+                                             keys_to_tensors['game_length'],
+                                             self._board_size)
+
+
+class AuxPlanesHandler(tf.contrib.slim.tfexample_decoder.ItemHandler):
+    def __init__(self, board_size):
+        """Initializes the aux_planes Handler, unpacks the bit-packed auxiliary feature planes.
+        Args:
+            board_size: board size of the go game.
+        """
+        super(AuxPlanesHandler, self).__init__(['aux_planes'])
+        self._board_size = board_size
+
+    def tensors_to_item(self, keys_to_tensors):
+        """See base class."""
+        return record_utils.decode_aux_planes(keys_to_tensors['aux_planes'], self._board_size)
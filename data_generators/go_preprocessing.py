@@ -1,5 +1,7 @@
 import tensorflow as tf
 
+from go_game import coordinates
+
 
 def format_example_rnn(example):
     """Function that prepares example for input into a RNN.
@@ -207,6 +209,41 @@ def format_example_cnn(example, hp):
     return example
 
 
+def append_aux_planes(example, aux_planes):
+    """Appends the auxiliary feature planes [..., num_aux_planes, board_size, board_size] to the formatted inputs
+    [..., channels, board_size, board_size] of a game or a position, see record_utils.AUX_PLANES."""
+    inputs = example["inputs"]
+    example["inputs"] = tf.concat([inputs, tf.cast(aux_planes, inputs.dtype)], axis=-3)
+    return example
+
+
+def sample_position_cnn(example, position, hp):
+    """Prepares a single position of the game for input into a CNN, see format_example_cnn.
+
+    Only the window of the last history_length positions up to the position is formatted instead of the whole game,
+    the missing history at the start of the game is padded with zeros like in format_example_cnn.
+
+    Returns the example of the position like the ones of build_dataset_cnn:
+        inputs [history_length*2+1, board_size, board_size], legal_moves [num_moves] and the scalars p_targets,
+        v_targets, game_length and dataset_name
+    """
+    start = tf.maximum(position - (hp.history_length - 1), 0)
+
+    window = {
+        "inputs": example["inputs"][start:position + 1],
+        "to_play": example.pop("to_play")[start:position + 1],
+        "winner": example.pop("winner")
+    }
+    window = format_example_cnn(window, hp)
+
+    example["inputs"] = window["inputs"][-1]
+    example["v_targets"] = window["v_targets"][-1]
+    example["legal_moves"] = example["legal_moves"][position]
+    example["p_targets"] = example["p_targets"][position]
+
+    return example
+
+
 def build_dataset_cnn(example):
     """Splits all positions in the game into separate examples."""
     game_length = example["game_length"]
@@ -233,6 +270,77 @@ def build_dataset_cnn(example):
     return dataset
 
 
+def symmetry_tables(board_size):
+    """Returns the symmetry permutations of go_game.coordinates as int64 constants.
+
+    Returns:
+        permutations: (tf.Tensor) [8, num_moves], gathers flat arrays (legal_moves, policies) into the symmetry
+        inverse_permutations: (tf.Tensor) [8, num_moves], maps flat move indices (p_targets) into the symmetry
+    """
+    permutations, inverse_permutations = coordinates.symmetry_permutations(board_size)
+
+    permutations = tf.constant(permutations, dtype=tf.int64, name="symmetry_permutations")
+    inverse_permutations = tf.constant(inverse_permutations, dtype=tf.int64, name="symmetry_inverse_permutations")
+
+    return permutations, inverse_permutations
+
+
+def apply_symmetry(example, k, board_size, mode="rnn"):
+    """Applies the k-th board symmetry to the inputs, legal_moves and p_targets of the example.
+
+    Every field is transformed by a single gather over the flat board indices.
+
+    Args:
+        example: (dict), go game
+        k: (tf.Tensor) int64 scalar in [0, 8), symmetry index as in random_augmentation
+        board_size: (int), board size
+        mode: (str), rnn or cnn, only needed if the example doesnt have the dimension game_length
+    Return:
+        Transformed example
+    """
+    assert mode in ["rnn", "cnn"]
+
+    flat_board = board_size * board_size
+    # axis of the flat board in legal_moves and in the reshaped inputs
+    axis = 1 if mode == "rnn" else 0
+
+    permutations, inverse_permutations = symmetry_tables(board_size)
+    permutation = tf.gather(permutations, k)
+    inverse_permutation = tf.gather(inverse_permutations, k)
+
+    inputs = tf.convert_to_tensor(example["inputs"], name='inputs')
+    legal_moves = tf.convert_to_tensor(example["legal_moves"], name='legal_moves')
+    p_targets = tf.convert_to_tensor(example["p_targets"], name='p_targets')
+
+    # flatten the last 2 axes of the inputs to gather the board points
+    inputs_shape = tf.shape(inputs)
+    flat_inputs = tf.reshape(inputs, tf.concat([inputs_shape[:-2], [flat_board]], 0))
+    flat_inputs = tf.gather(flat_inputs, permutation[:flat_board], axis=axis + 1)
+    example["inputs"] = tf.reshape(flat_inputs, inputs_shape)
+
+    example["legal_moves"] = tf.gather(legal_moves, permutation, axis=axis)
+
+    p_targets_dtype = p_targets.dtype
+    p_targets = tf.gather(inverse_permutation, p_targets)
+    example["p_targets"] = tf.cast(p_targets, p_targets_dtype)
+
+    return example
+
+
+def invert_policy_symmetry(policy, k, board_size):
+    """Maps a policy [..., num_moves] predicted on the k-th symmetry of a board back to the original board.
+
+    Averaging the inverted policies of all 8 symmetries gives the symmetry averaged policy at inference.
+    """
+    _, inverse_permutations = symmetry_tables(board_size)
+    inverse_permutation = tf.gather(inverse_permutations, k)
+
+    policy = tf.convert_to_tensor(policy, name='policy')
+    axis = policy.shape.ndims - 1
+
+    return tf.gather(policy, inverse_permutation, axis=axis)
+
+
 def random_augmentation(example, board_size, mode="rnn"):
     """Perform a random rotation/flip on the example.
 
@@ -250,6 +358,8 @@ def random_augmentation(example, board_size, mode="rnn"):
     * flip along diagonal axis from the upper left
     * flip along diagonal axis from the upper right
 
+    The transformations are precomputed permutations of the flat board indices, see apply_symmetry.
+
     Args:
         example: (dict), go game
         board_size: (int), board size
@@ -257,109 +367,6 @@ def random_augmentation(example, board_size, mode="rnn"):
     Return:
         Randomly augmented example
     """
-    assert mode in ["rnn", "cnn"]
-
-    flat_board = board_size * board_size
-    num_moves = flat_board + 1
+    rand_k = tf.random_uniform([], int(0), int(coordinates.NUM_SYMMETRIES), tf.int64, name="rand_k")
 
-    inputs = example["inputs"]
-    legal_moves = example["legal_moves"]
-    p_targets = example["p_targets"]
-
-    inputs = tf.convert_to_tensor(inputs, name='inputs')
-    legal_moves = tf.convert_to_tensor(legal_moves, name='legal_moves')
-    p_targets = tf.convert_to_tensor(p_targets, name='p_targets')
-
-    rand_k = tf.random_uniform([], int(0), int(8), tf.int64, name="rand_k")
-
-    for name, array in [["inputs", inputs], ["legal_moves", legal_moves], ["p_targets", p_targets]]:
-        split = name != "inputs"
-        split_p = name == "p_targets"
-
-        if mode == "cnn":
-            array = tf.expand_dims(array, axis=0)
-
-        if split:
-            if split_p:
-                # convert p_target index to one hot
-                array = tf.one_hot(array, num_moves)
-
-            # split array into a flat board and one int representing the pass move
-            array, rest = tf.split(array, [flat_board, 1], 1)
-            # reshape to boards
-            array = tf.reshape(array, [-1, board_size, board_size])
-
-            # need to transpose last 2 axes
-            perm = [0, 2, 1]
-        else:
-            # need to transpose last 2 axes
-            perm = [0, 1, 3, 2]
-
-        scope = ""
-
-        def _no_aug():
-            nonlocal scope
-            scope = "no_augmentation"
-            return array
-
-        def _rot90():
-            nonlocal scope
-            scope = "rot_90_counter"
-            return tf.transpose(tf.reverse(array, [-1]), perm)
-
-        def _rot180():
-            nonlocal scope
-            scope = "rot_180_counter"
-            return tf.reverse(array, [-1, -2])
-
-        def _rot270():
-            nonlocal scope
-            scope = "rot_270_counter"
-            return tf.reverse(tf.transpose(array, perm), [-1])
-
-        def _flip_left_right():
-            nonlocal scope
-            scope = "flip_left_right"
-            return tf.reverse(array, [-1])
-
-        def _flip_up_down():
-            nonlocal scope
-            scope = "flip_up_down"
-            return tf.reverse(array, [-2])
-
-        def _flip_diagonal_upper_left():
-            nonlocal scope
-            scope = "flip_diagonal_upper_left"
-            return tf.transpose(array, perm)
-
-        def _flip_diagonal_upper_right():
-            nonlocal scope
-            scope = "flip_diagonal_upper_right"
-            return tf.transpose(tf.reverse(array, [-1, -2]), perm)
-
-        cases = [
-            (tf.equal(rand_k, 0), _no_aug),
-            (tf.equal(rand_k, 1), _rot90),
-            (tf.equal(rand_k, 2), _rot180),
-            (tf.equal(rand_k, 3), _rot270),
-            (tf.equal(rand_k, 4), _flip_left_right),
-            (tf.equal(rand_k, 5), _flip_up_down),
-            (tf.equal(rand_k, 6), _flip_diagonal_upper_left),
-            (tf.equal(rand_k, 7), _flip_diagonal_upper_right)
-        ]
-
-        result = tf.case(cases, name=scope)
-
-        if split:
-            # reassemble the original shape from combined result tensor and rest tensor
-            result = tf.reshape(result, [-1, flat_board])
-            result = tf.concat([result, rest], 1)
-            if split_p:
-                result = tf.argmax(result, 1)
-
-        if mode == "cnn":
-            result = tf.squeeze(result, axis=[0])
-
-        example[name] = result
-
-    return example
+    return apply_symmetry(example, rand_k, board_size, mode)
@@ -20,10 +20,14 @@ class GoProblem19Small(base_go_problem.GoProblem):
         elif self.use_gogod_data:
             fn += "_gogod"
 
+        # compressed files have the lower case compression type as suffix, see GoProblem.dataset_filename
+        if self.compression:
+            fn += "_" + self.compression.lower()
+
         return fn
 
     @property
-    def train_shards(self):
+    def default_train_shards(self):
         return 1
 
     @property
@@ -71,23 +75,16 @@ class GoProblem19SmallRnn(GoProblem19Small):
         1. if split_to_min_length is True in hparams:
             only use the first min_length number of positions
 
-        2. prepare inputs for RNN
+        2. prepare inputs for RNN, if use_aux_planes is True in hparams:
+            append the auxiliary feature planes to the inputs, see format_inputs
 
         3. if sort_sequence_by_color is True in hparams:
             split game into 2 sequences (all black and all white positions)
 
         4. randomly augment the example
         """
-        if hasattr(hparams, "split_to_min_length") and hparams.split_to_min_length:
-            example["game_length"] = tf.constant(hparams.min_length, tf.int64)
-            example["inputs"] = example["inputs"][:hparams.min_length]
-            example["to_play"] = example["to_play"][:hparams.min_length]
-            example["p_targets"] = example["p_targets"][:hparams.min_length]
-            example["legal_moves"] = example["legal_moves"][:hparams.min_length]
-
-        example = go_preprocessing.format_example_rnn(example)
+        example = self.format_inputs(example, hparams)
 
-        example["inputs"].set_shape([None, 3, self.board_size, self.board_size])
         example["legal_moves"].set_shape([None, self.num_moves])
         example["p_targets"].set_shape([None])
         example["v_targets"].set_shape([None])
@@ -129,23 +126,16 @@ class GoProblem19SmallCnn(GoProblem19Small):
         1. if split_to_min_length is True in hparams:
             only use the first min_length number of positions
 
-        2. prepare inputs for CNN
+        2. prepare inputs for CNN, if use_aux_planes is True in hparams:
+            append the auxiliary feature planes to the inputs, see format_inputs
 
         3. split the game into separate examples
 
         4. randomly augment the examples individually
         """
-        if hasattr(hparams, "split_to_min_length") and hparams.split_to_min_length:
-            example["game_length"] = tf.constant(hparams.min_length, tf.int64)
-            example["inputs"] = example["inputs"][:hparams.min_length]
-            example["to_play"] = example["to_play"][:hparams.min_length]
-            example["p_targets"] = example["p_targets"][:hparams.min_length]
-            example["legal_moves"] = example["legal_moves"][:hparams.min_length]
-
-        example = go_preprocessing.format_example_cnn(example, hparams)
+        example = self.format_inputs(example, hparams)
         example.pop("to_play")
 
-        example["inputs"].set_shape([None, hparams.history_length * 2 + 1, self.board_size, self.board_size])
         example["legal_moves"].set_shape([None, self.num_moves])
 
         example["inputs"] = tf.cast(example["inputs"], tf.float32)
@@ -1,89 +1,196 @@
 from data_generators import base_go_problem
 from go_game import go
-from utils import sgf_utils
-
-import numpy as np
+from utils import archive_utils, index_utils, quarantine_utils, sgf_utils
 
+import multiprocessing
 import argparse
+import json
 import sys
 import os
 
+VERDICT_CACHE_FILENAME = "bad_files_cache.json"
+REPORT_FILENAME = "bad_files_report.json"
+
+VERDICT_OK = "ok"
+VERDICT_NO_MOVES = "no-moves"
+VERDICT_ILLEGAL_MOVE = "illegal-move"
+VERDICT_PARSE_ERROR = "parse-error"
+BAD_VERDICTS = [VERDICT_NO_MOVES, VERDICT_ILLEGAL_MOVE, VERDICT_PARSE_ERROR]
+
+
+def remove_bad_files(tmp_dir, board_size, num_workers=1, chunk_size=64, remove=False, report_path=None,
+                     quarantine=True, from_archives=False):
+    """Scans all GoGoD and KGS sgf files, writes a JSON report of the bad files, quarantines and removes them.
 
-def remove_bad_files(tmp_dir, board_size):
-    # search all sgf files in the gogod dataset
-    filenames = base_go_problem.get_gogod_filenames(tmp_dir, board_size)
-    print(len(filenames))
-    bad_files = find_bad_files(filenames)
+    Args:
+        tmp_dir: (str), tmp directory containing the unzipped sgf files or the archives
+        board_size: (int), board size of the sgf files
+        num_workers: (int), number of processes checking sgf files
+        chunk_size: (int), number of sgf files sent to a process at once
+        remove: (bool), True removes the bad files, False keeps them and None asks before removing them
+        report_path: (str) optional, path of the JSON report, defaults to tmp_dir/bad_files_report.json
+        quarantine: (bool), writes the bad files to the quarantine manifest of tmp_dir, see quarantine_utils
+        from_archives: (bool), scans the sgf files inside the GoGoD zip and KGS tar.gz archives
+    Returns:
+        dict, the report
+    """
+    if from_archives:
+        if remove:
+            raise ValueError("Files inside the archives can't be removed, quarantine them instead")
+        get_gogod_filenames = base_go_problem.get_gogod_archive_filenames
+        get_kgs_filenames = base_go_problem.get_kgs_archive_filenames
+    else:
+        get_gogod_filenames = base_go_problem.get_gogod_filenames
+        get_kgs_filenames = base_go_problem.get_kgs_filenames
 
+    # search all sgf files in the gogod dataset, including the already quarantined files
+    filenames = get_gogod_filenames(tmp_dir, board_size, skip_quarantined=False)
     if board_size == 19:
         # search all sgf files in the kgs dataset
-        kgs_files = base_go_problem.get_kgs_filenames(tmp_dir)
-        print(len(kgs_files))
-        kgs_bad = find_bad_files(kgs_files)
-        bad_files += kgs_bad
+        filenames += get_kgs_filenames(tmp_dir, skip_quarantined=False)
+    print("Checking {} sgf files".format(len(filenames)))
 
-    to_string = "\n".join("- {}".format(file) for file in bad_files)
-    question = "Bad Filenames:\n{}".format(to_string)
-    question += "\nDo you want to remove {} bad sgf files?".format(len(bad_files))
+    verdicts = find_bad_files(tmp_dir, filenames, num_workers, chunk_size)
 
-    remove = query_yes_no(question, None)
+    bad_files = {verdict: [] for verdict in BAD_VERDICTS}
+    for filename in filenames:
+        if verdicts[filename] != VERDICT_OK:
+            bad_files[verdicts[filename]].append(filename)
+    num_bad = sum(len(files) for files in bad_files.values())
+
+    if remove is None and num_bad:
+        to_string = "\n".join("- {} ({})".format(file, verdict)
+                              for verdict, files in bad_files.items() for file in files)
+        question = "Bad Filenames:\n{}".format(to_string)
+        question += "\nDo you want to remove {} bad sgf files?".format(num_bad)
+        remove = query_yes_no(question, None)
 
+    if quarantine:
+        quarantine_utils.save_quarantine(tmp_dir, {filename: verdicts[filename] for verdict in BAD_VERDICTS
+                                                   for filename in bad_files[verdict]}, filenames)
+
+    removed = []
     if remove:
-        out_file = os.path.join(tmp_dir, "deleted_files.txt")
-        with open(out_file, 'w') as f:
-            for file in bad_files:
+        for verdict in BAD_VERDICTS:
+            for file in bad_files[verdict]:
                 os.remove(file)
-                f.write(file + '\n')
+                removed.append(file)
 
+    report = {
+        'tmp_dir': tmp_dir,
+        'board_size': board_size,
+        'num_files': len(filenames),
+        'counts': {verdict: list(verdicts.values()).count(verdict) for verdict in [VERDICT_OK] + BAD_VERDICTS},
+        'bad_files': bad_files,
+        'quarantined': quarantine,
+        'removed': removed
+    }
 
-def find_bad_files(filenames):
-    bad_files = []
-    for filename in filenames:
-        out = test_sgf(filename)
-        if out is None:
-            bad_files.append(filename)
-    return bad_files
+    report_path = report_path or os.path.join(tmp_dir, REPORT_FILENAME)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print("Found {} bad of {} sgf files, removed {}, report written to '{}'"
+          .format(num_bad, len(filenames), len(removed), report_path))
 
+    return report
 
-def test_sgf(filename):
-    """Parses a sgf file to a game dict.
+
+def find_bad_files(tmp_dir, filenames, num_workers=1, chunk_size=64):
+    """Checks sgf files in parallel, reusing the cached verdicts of unchanged files.
+
+    The verdict cache tmp_dir/bad_files_cache.json maps the path to the size, modification time and verdict of
+    every checked file, so reruns only check new or changed files.
 
     Args:
-        filename: str, path of the sgf file
+        tmp_dir: (str), directory of the verdict cache
+        filenames: list of (str), paths of the sgf files
+        num_workers: (int), number of processes checking sgf files, serial if <= 1
+        chunk_size: (int), number of sgf files sent to a process at once
     Returns:
-        None if one of these to Errors occurs:
-        * sgf contains no moves, affects about 1% of files in KGS dataset
-        * move in the sgf breaks the minigo ko rule, affects about 1% of files in GoGoD dataset
+        dict<str, str> filename -> verdict, one of 'ok', 'no-moves', 'illegal-move' or 'parse-error'
     """
-    sgf_board, plays, _ = sgf_utils.read_sgf(filename)
+    cache_path = os.path.join(tmp_dir, VERDICT_CACHE_FILENAME)
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+
+    verdicts = {}
+    tasks = []
+    for filename in filenames:
+        size, mtime = index_utils.file_stat(filename)
+        cached = cache.get(filename)
+        if cached is not None and cached[0] == size and cached[1] == mtime:
+            verdicts[filename] = cached[2]
+        else:
+            tasks.append(filename)
+    print("Checking {} new or changed sgf files, reusing {} cached verdicts".format(len(tasks), len(verdicts)))
+
+    # the archive members are read once by this process and streamed to the workers
+    sgf_tasks = archive_utils.read_members(tasks)
+    if num_workers > 1 and len(tasks) > chunk_size:
+        # the processes must not share the file handles of opened zip archives
+        archive_utils.close_archives()
+        with multiprocessing.Pool(num_workers) as pool:
+            results = list(pool.imap(_check_sgf_task, sgf_tasks, chunksize=chunk_size))
+    else:
+        results = [_check_sgf_task(task) for task in sgf_tasks]
+
+    for filename, verdict in zip(tasks, results):
+        verdicts[filename] = verdict
+        cache[filename] = list(index_utils.file_stat(filename)) + [verdict]
+
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+    return verdicts
+
 
-    board_size = sgf_board.side
-    go.set_board_size(board_size)
+def _check_sgf_task(task):
+    """Checks the sgf file of a (filename, sgf_src) task, see check_sgf."""
+    return check_sgf(*task)
 
-    assert board_size == go.BOARD_SIZE, "Wrong Board Size in SGF"
 
-    np_board = np.array(sgf_board.board)
+def check_sgf(filename, sgf_src=None):
+    """Replays a sgf file and checks that it can be used to generate a game.
 
-    initial_board = sgf_utils._prep_board(np_board)
-    plays = sgf_utils._prep_plays(plays)
+    Args:
+        filename: str, path of the sgf file
+        sgf_src: (bytes) optional, content of the sgf file, read from filename if None
+    Returns:
+        'ok' if the game can be replayed, else one of these errors:
+        * 'parse-error': the sgf can't be read
+        * 'no-moves': sgf contains no moves, affects about 1% of files in KGS dataset
+        * 'illegal-move': move in the sgf breaks the minigo ko rule, affects about 1% of files in GoGoD dataset
+    """
+    try:
+        if sgf_src is None:
+            sgf_src = sgf_utils.read_sgf_bytes(filename)
+        sgf_game = sgf_utils.read_game(sgf_src)
+    except Exception:
+        return VERDICT_PARSE_ERROR
+
+    go.set_board_size(sgf_game.board_size)
+
+    initial_board = sgf_utils._prep_setup(sgf_game.setup_black, sgf_game.setup_white)
+    plays = sgf_utils._prep_plays(sgf_game.plays)
 
     try:
         first_player = sgf_utils._get_first_player(plays)
     except IndexError:
-        print("Skipped reading Go game from sgf '{}' because no moves were found!".format(filename))
-        return None
+        return VERDICT_NO_MOVES
 
     go_game = go.GoEnvironment(None, initial_board, to_play=first_player)
 
-    for i, play in enumerate(plays):
-        colour, move = play
+    for colour, move in plays:
         try:
             go_game.play_move(move, colour, True)
         except go.IllegalMove:
-            print("Skipped reading Go game from sgf '{}' because IllegalMove error occurred!".format(filename))
-            return None
+            return VERDICT_ILLEGAL_MOVE
 
-    return True
+    return VERDICT_OK
 
 
 def query_yes_no(question, default="yes"):
@@ -124,11 +231,31 @@ parser.add_argument('--tmp_dir',
                     help="Tmp directory containing the sgf files", required=True, type=str)
 parser.add_argument('--board_size',
                     help="Board sizes of the sgf files", required=True, type=int)
+parser.add_argument('--num_workers',
+                    help="Number of processes checking sgf files", default=multiprocessing.cpu_count(), type=int)
+parser.add_argument('--chunk_size',
+                    help="Number of sgf files sent to a process at once", default=64, type=int)
+parser.add_argument('--from_archives', action='store_true',
+                    help="Scan the sgf files inside the GoGoD zip and KGS tar.gz archives in tmp_dir")
+parser.add_argument('--remove', action='store_true',
+                    help="Remove the bad files after asking, they are only quarantined by default")
+parser.add_argument('--report',
+                    help="Path of the JSON report, defaults to tmp_dir/bad_files_report.json", default=None, type=str)
+mode = parser.add_mutually_exclusive_group()
+mode.add_argument('--yes', action='store_true',
+                  help="Remove the bad files without asking if --remove is set")
+mode.add_argument('--dry-run', dest='dry_run', action='store_true',
+                  help="Only write the report, don't quarantine or remove any files")
 
 if __name__ == '__main__':
     args = parser.parse_args()
 
-    tmp_dir = args.tmp_dir
-    board_size = args.board_size
+    if not args.remove or args.dry_run:
+        remove = False
+    elif args.yes:
+        remove = True
+    else:
+        remove = None
 
-    find_bad_files(tmp_dir, board_size)
+    remove_bad_files(args.tmp_dir, args.board_size, args.num_workers, args.chunk_size, remove, args.report,
+                     quarantine=not args.dry_run, from_archives=args.from_archives)
@@ -0,0 +1,60 @@
+import tensorflow as tf
+
+from data_generators import get_problem_class
+from hparams import get_hparams
+
+import argparse
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--problem',
+                    help="Problem to use", default="GoProblem19Cnn", type=str)
+parser.add_argument('--hparams',
+                    help="Hyper parameters to use", default="go_hparams_19_cnn", type=str)
+parser.add_argument('--data_dir',
+                    help="Data directory of the TFRecord files, defaults to the data_dir of the hparams", type=str)
+parser.add_argument('--tmp_dir',
+                    help="Directory of the sgf files, defaults to the tmp_dir of the hparams", type=str)
+parser.add_argument('--task_id',
+                    help="Generates only the shards of this task, -1 generates all shards", default=-1, type=int)
+parser.add_argument('--num_tasks',
+                    help="Number of tasks generating the dataset together", default=1, type=int)
+parser.add_argument('--prepare', action='store_true', default=False,
+                    help="Extracts the archives and builds the sgf index in tmp_dir before the tasks start")
+parser.add_argument('--merge', action='store_true', default=False,
+                    help="Checks and merges the shards of all num_tasks tasks and builds the dataset stats")
+
+if __name__ == '__main__':
+    """Generates the dataset of a problem, optionally split into tasks run by independent processes or machines
+    sharing the data and tmp directory, e.g.
+
+    python generate_data.py --prepare
+    python generate_data.py --task_id 0 --num_tasks 2 & python generate_data.py --task_id 1 --num_tasks 2; wait
+    python generate_data.py --num_tasks 2 --merge
+    """
+    args = parser.parse_args()
+    tf.logging.set_verbosity(tf.logging.INFO)
+
+    if not -1 <= args.task_id < args.num_tasks:
+        parser.error("--task_id must be -1 or in [0, num_tasks)")
+
+    hparams = get_hparams(args.hparams)()
+    if args.data_dir:
+        hparams.set_hparam('data_dir', args.data_dir)
+    if args.tmp_dir:
+        hparams.set_hparam('tmp_dir', args.tmp_dir)
+    data_dir, tmp_dir = hparams.data_dir, hparams.tmp_dir
+
+    # set up the problem without get_hparams, which already reads the dataset stats
+    problem = get_problem_class(args.problem)()
+    problem.read_hparams(hparams)
+
+    if args.prepare:
+        problem.prepare_data(tmp_dir)
+    elif args.merge:
+        problem.merge_data(data_dir, args.num_tasks)
+
+        # only builds the dataset stats of the merged dataset, read_hparams can be called again
+        problem.get_hparams(hparams)
+    else:
+        tf.gfile.MakeDirs(data_dir)
+        problem.generate_data(data_dir, tmp_dir, args.task_id, args.num_tasks)
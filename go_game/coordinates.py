@@ -37,14 +37,35 @@ flat            0               18              361
 SGF             'aa'            'sa'            ''
 KGS             'A19'           'T19'           'pass'
 sgfmill         (18, 0)         (18, 18)        None
+Symmetry: One of the 8 dihedral transformations of the board, indexed by k in
+    the same order as go_preprocessing.random_augmentation. Flattened symmetry
+    permutations keep the pass move N^2 fixed.
 """
 
+import numpy as np
+
 from go_game import go
 
 # We provide more than 19 entries here in case of boards larger than 19 x 19.
 _SGF_COLUMNS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
 _KGS_COLUMNS = 'ABCDEFGHJKLMNOPQRSTUVWXYZ'
 
+# The 8 dihedral transformations of a [board_size, board_size] board, indexed as in random_augmentation.
+_SYMMETRIES = [
+    lambda board: board,                   # no augmentation
+    lambda board: np.fliplr(board).T,      # rotate 90° counter clockwise
+    lambda board: board[::-1, ::-1],       # rotate 180° counter clockwise
+    lambda board: board.T[:, ::-1],        # rotate 270° counter clockwise
+    lambda board: board[:, ::-1],          # flip along vertical axis
+    lambda board: board[::-1, :],          # flip along horizontal axis
+    lambda board: board.T,                 # flip along diagonal axis from the upper left
+    lambda board: board[::-1, ::-1].T,     # flip along diagonal axis from the upper right
+]
+NUM_SYMMETRIES = len(_SYMMETRIES)
+
+# board_size -> (permutations, inverse_permutations), both np.array [NUM_SYMMETRIES, board_size * board_size + 1]
+_SYMMETRY_PERMUTATIONS = {}
+
 
 def from_flat(flat):
     """Converts from a flattened coordinate to a MiniGo coordinate."""
@@ -112,3 +133,49 @@ def to_sgfmill(coord):
     row = go.BOARD_SIZE - 1 - row
 
     return row, col
+
+
+def symmetry_permutations(board_size=None):
+    """Returns the flat index permutations of the 8 board symmetries, computed once per board size.
+
+    For a flat array x with board_size * board_size + 1 entries (e.g. legal_moves or a policy), the k-th
+    transformed array is x[permutations[k]]. A flat move index t (e.g. a p_target) is mapped to
+    inverse_permutations[k][t]. The pass move is always mapped to itself.
+
+    Args:
+        board_size: (int), board size, defaults to go.BOARD_SIZE
+    Returns:
+        permutations: np.array [NUM_SYMMETRIES, board_size * board_size + 1] of int64
+        inverse_permutations: np.array [NUM_SYMMETRIES, board_size * board_size + 1] of int64
+    """
+    if board_size is None:
+        board_size = go.BOARD_SIZE
+
+    if board_size not in _SYMMETRY_PERMUTATIONS:
+        flat_board = board_size * board_size
+        indices = np.arange(flat_board, dtype=np.int64).reshape([board_size, board_size])
+
+        permutations = np.zeros([NUM_SYMMETRIES, flat_board + 1], dtype=np.int64)
+        inverse_permutations = np.zeros_like(permutations)
+        for k, symmetry in enumerate(_SYMMETRIES):
+            permutations[k, :-1] = symmetry(indices).ravel()
+            permutations[k, -1] = flat_board
+            inverse_permutations[k, permutations[k]] = np.arange(flat_board + 1)
+
+        permutations.setflags(write=False)
+        inverse_permutations.setflags(write=False)
+        _SYMMETRY_PERMUTATIONS[board_size] = (permutations, inverse_permutations)
+
+    return _SYMMETRY_PERMUTATIONS[board_size]
+
+
+def apply_symmetry_flat(flat, k, board_size=None):
+    """Applies the k-th symmetry to the last axis of flat arrays with shape [..., board_size * board_size + 1]."""
+    permutations, _ = symmetry_permutations(board_size)
+    return np.take(flat, permutations[k], axis=-1)
+
+
+def apply_symmetry_move(flat_move, k, board_size=None):
+    """Applies the k-th symmetry to flat move indices (int or np.array of ints)."""
+    _, inverse_permutations = symmetry_permutations(board_size)
+    return inverse_permutations[k][flat_move]
@@ -1,5 +1,7 @@
 import tensorflow as tf
 
+from hparams.go_hparams_data import data_generation_hparams
+
 
 def base_go_hparams_cnn():
     """Base CNN hyperparameters for Go Models."""
@@ -10,6 +12,9 @@ def base_go_hparams_cnn():
         use_gogod_data=True,
         use_kgs_data=True,
 
+        # data generation settings
+        **data_generation_hparams(),
+
         # During training, we drop sequences whose inputs and targets are shorter
         # than min_length
         min_length=150,
@@ -20,6 +25,14 @@ def base_go_hparams_cnn():
         # resulting in a history_length*2+1 x board_size x board_size input
         history_length=8,
 
+        # append the stored auxiliary feature planes to the inputs, the records must be generated with aux_planes
+        use_aux_planes=False,
+
+        # train on single positions drawn uniformly from all positions of the uncompressed train shards instead of
+        # splitting whole games into positions, sample_threads threads read the records of the drawn games
+        sample_positions=False,
+        sample_threads=4,
+
         # model settings
         num_filters=256,
         num_res_blocks=9,
@@ -0,0 +1,61 @@
+import multiprocessing
+
+
+def data_generation_hparams():
+    """Data generation settings shared by all Go hyperparameters, see GoProblem.read_hparams.
+
+    The defaults generate the same dataset as the problem without these settings.
+
+    Returns:
+        dict<str, value> of the hparams
+    """
+    return {
+        # number of processes parsing the sgf files, parses serially if <= 1
+        'num_generate_workers': multiprocessing.cpu_count(),
+        # number of sgf files sent to a parsing process at once
+        'generate_chunk_size': 16,
+        # number of train shards, 0 for the default of the problem
+        'train_shards': 0,
+        # number of processes generating whole shards in parallel, one per shard at most, instead of parsing the sgf
+        # files of one shard after the other with num_generate_workers processes
+        'shard_workers': 1,
+        # generate the train, dev and test splits at the same time in separate processes sharing num_generate_workers
+        # and shard_workers
+        'parallel_splits': True,
+        # memory budget in MB of shuffling the generated records across all shards of a split in two passes over
+        # temporary bucket files, 0 to only shuffle the records within every shard in memory
+        'shuffle_memory_mb': 0,
+        # extract the GoGoD and KGS archives to tmp_dir, else reads the sgf files straight from the archives
+        'extract_archives': True,
+        # cache the replayed games by sgf content hash in tmp_dir/game_cache, writes one small file per game
+        'use_game_cache': False,
+        # filter expression over the sgf index in tmp_dir selecting the files to use, e.g.
+        # "(year >= 2000) & (handicap == 0) & (move_count >= 50)", uses all files if empty
+        'sgf_filter': "",
+        # remove duplicate games, including rotated or mirrored copies, within and across GoGoD and KGS, changes the
+        # games of the dataset
+        'remove_duplicates': False,
+        # assign every sgf file to a split by the hash of its name, so adding new sgf files doesn't move games
+        # between the splits, see manifest_utils, changes the splits of the games and is needed by append_data
+        'split_by_hash': False,
+        # only generate the sgf files that are not in the existing dataset yet and add them as new shards
+        'append_data': False,
+        # record encoding of the generated legal_moves, "raw", "packed" with np.packbits (8x smaller) or
+        # "exceptions" storing only the illegal empty points, records of every encoding can be read
+        'legal_moves_encoding': "raw",
+        # record encoding of the generated positions, "raw", "deltas" storing only the changed points per move or
+        # "packed" with 2 bits per point
+        'positions_encoding': "raw",
+        # format of the generated records, "positions" or "moves" storing only the moves, which are replayed
+        # in the input pipeline by replay_workers processes
+        'record_format': "positions",
+        'replay_workers': multiprocessing.cpu_count(),
+        # compression of the TFRecord files, "", "GZIP" or "ZLIB", see benchmark_compression.py
+        'compression': "",
+        # backend the datasets are read from, "tfrecord" or "npy" converting the TFRecord files after generating them
+        # to memory mapped numpy arrays of the decoded games, see npy_utils and convert_to_npy.py
+        'data_backend': "tfrecord",
+        # store the auxiliary feature planes (liberties, atari, ko, last move and captures) of every position bit-packed
+        # in the generated records, see record_utils.AUX_PLANES
+        'aux_planes': False,
+    }
@@ -1,5 +1,7 @@
 import tensorflow as tf
 
+from hparams.go_hparams_data import data_generation_hparams
+
 
 def base_go_hparams_rnn():
     """Base RNN hyperparameters for Go Models."""
@@ -10,10 +12,8 @@ def base_go_hparams_rnn():
         use_gogod_data=True,
         use_kgs_data=True,
 
-        # If this is True and the _problem is recurrent it will split the game
-        # sequence into two sequences, one for all black moves and one for all
-        # white moves
-        sort_sequence_by_color=False,
+        # data generation settings
+        **data_generation_hparams(),
 
         # During training, we drop sequences whose inputs and targets are shorter
         # than min_length
@@ -21,6 +21,9 @@ def base_go_hparams_rnn():
 
         split_to_min_length=False,
 
+        # append the stored auxiliary feature planes to the inputs, the records must be generated with aux_planes
+        use_aux_planes=False,
+
         # model settings
         num_filters=256,
         num_res_blocks=8,
@@ -106,7 +106,7 @@ class VanillaRNNModel(GoModelRNN):
         board_size = hp.board_size
 
         inputs = features["inputs"]
-        inputs = tf.reshape(inputs, [-1, 3, board_size, board_size])
+        inputs = tf.reshape(inputs, [-1, 3 + hp.num_aux_planes, board_size, board_size])
 
         with tf.variable_scope("conv_block"):
             out = self.conv_block_in(inputs)
@@ -139,7 +139,7 @@ class LSTMModel(GoModelRNN):
         board_size = hp.board_size
 
         inputs = features["inputs"]
-        inputs = tf.reshape(inputs, [-1, 3, board_size, board_size])
+        inputs = tf.reshape(inputs, [-1, 3 + hp.num_aux_planes, board_size, board_size])
 
         with tf.variable_scope("conv_block"):
             out = self.conv_block_in(inputs)
@@ -172,7 +172,7 @@ class GRUModel(GoModelRNN):
         board_size = hp.board_size
 
         inputs = features["inputs"]
-        inputs = tf.reshape(inputs, [-1, 3, board_size, board_size])
+        inputs = tf.reshape(inputs, [-1, 3 + hp.num_aux_planes, board_size, board_size])
 
         with tf.variable_scope("conv_block"):
             out = self.conv_block_in(inputs)
@@ -206,7 +206,7 @@ class ConvRNNModel(GoModelRNN):
 
         game_length = features["game_length"]
         inputs = features["inputs"]
-        inputs = tf.reshape(inputs, [-1, 3, board_size, board_size])
+        inputs = tf.reshape(inputs, [-1, 3 + hp.num_aux_planes, board_size, board_size])
 
         with tf.variable_scope("conv_block"):
             out = self.conv_block_in(inputs)
@@ -239,7 +239,7 @@ class ConvLSTMModel(GoModelRNN):
 
         game_length = features["game_length"]
         inputs = features["inputs"]
-        inputs = tf.reshape(inputs, [-1, 3, board_size, board_size])
+        inputs = tf.reshape(inputs, [-1, 3 + hp.num_aux_planes, board_size, board_size])
 
         with tf.variable_scope("conv_block"):
             out = self.conv_block_in(inputs)
@@ -275,7 +275,7 @@ class ConvGRUModel(GoModelRNN):
 
         game_length = features["game_length"]
         inputs = features["inputs"]
-        inputs = tf.reshape(inputs, [-1, 3, board_size, board_size])
+        inputs = tf.reshape(inputs, [-1, 3 + hp.num_aux_planes, board_size, board_size])
 
         with tf.variable_scope("conv_block"):
             out = self.conv_block_in(inputs)
@@ -337,7 +337,7 @@ class MyConvRNNModel(GoModelRNN):
         board_size = hp.board_size
 
         inputs = features["inputs"]
-        inputs = tf.reshape(inputs, [-1, 3, board_size, board_size])
+        inputs = tf.reshape(inputs, [-1, 3 + hp.num_aux_planes, board_size, board_size])
 
         with tf.variable_scope("conv_block"):
             out = self.conv_block_in(inputs)
@@ -371,7 +371,7 @@ class MyConvLSTMModel(GoModelRNN):
         board_size = hp.board_size
 
         inputs = features["inputs"]
-        inputs = tf.reshape(inputs, [-1, 3, board_size, board_size])
+        inputs = tf.reshape(inputs, [-1, 3 + hp.num_aux_planes, board_size, board_size])
 
         with tf.variable_scope("conv_block"):
             out = self.conv_block_in(inputs)
@@ -409,7 +409,7 @@ class MyConvGRUModel(GoModelRNN):
         board_size = hp.board_size
 
         inputs = features["inputs"]
-        inputs = tf.reshape(inputs, [-1, 3, board_size, board_size])
+        inputs = tf.reshape(inputs, [-1, 3 + hp.num_aux_planes, board_size, board_size])
 
         with tf.variable_scope("conv_block"):
             out = self.conv_block_in(inputs)
@@ -446,7 +446,7 @@ class BNConvGRUModel(GoModelRNN):
         is_training = hp.mode == tf.estimator.ModeKeys.TRAIN
 
         inputs = features["inputs"]
-        inputs = tf.reshape(inputs, [-1, 3, board_size, board_size])
+        inputs = tf.reshape(inputs, [-1, 3 + hp.num_aux_planes, board_size, board_size])
 
         with tf.variable_scope("conv_block"):
             out = self.conv_block_in(inputs)
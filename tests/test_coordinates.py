@@ -0,0 +1,74 @@
+"""Tests of the flat index permutation tables of the 8 board symmetries in go_game.coordinates."""
+
+import numpy as np
+import pytest
+
+from go_game import coordinates
+
+# the 8 symmetries in the order of coordinates._SYMMETRIES, written with np.rot90 and np.flip
+REFERENCE_SYMMETRIES = [
+    lambda board: board,
+    lambda board: np.rot90(board, 1),
+    lambda board: np.rot90(board, 2),
+    lambda board: np.rot90(board, 3),
+    lambda board: np.flip(board, 1),
+    lambda board: np.flip(board, 0),
+    lambda board: np.transpose(board),
+    lambda board: np.transpose(np.rot90(board, 2)),
+]
+
+BOARD_SIZES = [9, 13, 19]
+
+
+def _flat(board, pass_value):
+    return np.concatenate([board.ravel(), [pass_value]])
+
+
+def test_num_symmetries():
+    assert coordinates.NUM_SYMMETRIES == len(REFERENCE_SYMMETRIES)
+
+
+@pytest.mark.parametrize('board_size', BOARD_SIZES)
+@pytest.mark.parametrize('k', range(len(REFERENCE_SYMMETRIES)))
+def test_apply_symmetry_flat_matches_numpy(board_size, k):
+    rng = np.random.RandomState(board_size * 8 + k)
+    boards = rng.rand(3, board_size, board_size)
+    flat = np.stack([_flat(board, pass_value) for board, pass_value in zip(boards, rng.rand(3))])
+
+    expected = np.stack([_flat(REFERENCE_SYMMETRIES[k](board), row[-1]) for board, row in zip(boards, flat)])
+    np.testing.assert_array_equal(coordinates.apply_symmetry_flat(flat, k, board_size), expected)
+
+
+@pytest.mark.parametrize('board_size', BOARD_SIZES)
+@pytest.mark.parametrize('k', range(len(REFERENCE_SYMMETRIES)))
+def test_apply_symmetry_move_matches_numpy(board_size, k):
+    num_moves = board_size * board_size + 1
+    moves = np.arange(num_moves)
+
+    expected = []
+    for move in moves:
+        one_hot = np.zeros(num_moves)
+        one_hot[move] = 1
+        board = REFERENCE_SYMMETRIES[k](one_hot[:-1].reshape([board_size, board_size]))
+        expected.append(np.argmax(_flat(board, one_hot[-1])))
+
+    np.testing.assert_array_equal(coordinates.apply_symmetry_move(moves, k, board_size), expected)
+    assert coordinates.apply_symmetry_move(num_moves - 1, k, board_size) == num_moves - 1
+
+
+@pytest.mark.parametrize('board_size', BOARD_SIZES)
+@pytest.mark.parametrize('k', range(len(REFERENCE_SYMMETRIES)))
+def test_inverse_round_trip(board_size, k):
+    permutations, inverse_permutations = coordinates.symmetry_permutations(board_size)
+    identity = np.arange(board_size * board_size + 1)
+
+    np.testing.assert_array_equal(permutations[k][inverse_permutations[k]], identity)
+    np.testing.assert_array_equal(inverse_permutations[k][permutations[k]], identity)
+
+    flat = np.random.RandomState(k).rand(board_size * board_size + 1)
+    np.testing.assert_array_equal(coordinates.apply_symmetry_flat(flat, k, board_size)[inverse_permutations[k]], flat)
+
+    # a move transformed with the board keeps pointing at the same value
+    moves = np.arange(board_size * board_size + 1)
+    transformed = coordinates.apply_symmetry_flat(flat, k, board_size)
+    np.testing.assert_array_equal(transformed[coordinates.apply_symmetry_move(moves, k, board_size)], flat[moves])
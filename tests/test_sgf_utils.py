@@ -0,0 +1,80 @@
+"""Differential tests of the fast sgf scanner sgf_utils.scan_sgf against the full sgfmill parser."""
+
+import random
+import glob
+import os
+
+import pytest
+
+from utils import sgf_utils
+
+_DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+# sample sgf files the scanner accepts
+FAST_FILES = ['main_line_19.sgf', 'handicap_19.sgf', 'small_9.sgf', 'latin1.sgf']
+# sample sgf files the scanner leaves to sgfmill, with variations, a non UTF-8 charset or compressed point lists
+FALLBACK_FILES = ['variations.sgf', 'gb2312.sgf', 'compressed_points.sgf']
+# malformed sample sgf files neither parser can read
+MALFORMED_FILES = ['truncated.sgf', 'bad_point.sgf']
+
+
+def _read(name):
+    with open(os.path.join(_DATA_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def _random_sgf(rng, board_size):
+    """A random main line of up to 50 moves and passes, the moves don't have to be legal for the parsers."""
+    letters = 'abcdefghijklmnopqrstuvwxyz'[:board_size]
+    result = rng.choice(['B+R', 'W+R', 'B+0.5', 'W+T', '0', 'Void', '?'])
+    nodes = []
+    for i in range(rng.randint(0, 50)):
+        colour = 'BW'[i % 2]
+        move = '' if rng.random() < 0.05 else rng.choice(letters) + rng.choice(letters)
+        nodes.append(';{}[{}]'.format(colour, move))
+    return '(;GM[1]FF[4]CA[UTF-8]SZ[{}]KM[6.5]RE[{}]{})'.format(board_size, result, ''.join(nodes)).encode('ascii')
+
+
+def test_sample_files_are_listed():
+    names = {os.path.basename(path) for path in glob.glob(os.path.join(_DATA_DIR, '*.sgf'))}
+    assert names == set(FAST_FILES + FALLBACK_FILES + MALFORMED_FILES)
+
+
+@pytest.mark.parametrize('name', FAST_FILES)
+def test_scan_sgf_matches_sgfmill(name):
+    sgf_src = _read(name)
+    game = sgf_utils.scan_sgf(sgf_src)
+
+    assert game is not None
+    assert game == sgf_utils.read_game_sgfmill(sgf_src)
+
+
+@pytest.mark.parametrize('name', FALLBACK_FILES)
+def test_read_game_falls_back_to_sgfmill(name):
+    sgf_src = _read(name)
+
+    assert sgf_utils.scan_sgf(sgf_src) is None
+    assert sgf_utils.read_game(sgf_src) == sgf_utils.read_game_sgfmill(sgf_src)
+
+
+@pytest.mark.parametrize('name', MALFORMED_FILES)
+def test_read_game_rejects_malformed_sgf(name):
+    sgf_src = _read(name)
+
+    assert sgf_utils.scan_sgf(sgf_src) is None
+    with pytest.raises(Exception):
+        sgf_utils.read_game(sgf_src)
+
+
+@pytest.mark.parametrize('board_size', [9, 13, 19])
+def test_scan_sgf_matches_sgfmill_on_random_games(board_size):
+    rng = random.Random(board_size)
+    for _ in range(200):
+        sgf_src = _random_sgf(rng, board_size)
+        game = sgf_utils.scan_sgf(sgf_src)
+
+        assert game is not None
+        expected = sgf_utils.read_game_sgfmill(sgf_src)
+        assert game.plays == expected.plays
+        assert game.winner == expected.winner
+        assert game == expected
@@ -0,0 +1,145 @@
+"""Read sgf files straight from the GoGoD zip and KGS tar.gz archives without extracting them.
+
+A file inside an archive is addressed by the archive path joined with the member name,
+e.g. 'tmp/GoGoDSpring2018.zip/Database/1999/1999-01-01a.sgf'.
+"""
+
+import tarfile
+import zipfile
+import re
+
+_ARCHIVE_PATH_RE = re.compile(r"\A(.*?\.(?:zip|tar\.gz|tgz))/(.+)\Z")
+
+# archive path -> opened zipfile.ZipFile, one per process
+_OPEN_ARCHIVES = {}
+
+
+def split_archive_path(path):
+    """Splits the path of an archive member into the archive path and the member name.
+
+    Returns:
+        (str, str) archive path and member name, or None if path doesn't point into an archive
+    """
+    match = _ARCHIVE_PATH_RE.match(path)
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+def is_archive_member(path):
+    return split_archive_path(path) is not None
+
+
+def member_path(archive_path, member):
+    """Path of the member name in the archive."""
+    return archive_path + '/' + member
+
+
+def _is_zip(archive_path):
+    return archive_path.endswith(".zip")
+
+
+def _open_zip(archive_path):
+    """Opens a zip archive for random access, the opened archive is reused by the process."""
+    if archive_path not in _OPEN_ARCHIVES:
+        _OPEN_ARCHIVES[archive_path] = zipfile.ZipFile(archive_path, 'r')
+
+    return _OPEN_ARCHIVES[archive_path]
+
+
+def _read_tar_members(archive_path, members):
+    """Reads the given members of a tar.gz archive in one sequential pass, gzip streams can't be seeked.
+
+    Args:
+        archive_path: (str), path of the tar.gz archive
+        members: set of (str), member names to read
+    Returns:
+        dict<str, bytes> member name -> content of the members found in the archive
+    """
+    contents = {}
+    with tarfile.open(archive_path, 'r|gz') as tar:
+        for info in tar:
+            if info.isfile() and info.name in members:
+                contents[info.name] = tar.extractfile(info).read()
+                if len(contents) == len(members):
+                    break
+
+    return contents
+
+
+def list_members(archive_path):
+    """Lists the sgf member names of an archive, tar.gz archives are scanned without reading the members.
+
+    Returns:
+        sorted list of (str), member names
+    """
+    if _is_zip(archive_path):
+        names = [info.filename for info in _open_zip(archive_path).infolist()
+                 if not info.filename.endswith('/') and info.filename.endswith(".sgf")]
+    else:
+        with tarfile.open(archive_path, 'r|gz') as tar:
+            names = [info.name for info in tar if info.isfile() and info.name.endswith(".sgf")]
+
+    return sorted(names)
+
+
+def read_member(path):
+    """Reads the bytes of an archive member path.
+
+    Every call scans a tar.gz archive up to the member, use read_members to read many members.
+    """
+    archive_path, member = split_archive_path(path)
+
+    if _is_zip(archive_path):
+        return _open_zip(archive_path).read(member)
+
+    contents = _read_tar_members(archive_path, {member})
+    if member not in contents:
+        raise KeyError("There is no item named '{}' in the archive '{}'".format(member, archive_path))
+    return contents[member]
+
+
+def read_members(paths):
+    """Reads the bytes of many paths in their order, every tar.gz archive is read once.
+
+    The first path into a tar.gz archive reads all its members in paths in one sequential pass, every member is
+    freed as soon as it has been yielded, so only the members of paths that weren't yielded yet are kept in memory.
+
+    Args:
+        paths: list of (str), paths of the files, may point into archives
+    Yields:
+        (str, bytes) path and content of the archive members, content is None for paths outside of an archive
+    """
+    pending = {}
+    for path in paths:
+        split = split_archive_path(path)
+        if split is not None and not _is_zip(split[0]):
+            pending.setdefault(split[0], set()).add(split[1])
+
+    contents = {}
+    for path in paths:
+        split = split_archive_path(path)
+        if split is None:
+            yield path, None
+            continue
+
+        archive_path, member = split
+        if _is_zip(archive_path):
+            yield path, _open_zip(archive_path).read(member)
+            continue
+
+        if archive_path in pending:
+            members = pending.pop(archive_path)
+            for name, content in _read_tar_members(archive_path, members).items():
+                contents[member_path(archive_path, name)] = content
+
+        if path not in contents:
+            raise KeyError("There is no item named '{}' in the archive '{}'".format(member, archive_path))
+        yield path, contents.pop(path)
+
+
+def close_archives():
+    """Closes all opened zip archives, e.g. before forking processes that would share their file handles."""
+    for archive in _OPEN_ARCHIVES.values():
+        archive.close()
+    _OPEN_ARCHIVES.clear()
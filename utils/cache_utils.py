@@ -0,0 +1,94 @@
+import numpy as np
+
+import tempfile
+import hashlib
+import os
+
+from utils import sgf_utils
+
+# Fields of sgf_utils.replay_sgf stored in the cache
+_GAME_FIELDS = ['positions', 'p_targets', 'legal_moves', 'to_play', 'winner']
+# Optional fields of sgf_utils.replay_sgf, stored if the game has them
+_OPTIONAL_FIELDS = ['aux_planes']
+
+
+class GameCache:
+    """On-disk cache of replayed sgf games, keyed by the sgf content hash, board size and parser version.
+
+    Every game is stored as a compressed npz file at cache_dir/<key[:2]>/<key>.npz containing the arrays of
+    sgf_utils.replay_sgf. Games that failed to replay are stored as an npz without arrays, so they are not
+    replayed again either.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(sgf_src, board_size):
+        """Cache key of the content of a sgf file."""
+        sha1 = hashlib.sha1()
+        sha1.update("v{}-{}:".format(sgf_utils.PARSER_VERSION, board_size).encode("ascii"))
+        sha1.update(sgf_src)
+        return sha1.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".npz")
+
+    def load(self, key):
+        """Loads a cached game.
+
+        Returns:
+            (bool, dict) True if the key was found and the game dict of sgf_utils.replay_sgf,
+                the game is None for games that failed to replay. Entries that can't be read are not found.
+        """
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return False, None
+
+        try:
+            with np.load(path) as cached:
+                if 'winner' not in cached:
+                    return True, None
+                game = {field: cached[field] for field in _GAME_FIELDS}
+                game.update({field: cached[field] for field in _OPTIONAL_FIELDS if field in cached})
+        except Exception:
+            # a corrupt entry is replayed and saved again
+            return False, None
+
+        game['winner'] = int(game['winner'])
+        return True, game
+
+    def save(self, key, game):
+        """Saves a game dict of sgf_utils.replay_sgf or None for a game that failed to replay."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        arrays = {} if game is None else {field: game[field] for field in _GAME_FIELDS + _OPTIONAL_FIELDS
+                                          if field in game}
+
+        # write to a unique temporary file first, so that concurrent workers never read a partial file
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(path) + '.', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+
+
+def replay_sgf_cached(filename, board_size, sgf_src=None, cache_dir=None, aux_planes=False):
+    """sgf_utils.replay_sgf that looks up and stores the replayed game in the GameCache at cache_dir.
+
+    Cached games without auxiliary feature planes are replayed again if aux_planes is True.
+    """
+    if cache_dir is None:
+        return sgf_utils.replay_sgf(filename, board_size, sgf_src, aux_planes)
+
+    if sgf_src is None:
+        sgf_src = sgf_utils.read_sgf_bytes(filename)
+
+    cache = GameCache(cache_dir)
+    key = cache.key(sgf_src, board_size)
+
+    found, game = cache.load(key)
+    if not found or (aux_planes and game is not None and 'aux_planes' not in game):
+        game = sgf_utils.replay_sgf(filename, board_size, sgf_src, aux_planes)
+        cache.save(key, game)
+
+    return game
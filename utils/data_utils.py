@@ -6,7 +6,39 @@ import os
 import json
 
 from tensor2tensor.data_generators.problem import DatasetSplit
-from utils import sgf_utils, utils
+from utils import shard_utils, utils
+
+
+def dataset_suffix(problem):
+    """Suffix of the dataset_params and dataset_stats files of a problem, e.g. '_19_multi' or '_19_multi_gzip' with the
+    compression of the TFRecord files, see GoProblem.dataset_filename."""
+    suffix = "_{}".format(problem.board_size)
+
+    if problem.is_small:
+        suffix += "_small"
+
+    if problem.use_gogod_data and problem.use_kgs_data:
+        suffix += "_multi"
+    elif problem.use_kgs_data:
+        suffix += "_kgs"
+    elif problem.use_gogod_data:
+        suffix += "_gogod"
+
+    if problem.compression:
+        suffix += "_" + problem.compression.lower()
+
+    return suffix
+
+
+def remove_dataset_stats(problem, data_dir):
+    """Removes the dataset_params and dataset_stats files of a problem for all min and max lengths, used when the
+    dataset changes."""
+    suffix = dataset_suffix(problem)
+    for prefix in ['dataset_params', 'dataset_stats']:
+        # the min length follows the suffix, so the files of other compressions don't match
+        for path in tf.gfile.Glob(os.path.join(data_dir, '{}{}_[0-9]*.json'.format(prefix, suffix))):
+            tf.logging.info("Removing stale dataset stats {}".format(path))
+            tf.gfile.Remove(path)
 
 
 class DatasetStats:
@@ -20,17 +52,7 @@ class DatasetStats:
         self.problem = problem
         self.hparams = hparams
         self.sort_sequence_by_color = problem.sort_sequence_by_color
-        self.suffix = "_{}".format(problem.board_size)
-
-        if problem.is_small:
-            self.suffix += "_small"
-
-        if problem.use_gogod_data and problem.use_kgs_data:
-            self.suffix += "_multi"
-        elif problem.use_kgs_data:
-            self.suffix += "_kgs"
-        elif problem.use_gogod_data:
-            self.suffix += "_gogod"
+        self.suffix = dataset_suffix(problem)
 
     def print_stats(self):
         for k, lengths in self.lengths.items():
@@ -132,17 +154,13 @@ class DatasetStats:
             game_lengths = []
 
             data_filepattern = self.problem.filepattern(data_dir, dataset_split)
-            data_files = sorted(tf.contrib.slim.parallel_reader.get_data_files(data_filepattern))
+            data_files = shard_utils.data_files(data_filepattern)
 
             for file in data_files:
-                record_iterator = tf.python_io.tf_record_iterator(path=file)
-
-                for string_record in record_iterator:
-                    example = tf.train.Example()
-                    example.ParseFromString(string_record)
-
-                    game_length = int(example.features.feature['game_length'].int64_list.value[0])
+                # read the game lengths from the sidecar index of the shard
+                index = shard_utils.load_shard_index(file, self.problem.compression)
 
+                for game_length in index['game_length'].tolist():
                     if (min_length <= game_length <= max_length) or (min_length <= game_length and not max_length):
                         game_lengths.append(game_length)
             self.lengths[split] = np.array(game_lengths)
@@ -185,18 +203,13 @@ class DatasetStats:
             kgs = []
 
             data_filepattern = problem.filepattern(data_dir, dataset_split)
-            data_files = sorted(tf.contrib.slim.parallel_reader.get_data_files(data_filepattern))
+            data_files = shard_utils.data_files(data_filepattern)
 
             for file in data_files:
-                record_iterator = tf.python_io.tf_record_iterator(path=file)
-
-                for string_record in record_iterator:
-                    example = tf.train.Example()
-                    example.ParseFromString(string_record)
-
-                    dataset_name = str(example.features.feature['dataset_name'].bytes_list.value[0])
-                    game_length = int(example.features.feature['game_length'].int64_list.value[0])
+                # read the game lengths and dataset names from the sidecar index of the shard
+                index = shard_utils.load_shard_index(file, problem.compression)
 
+                for dataset_name, game_length in zip(index['dataset_name'].tolist(), index['game_length'].tolist()):
                     if (min_length <= game_length <= max_length) or (min_length <= game_length and not max_length):
                         if 'gogod' in dataset_name.lower():
                             gogod.append(game_length)
@@ -0,0 +1,242 @@
+import tensorflow as tf
+import numpy as np
+
+import multiprocessing
+import tempfile
+import os
+import re
+
+from utils import archive_utils, sgf_utils
+
+INDEX_FILENAME = 'sgf_index.npz'
+
+# Version of the index columns, increase it whenever they change to rebuild the index
+INDEX_VERSION = 2
+
+# column name -> numpy dtype of the columns in the index, string columns are stored as unicode arrays
+INDEX_COLUMNS = {
+    'filename': np.str_,
+    'source': np.str_,
+    'archive': np.str_,
+    'file_size': np.int64,
+    'mtime': np.float64,
+    'black_player': np.str_,
+    'white_player': np.str_,
+    'black_rank': np.str_,
+    'white_rank': np.str_,
+    'date': np.str_,
+    'year': np.int32,
+    'komi': np.float32,
+    'handicap': np.int32,
+    'result': np.str_,
+    'winner': np.int8,
+    'move_count': np.int32,
+    'board_size': np.int32,
+    'game_hash': np.str_,
+    'valid': np.bool_,
+}
+
+_YEAR_RE = re.compile(r"(\d{4})")
+
+
+def index_path(tmp_dir):
+    return os.path.join(tmp_dir, INDEX_FILENAME)
+
+
+def file_stat(filename):
+    """Size and modification time used to detect changed files, archive members use the stat of their archive."""
+    split = archive_utils.split_archive_path(filename)
+    path = split[0] if split is not None else filename
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
+
+
+def _to_number(value, dtype, default=0):
+    try:
+        return dtype(float(value))
+    except ValueError:
+        return dtype(default)
+
+
+def index_sgf(task):
+    """Extracts the index row of one (filename, source, sgf_src) task, sgf_src is read from filename if None.
+
+    Returns:
+        dict<str, value> of all INDEX_COLUMNS, valid is False if the sgf couldn't be read
+    """
+    filename, source, sgf_src = task
+
+    split = archive_utils.split_archive_path(filename)
+    file_size, mtime = file_stat(filename)
+
+    row = {
+        'filename': filename,
+        'source': source,
+        'archive': split[0] if split is not None else '',
+        'file_size': file_size,
+        'mtime': mtime,
+        'valid': True
+    }
+
+    try:
+        if sgf_src is None:
+            sgf_src = sgf_utils.read_sgf_bytes(filename)
+        info = sgf_utils.read_game_info(sgf_src)
+        row['game_hash'] = sgf_utils.game_hash(sgf_utils.read_game(sgf_src))
+    except Exception:
+        info = {name: '' for name in sgf_utils.GAME_INFO_PROPERTIES}
+        info['move_count'] = 0
+        row['game_hash'] = ''
+        row['valid'] = False
+
+    for name in ['black_player', 'white_player', 'black_rank', 'white_rank', 'date', 'result']:
+        row[name] = info[name]
+
+    year = _YEAR_RE.search(info['date'])
+    row['year'] = int(year.group(1)) if year else 0
+    row['komi'] = _to_number(info['komi'], np.float32)
+    row['handicap'] = _to_number(info['handicap'], np.int32)
+    row['board_size'] = _to_number(info['board_size'], np.int32, 19) if info['board_size'] else 19
+    row['move_count'] = info['move_count']
+
+    result = info['result'][:1].lower()
+    row['winner'] = 1 if result == 'b' else -1 if result == 'w' else 0
+
+    return row
+
+
+def load_index(path):
+    """Loads an index.
+
+    Returns:
+        dict<str, np.array> of the INDEX_COLUMNS, empty columns if there is no index or it has an old version
+    """
+    if tf.gfile.Exists(path):
+        with np.load(path) as index:
+            if 'version' in index and int(index['version']) == INDEX_VERSION:
+                return {column: index[column] for column in INDEX_COLUMNS}
+
+    return {column: np.zeros([0], dtype=dtype) for column, dtype in INDEX_COLUMNS.items()}
+
+
+def save_index(index, path):
+    # a unique temporary file, so processes saving the index at the same time don't write the same file
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(path) + '.', dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        np.savez(f, version=INDEX_VERSION, **index)
+    os.replace(tmp_path, path)
+
+
+def _rows_to_index(rows):
+    return {column: np.array([row[column] for row in rows], dtype=dtype) for column, dtype in INDEX_COLUMNS.items()}
+
+
+def update_index(tmp_dir, filenames, source, num_workers=1, chunk_size=64, read_only=False):
+    """Incrementally (re)builds the index rows of filenames and saves the index to tmp_dir/sgf_index.npz.
+
+    Only files that are new or whose size or modification time changed are read, in parallel if num_workers > 1.
+    Rows of the same source that are not in filenames anymore are removed, rows of other sources are kept.
+
+    Args:
+        tmp_dir: (str), directory of the index
+        filenames: list of (str), sgf filenames, may point into archives
+        source: (str), name of the dataset, e.g. 'gogod' or 'kgs'
+        num_workers: (int), number of processes reading sgf files
+        chunk_size: (int), number of sgf files sent to a process at once
+        read_only: (bool), only reads the index, e.g. while several generation tasks share tmp_dir
+    Returns:
+        dict<str, np.array> of the INDEX_COLUMNS for filenames in the same order
+    Raises:
+        ValueError: if read_only and files are not indexed or changed
+    """
+    path = index_path(tmp_dir)
+    index = load_index(path)
+
+    old_rows = {str(filename): i for i, filename in enumerate(index['filename'])}
+    keep = [i for i, filename in enumerate(index['filename'])
+            if index['source'][i] != source]
+
+    reuse = []
+    tasks = []
+    for filename in filenames:
+        i = old_rows.get(filename)
+        if i is not None and index['source'][i] == source and \
+                (index['file_size'][i], index['mtime'][i]) == file_stat(filename):
+            reuse.append(i)
+        else:
+            tasks.append(filename)
+
+    if read_only and tasks:
+        raise ValueError("{} {} sgf files are not indexed or changed since, prepare {} first, see "
+                         "GoProblem.prepare_data".format(len(tasks), source, tmp_dir))
+
+    tf.logging.info("Indexing {} new or changed {} sgf files, reusing {} indexed files"
+                    .format(len(tasks), source, len(reuse)))
+
+    # the archive members are read once by this process and streamed to the workers
+    sgf_tasks = ((filename, source, sgf_src) for filename, sgf_src in archive_utils.read_members(tasks))
+    if num_workers > 1 and len(tasks) > chunk_size:
+        # the processes must not share the file handles of opened zip archives
+        archive_utils.close_archives()
+        with multiprocessing.Pool(num_workers) as pool:
+            rows = list(pool.imap(index_sgf, sgf_tasks, chunksize=chunk_size))
+    else:
+        rows = [index_sgf(task) for task in sgf_tasks]
+
+    new_index = _rows_to_index(rows)
+    merged = {column: np.concatenate([index[column][keep], index[column][reuse], new_index[column]])
+              for column in INDEX_COLUMNS}
+    if not read_only:
+        save_index(merged, path)
+
+    # select the rows of filenames in order, the rows of source follow the kept rows of the other sources
+    positions = {str(merged['filename'][i]): i for i in range(len(keep), len(merged['filename']))}
+    order = np.array([positions[filename] for filename in filenames], dtype=np.int64)
+
+    return {column: values[order] for column, values in merged.items()}
+
+
+def filter_index(index, expression):
+    """Evaluates a filter expression over the index columns.
+
+    The expression uses the column names as numpy arrays, e.g.
+    "(year >= 2000) & (handicap == 0) & (move_count >= 50) & (black_rank == '9p')"
+
+    Args:
+        index: dict<str, np.array> of the INDEX_COLUMNS
+        expression: (str), boolean numpy expression
+    Returns:
+        np.array of bool, True for every row that passes the filter
+    """
+    namespace = dict(index)
+    namespace['np'] = np
+
+    mask = eval(expression, {'__builtins__': {}}, namespace)
+    mask = np.broadcast_to(np.asarray(mask, dtype=np.bool_), index['filename'].shape)
+
+    return mask
+
+
+def first_occurrences(game_hashes, mask=None):
+    """Finds the first occurrence of every game hash.
+
+    Args:
+        game_hashes: np.array of (str), game_hash column, games with an empty hash are never duplicates
+        mask: np.array of bool optional, only considers the rows where mask is True
+    Returns:
+        np.array of bool, True for the first row of every game hash and every row with an empty hash
+    """
+    if mask is None:
+        mask = np.ones(game_hashes.shape, dtype=np.bool_)
+
+    seen = set()
+    first = np.zeros(game_hashes.shape, dtype=np.bool_)
+    for i, game_hash in enumerate(game_hashes):
+        if not mask[i]:
+            continue
+        if game_hash and game_hash in seen:
+            continue
+        seen.add(game_hash)
+        first[i] = True
+
+    return first
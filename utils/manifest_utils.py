@@ -0,0 +1,155 @@
+"""Manifest of the games in the shards of a generated dataset, used to resume the generation and to append new games
+to an existing dataset.
+
+The manifest data_dir/{dataset_filename}.manifest.json lists every completed shard with the digest of the sgf files
+it was generated from, the game keys of its games and of its sgf files that failed to parse. It is saved after every
+shard, so a restarted generation skips the completed shards and an append only parses the sgf files that are not in
+the dataset yet. A game key is the dataset name with the last two path components of the sgf file, which are the
+same for extracted files and archive members, e.g. 'gogod/1999/1999-01-01a.sgf' and
+'kgs/kgs-19-2017-01-new/2017-01-01-1.sgf'.
+"""
+
+import tensorflow as tf
+
+import hashlib
+import json
+import os
+
+MANIFEST_SUFFIX = '.manifest.json'
+
+# Version of the manifest format
+MANIFEST_VERSION = 1
+
+SPLITS = ["train", "dev", "test"]
+
+
+def manifest_path(data_dir, dataset_filename, task_id=-1):
+    """Path of the manifest of the dataset, or of generation task task_id if task_id >= 0, see
+    GoProblem.merge_data."""
+    if task_id >= 0:
+        return os.path.join(data_dir, "{}.task-{:03d}{}".format(dataset_filename, task_id, MANIFEST_SUFFIX))
+    return os.path.join(data_dir, dataset_filename + MANIFEST_SUFFIX)
+
+
+def game_key(dataset_name, filename):
+    """Stable key of a sgf file, independent of tmp_dir and of reading it from an archive."""
+    parts = filename.replace('\\', '/').split('/')
+    return '/'.join([dataset_name] + parts[-2:])
+
+
+def hash_split(key, split_fractions):
+    """Assigns a game key to a split by the sha1 of the key, so the split of a game never changes.
+
+    Args:
+        key: (str), game key, see game_key
+        split_fractions: dict<str, float> split -> fraction for the splits 'train', 'dev' and 'test'
+    Returns:
+        (str), 'train', 'dev' or 'test'
+    """
+    # uniform value in [0, 1) of the first 32 bits of the hash
+    value = int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16) / 2 ** 32
+
+    if value < split_fractions["train"]:
+        return "train"
+    elif value < 1 - split_fractions["test"]:
+        return "dev"
+    return "test"
+
+
+def inputs_digest(game_keys):
+    """Digest of the game keys of the sgf files a shard is generated from (str)."""
+    return hashlib.sha1('\n'.join(game_keys).encode('utf-8')).hexdigest()
+
+
+def empty_manifest():
+    return {'version': MANIFEST_VERSION, 'appends': 0, 'shards': {}}
+
+
+def load_manifest(data_dir, dataset_filename, task_id=-1):
+    """Loads the manifest of a dataset or of a generation task.
+
+    Returns:
+        dict with the number of completed appends and the shards (shard filename -> split, append, inputs digest,
+            game keys, skipped game keys and shuffled), an empty manifest if the dataset has no manifest. The manifest
+            of a task also has the plan of the generation, see GoProblem.generate_data
+    """
+    path = manifest_path(data_dir, dataset_filename, task_id)
+    if not tf.gfile.Exists(path):
+        return empty_manifest()
+
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError("Unknown version {} of dataset manifest '{}'".format(manifest.get('version'), path))
+
+    return manifest
+
+
+def save_manifest(manifest, data_dir, dataset_filename, task_id=-1):
+    path = manifest_path(data_dir, dataset_filename, task_id)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def completed_shards(manifest):
+    """Shards of the dataset and of the completed appends, without the shards of an interrupted append
+    (list of dict)."""
+    return [shard for shard in manifest['shards'].values() if shard['append'] <= manifest['appends']]
+
+
+def known_games(manifest):
+    """Game keys of all games and skipped sgf files of the completed shards (set)."""
+    keys = set()
+    for shard in completed_shards(manifest):
+        keys.update(shard['games'])
+        keys.update(shard['skipped'])
+    return keys
+
+
+def num_games(manifest, split):
+    return sum(len(shard['games']) for shard in completed_shards(manifest) if shard['split'] == split)
+
+
+def is_complete(manifest, shard_path, inputs):
+    """True if the shard exists and was generated from the sgf files with the inputs digest."""
+    shard = manifest['shards'].get(os.path.basename(shard_path))
+    return shard is not None and shard['inputs'] == inputs and tf.gfile.Exists(shard_path)
+
+
+def add_shard(manifest, shard_path, split, append, inputs, game_keys, skipped_keys=()):
+    """Adds a completed shard to the manifest.
+
+    Args:
+        manifest: dict, see load_manifest
+        shard_path: (str), path of the shard
+        split: (str), 'train', 'dev' or 'test'
+        append: (int), number of the append that generated the shard, 0 for the shards of a new dataset
+        inputs: (str), digest of the sgf files of the shard, see inputs_digest
+        game_keys: list of (str), keys of the games of the shard
+        skipped_keys: list of (str), keys of the sgf files of the shard that were quarantined or failed to parse
+    """
+    manifest['shards'][os.path.basename(shard_path)] = {
+        'split': split,
+        'append': append,
+        'inputs': inputs,
+        'games': list(game_keys),
+        'skipped': sorted(skipped_keys),
+        'shuffled': False,
+    }
+
+
+def is_shuffled(manifest, shard_paths):
+    """True if the records of the shards were shuffled across the shards, see shard_utils.external_shuffle."""
+    return all(manifest['shards'][os.path.basename(path)]['shuffled'] for path in shard_paths)
+
+
+def set_shuffled(manifest, shard_paths):
+    """Marks the shards as shuffled across the shards, the games of a shard are then the games of the sgf files it
+    was generated from, which are spread over all shards."""
+    for path in shard_paths:
+        manifest['shards'][os.path.basename(path)]['shuffled'] = True
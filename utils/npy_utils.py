@@ -0,0 +1,165 @@
+"""Memory mapped numpy store of the decoded games of a dataset split, an alternative data backend to TFRecord files.
+
+A store is a directory with one .npy file per field, holding the field of all positions of all games concatenated,
+and games.npz with the offset of the first position, game_length, winner and dataset_name of every game.
+The games are sliced from the memory mapped arrays without parsing or copying them, and the page cache of the files
+is shared by all processes reading the same store.
+"""
+
+import tensorflow as tf
+import numpy as np
+
+import os
+
+from utils import record_utils
+
+# field -> numpy dtype of the per position arrays, the arrays have the shapes
+# * positions: [num_positions, board_size, board_size]
+# * legal_moves: [num_positions, num_moves]
+# * p_targets: [num_positions]
+# * to_play: [num_positions]
+STORE_FIELDS = {
+    'positions': np.int8,
+    'legal_moves': np.uint8,
+    'p_targets': np.int16,
+    'to_play': np.int8,
+}
+
+# field -> numpy dtype of the optional per position arrays, the arrays have the shapes
+# * aux_planes: [num_positions, num_aux_planes, board_size, board_size], unpacked auxiliary feature planes
+OPTIONAL_FIELDS = {
+    'aux_planes': np.uint8,
+}
+
+GAMES_FILENAME = 'games.npz'
+
+# column name -> numpy dtype of the per game columns of games.npz
+GAMES_COLUMNS = {
+    'offset': np.int64,
+    'game_length': np.int32,
+    'winner': np.int8,
+    'dataset_name': np.str_,
+}
+
+
+def field_path(store_dir, field):
+    return os.path.join(store_dir, field + '.npy')
+
+
+def store_exists(store_dir):
+    """True if the store is complete, games.npz is written last."""
+    return tf.gfile.Exists(os.path.join(store_dir, GAMES_FILENAME))
+
+
+def write_store(games, store_dir, num_positions, board_size, aux_planes=False):
+    """Writes decoded games to a new store.
+
+    The store is written to store_dir + '.incomplete' and renamed to store_dir when all games are written.
+
+    Args:
+        games: iterable of decoded examples with numpy inputs [game_length, board_size, board_size], legal_moves
+            [game_length, num_moves], p_targets [game_length], to_play [game_length] and the scalars winner and
+            dataset_name, see GoProblem.decode_example
+        store_dir: (str), directory of the store
+        num_positions: (int), number of positions of all games
+        board_size: (int), board size of the games
+        aux_planes: (bool), also stores the auxiliary feature planes of the games
+    Raises:
+        ValueError: if the games don't have num_positions positions or are missing the auxiliary feature planes
+    """
+    tmp_dir = store_dir + '.incomplete'
+    tf.gfile.MakeDirs(tmp_dir)
+
+    shapes = {
+        'positions': [num_positions, board_size, board_size],
+        'legal_moves': [num_positions, board_size * board_size + 1],
+        'p_targets': [num_positions],
+        'to_play': [num_positions],
+        'aux_planes': [num_positions, len(record_utils.AUX_PLANES), board_size, board_size],
+    }
+    fields = dict(STORE_FIELDS, **OPTIONAL_FIELDS) if aux_planes else STORE_FIELDS
+    arrays = {field: np.lib.format.open_memmap(field_path(tmp_dir, field), mode='w+', dtype=dtype,
+                                               shape=tuple(shapes[field]))
+              for field, dtype in fields.items()}
+
+    columns = {column: [] for column in GAMES_COLUMNS}
+    offset = 0
+    for game in games:
+        game_length = len(game['p_targets'])
+        if offset + game_length > num_positions:
+            raise ValueError("The games have more than {} positions".format(num_positions))
+
+        end = offset + game_length
+        arrays['positions'][offset:end] = game['inputs']
+        arrays['legal_moves'][offset:end] = game['legal_moves']
+        arrays['p_targets'][offset:end] = game['p_targets']
+        arrays['to_play'][offset:end] = game['to_play']
+        if aux_planes:
+            if len(game['aux_planes']) != game_length:
+                raise ValueError("A game has no auxiliary feature planes")
+            arrays['aux_planes'][offset:end] = game['aux_planes']
+
+        dataset_name = game['dataset_name']
+        columns['offset'].append(offset)
+        columns['game_length'].append(game_length)
+        columns['winner'].append(game['winner'])
+        columns['dataset_name'].append(dataset_name.decode('utf-8') if isinstance(dataset_name, bytes)
+                                       else dataset_name)
+        offset = end
+
+    if offset != num_positions:
+        raise ValueError("The games have {} instead of {} positions".format(offset, num_positions))
+
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    with open(os.path.join(tmp_dir, GAMES_FILENAME), 'wb') as f:
+        np.savez(f, **{column: np.array(values, dtype=GAMES_COLUMNS[column]) for column, values in columns.items()})
+
+    tf.gfile.Rename(tmp_dir, store_dir)
+    tf.logging.info("Wrote {} games with {} positions to '{}'".format(len(columns['offset']), offset, store_dir))
+
+
+class GameStore:
+    """Read only memory mapped store, see write_store."""
+    def __init__(self, store_dir):
+        if not store_exists(store_dir):
+            raise ValueError("No numpy game store found in {}".format(store_dir))
+
+        self.arrays = {field: np.load(field_path(store_dir, field), mmap_mode='r') for field in STORE_FIELDS}
+        self.arrays.update({field: np.load(field_path(store_dir, field), mmap_mode='r') for field in OPTIONAL_FIELDS
+                            if tf.gfile.Exists(field_path(store_dir, field))})
+        with np.load(os.path.join(store_dir, GAMES_FILENAME)) as games:
+            self.games = {column: games[column] for column in GAMES_COLUMNS}
+
+    @property
+    def num_games(self):
+        return len(self.games['offset'])
+
+    def game(self, i):
+        """Decoded example of game i, the arrays are views of the memory mapped arrays.
+
+        Returns:
+            dict with the fields of GoProblem.decode_example: inputs, legal_moves, p_targets, to_play, game_length,
+                winner, dataset_name and aux_planes, which has no positions if the store has no aux_planes
+        """
+        start = self.games['offset'][i]
+        end = start + self.games['game_length'][i]
+
+        if 'aux_planes' in self.arrays:
+            aux_planes = self.arrays['aux_planes'][start:end]
+        else:
+            board_size = self.arrays['positions'].shape[1]
+            aux_planes = np.zeros([0, len(record_utils.AUX_PLANES), board_size, board_size], dtype=np.uint8)
+
+        return {
+            'inputs': self.arrays['positions'][start:end],
+            'legal_moves': self.arrays['legal_moves'][start:end],
+            'p_targets': self.arrays['p_targets'][start:end],
+            'to_play': self.arrays['to_play'][start:end],
+            'game_length': self.games['game_length'][i],
+            'winner': self.games['winner'][i],
+            'dataset_name': self.games['dataset_name'][i],
+            'aux_planes': aux_planes,
+        }
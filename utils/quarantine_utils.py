@@ -0,0 +1,88 @@
+"""Quarantine manifest of bad sgf files that are skipped during data generation.
+
+The manifest tmp_dir/quarantine.json is written by delete_bad_files.py and maps the path of every bad sgf file,
+relative to tmp_dir, to the reason it is quarantined, e.g. 'illegal-move'. Archive members are stored with their
+archive member path, see archive_utils, so bad files inside the raw archives can be skipped without touching them.
+"""
+
+import tensorflow as tf
+
+import json
+import os
+
+QUARANTINE_FILENAME = 'quarantine.json'
+
+# Version of the manifest format
+QUARANTINE_VERSION = 1
+
+
+def quarantine_path(tmp_dir):
+    return os.path.join(tmp_dir, QUARANTINE_FILENAME)
+
+
+def load_quarantine(tmp_dir):
+    """Loads the quarantine manifest of tmp_dir.
+
+    Returns:
+        dict<str, str> path relative to tmp_dir -> reason, empty if there is no manifest
+    """
+    path = quarantine_path(tmp_dir)
+    if not tf.gfile.Exists(path):
+        return {}
+
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('version') != QUARANTINE_VERSION:
+        raise ValueError("Unknown version {} of quarantine manifest '{}'".format(manifest.get('version'), path))
+
+    return manifest['files']
+
+
+def save_quarantine(tmp_dir, bad_files, checked_files=()):
+    """Updates the quarantine manifest of tmp_dir.
+
+    Args:
+        tmp_dir: (str), directory of the manifest and the sgf files
+        bad_files: dict<str, str> filename -> reason of the bad files
+        checked_files: list of (str), filenames that were checked, their old entries are removed first
+    """
+    files = load_quarantine(tmp_dir)
+    for filename in checked_files:
+        files.pop(os.path.relpath(filename, tmp_dir), None)
+    for filename, reason in bad_files.items():
+        files[os.path.relpath(filename, tmp_dir)] = reason
+
+    path = quarantine_path(tmp_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': QUARANTINE_VERSION, 'files': files}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def quarantined_paths(tmp_dir):
+    """Loads the quarantine manifest of tmp_dir as a set of normalised paths, see is_quarantined."""
+    return {os.path.normpath(os.path.join(tmp_dir, path)) for path in load_quarantine(tmp_dir)}
+
+
+def is_quarantined(filename, quarantined):
+    return os.path.normpath(filename) in quarantined
+
+
+def remove_quarantined(tmp_dir, filenames):
+    """Removes the quarantined files from filenames.
+
+    Args:
+        tmp_dir: (str), directory of the manifest, the manifest paths are relative to it
+        filenames: list of (str), sgf filenames in tmp_dir
+    Returns:
+        list of (str), filenames that are not quarantined in the same order
+    """
+    quarantined = quarantined_paths(tmp_dir)
+    if not quarantined:
+        return filenames
+
+    selected = [filename for filename in filenames if not is_quarantined(filename, quarantined)]
+    tf.logging.info("Skipped {} of {} quarantined sgf files".format(len(filenames) - len(selected), len(filenames)))
+
+    return selected
@@ -0,0 +1,245 @@
+"""Encodings of the fields of the go game records.
+
+Every record stores the encoding of a field in an int64 feature, e.g. legal_moves_encoding for legal_moves.
+Records written before a field had encodings don't have this feature and are decoded with the default 'raw'
+encoding, so old shards stay readable. The numpy encoders are used by the data generation, the tf decoders by
+the handlers of GoProblem.example_reading_spec.
+"""
+
+import tensorflow as tf
+import numpy as np
+
+# name -> code of the record formats, stored in the record_format feature
+# * positions: positions and legal_moves of every position
+# * moves: only the setup stones, the positions and legal_moves are replayed in the input pipeline from the setup
+#       stones, p_targets and to_play, see GoProblem.replay_move_lists
+RECORD_FORMATS = {
+    'positions': 0,
+    'moves': 1,
+}
+
+# name -> code of the positions encodings
+# * raw: np.array [game_length, board_size, board_size] of int8
+# * deltas: [num_deltas, 3] of int16 (position index, flat point, value) of the stones added (+colour) and
+#       removed (-colour) before every position, the positions are the cumulative sum of the deltas over time
+# * packed: 2 bits per point, value & 3 of the stones, 4 points per byte [game_length, ceil(num_points / 4)]
+POSITIONS_ENCODINGS = {
+    'raw': 0,
+    'deltas': 1,
+    'packed': 2,
+}
+
+# name -> code of the legal_moves encodings
+# * raw: np.array [game_length, num_moves] of uint8
+# * packed: np.packbits of the legal_moves of every position, [game_length, ceil(num_moves / 8)] of uint8
+# * exceptions: [num_exceptions, 2] of int16 (position index, move) of the empty points that are illegal
+#       because of ko or suicide, the legal_moves are rebuilt from the empty points of the positions
+LEGAL_MOVES_ENCODINGS = {
+    'raw': 0,
+    'packed': 1,
+    'exceptions': 2,
+}
+
+# names of the auxiliary feature planes of a position in the order of the aux_planes feature, computed from the
+# groups of the go engine while replaying the game, see sgf_utils.aux_planes
+# * liberties_1, liberties_2, liberties_3: stones of the groups with 1, 2 and 3 or more liberties
+# * atari: empty points that are the last liberty of a group
+# * ko: the point the player to move can't play because of the ko rule
+# * last_move: the point of the previous move
+# * captures: the points of the stones captured by the previous move
+# stored with np.packbits of the planes of every position, [game_length, ceil(num_aux_planes * num_points / 8)]
+AUX_PLANES = ['liberties_1', 'liberties_2', 'liberties_3', 'atari', 'ko', 'last_move', 'captures']
+
+
+def empty_point_moves(positions):
+    """Moves that are legal on an empty point, every empty point and the pass move.
+
+    Args:
+        positions: np.array [game_length, board_size, board_size]
+    Returns:
+        np.array [game_length, num_moves] of uint8
+    """
+    empty = (positions.reshape([positions.shape[0], -1]) == 0).astype(np.uint8)
+    return np.concatenate([empty, np.ones([positions.shape[0], 1], dtype=np.uint8)], axis=1)
+
+
+def encode_setup(initial_board):
+    """Encodes the setup stones of a 'moves' record.
+
+    Args:
+        initial_board: np.array [board_size, board_size] of int8, first position of the game
+    Returns:
+        (bytes), [num_stones, 2] of int16, flat index and colour of every stone
+    """
+    flat_board = initial_board.ravel()
+    indices = np.flatnonzero(flat_board)
+
+    return np.stack([indices, flat_board[indices]], axis=1).astype(np.int16).tostring()
+
+
+def encode_positions(positions, encoding='raw'):
+    """Encodes the positions of a game.
+
+    Args:
+        positions: np.array [game_length, board_size, board_size] of int8
+        encoding: (str), key of POSITIONS_ENCODINGS
+    Returns:
+        (bytes), encoded positions
+    """
+    if encoding == 'raw':
+        return positions.tostring()
+    elif encoding == 'deltas':
+        flat_positions = positions.reshape([positions.shape[0], -1]).astype(np.int16)
+        deltas = np.diff(np.concatenate([np.zeros_like(flat_positions[:1]), flat_positions]), axis=0)
+        times, points = np.nonzero(deltas)
+        return np.stack([times, points, deltas[times, points]], axis=1).astype(np.int16).tostring()
+    elif encoding == 'packed':
+        # two's complement of the stones in 2 bits, BLACK: 1, WHITE: 3, EMPTY: 0
+        flat_positions = positions.reshape([positions.shape[0], -1]).astype(np.uint8) & 3
+        num_bytes = (flat_positions.shape[1] + 3) // 4
+        flat_positions = np.pad(flat_positions, [[0, 0], [0, num_bytes * 4 - flat_positions.shape[1]]], 'constant')
+        points = flat_positions.reshape([positions.shape[0], num_bytes, 4])
+        packed = (points[..., 0] << 6) | (points[..., 1] << 4) | (points[..., 2] << 2) | points[..., 3]
+        return packed.astype(np.uint8).tostring()
+
+    raise ValueError("Unknown positions encoding '{}'".format(encoding))
+
+
+def encode_legal_moves(legal_moves, encoding='raw', positions=None):
+    """Encodes the legal_moves of a game.
+
+    Args:
+        legal_moves: np.array [game_length, num_moves] of uint8
+        encoding: (str), key of LEGAL_MOVES_ENCODINGS
+        positions: np.array [game_length, board_size, board_size] of int8, required by 'exceptions'
+    Returns:
+        (bytes), encoded legal_moves
+    """
+    if encoding == 'raw':
+        return legal_moves.tostring()
+    elif encoding == 'packed':
+        return np.packbits(legal_moves, axis=1).tostring()
+    elif encoding == 'exceptions':
+        empty_moves = empty_point_moves(positions)
+        if np.any(legal_moves > empty_moves):
+            raise ValueError("legal_moves contain moves on occupied points")
+        return np.argwhere(empty_moves > legal_moves).astype(np.int16).tostring()
+
+    raise ValueError("Unknown legal_moves encoding '{}'".format(encoding))
+
+
+def encode_aux_planes(aux_planes):
+    """Encodes the auxiliary feature planes of a game.
+
+    Args:
+        aux_planes: np.array [game_length, num_aux_planes, board_size, board_size] of bool, see AUX_PLANES
+    Returns:
+        (bytes), np.packbits of the planes of every position
+    """
+    return np.packbits(aux_planes.reshape([aux_planes.shape[0], -1]).astype(np.uint8), axis=1).tostring()
+
+
+def unpack_bits(buffer, num_bits):
+    """Unpacks a buffer of np.packbits rows on the graph.
+
+    Args:
+        buffer: (tf.Tensor) string, bytes of np.packbits(x, axis=1) of a [rows, num_bits] array
+        num_bits: (int), number of bits per row
+    Returns:
+        (tf.Tensor) [rows, num_bits] of uint8
+    """
+    num_bytes = (num_bits + 7) // 8
+
+    packed = tf.reshape(tf.decode_raw(buffer, out_type=tf.uint8), [-1, num_bytes, 1])
+    # np.packbits stores the first bit in the most significant bit
+    shifts = tf.constant([7, 6, 5, 4, 3, 2, 1, 0], dtype=tf.uint8)
+    bits = tf.bitwise.bitwise_and(tf.bitwise.right_shift(packed, shifts), tf.constant(1, dtype=tf.uint8))
+    bits = tf.reshape(bits, [-1, num_bytes * 8])
+
+    return bits[:, :num_bits]
+
+
+def decode_legal_moves(buffer, encoding, num_moves, positions_fn):
+    """Decodes the legal_moves of a record on the graph.
+
+    Args:
+        buffer: (tf.Tensor) string, legal_moves feature
+        encoding: (tf.Tensor) int64, legal_moves_encoding feature, see LEGAL_MOVES_ENCODINGS
+        num_moves: (int), number of moves incl. the pass move
+        positions_fn: function returning the decoded positions [game_length, board_size, board_size], only
+            called by 'exceptions'
+    Returns:
+        (tf.Tensor) [game_length, num_moves] of uint8
+    """
+    def _raw():
+        return tf.reshape(tf.decode_raw(buffer, out_type=tf.uint8), [-1, num_moves])
+
+    def _packed():
+        return unpack_bits(buffer, num_moves)
+
+    def _exceptions():
+        empty = tf.cast(tf.equal(tf.reshape(positions_fn(), [-1, num_moves - 1]), 0), tf.int32)
+        empty_moves = tf.pad(empty, [[0, 0], [0, 1]], constant_values=1)
+
+        indices = tf.reshape(tf.cast(tf.decode_raw(buffer, out_type=tf.int16), tf.int32), [-1, 2])
+        exceptions = tf.scatter_nd(indices, tf.ones([tf.shape(indices)[0]], dtype=tf.int32),
+                                   tf.shape(empty_moves))
+
+        return tf.cast(empty_moves - exceptions, tf.uint8)
+
+    return tf.case([(tf.equal(encoding, LEGAL_MOVES_ENCODINGS['packed']), _packed),
+                    (tf.equal(encoding, LEGAL_MOVES_ENCODINGS['exceptions']), _exceptions)],
+                   default=_raw, exclusive=True)
+
+
+def decode_positions(buffer, encoding, game_length, board_size):
+    """Decodes the positions of a record on the graph.
+
+    Args:
+        buffer: (tf.Tensor) string, positions feature
+        encoding: (tf.Tensor) int64, positions_encoding feature, see POSITIONS_ENCODINGS
+        game_length: (tf.Tensor) int64, game_length feature
+        board_size: (int), board size
+    Returns:
+        (tf.Tensor) [game_length, board_size, board_size] of int8
+    """
+    def _raw():
+        return tf.reshape(tf.decode_raw(buffer, out_type=tf.int8), [-1, board_size, board_size])
+
+    def _deltas():
+        deltas = tf.reshape(tf.cast(tf.decode_raw(buffer, out_type=tf.int16), tf.int32), [-1, 3])
+        shape = tf.stack([tf.cast(game_length, tf.int32), board_size * board_size])
+        # scatter the deltas to the position they are applied before and sum them up over time
+        flat_positions = tf.cumsum(tf.scatter_nd(deltas[:, :2], deltas[:, 2], shape), axis=0)
+        return tf.reshape(tf.cast(flat_positions, tf.int8), [-1, board_size, board_size])
+
+    def _packed():
+        num_points = board_size * board_size
+        num_bytes = (num_points + 3) // 4
+
+        packed = tf.reshape(tf.decode_raw(buffer, out_type=tf.uint8), [-1, num_bytes, 1])
+        shifts = tf.constant([6, 4, 2, 0], dtype=tf.uint8)
+        points = tf.bitwise.bitwise_and(tf.bitwise.right_shift(packed, shifts), tf.constant(3, dtype=tf.uint8))
+        points = tf.cast(tf.reshape(points, [-1, num_bytes * 4])[:, :num_points], tf.int8)
+        # sign extend the 2 bit two's complement, 3 -> -1
+        two = tf.constant(2, dtype=tf.int8)
+        points = points - tf.bitwise.left_shift(tf.bitwise.bitwise_and(points, two), tf.constant(1, dtype=tf.int8))
+        return tf.reshape(points, [-1, board_size, board_size])
+
+    return tf.case([(tf.equal(encoding, POSITIONS_ENCODINGS['deltas']), _deltas),
+                    (tf.equal(encoding, POSITIONS_ENCODINGS['packed']), _packed)],
+                   default=_raw, exclusive=True)
+
+
+def decode_aux_planes(buffer, board_size):
+    """Decodes the auxiliary feature planes of a record on the graph.
+
+    Args:
+        buffer: (tf.Tensor) string, aux_planes feature, empty for records without auxiliary feature planes
+        board_size: (int), board size
+    Returns:
+        (tf.Tensor) [game_length, num_aux_planes, board_size, board_size] of uint8, game_length is 0 for records
+            without auxiliary feature planes
+    """
+    bits = unpack_bits(buffer, len(AUX_PLANES) * board_size * board_size)
+    return tf.reshape(bits, [-1, len(AUX_PLANES), board_size, board_size])
@@ -0,0 +1,138 @@
+"""Random access sampling of single positions from uncompressed TFRecord shards.
+
+Splitting whole games into positions puts the positions of a game next to each other, so shuffling them needs a
+buffer of many games. The sampler draws positions uniformly from all positions of the shards instead and seeks
+straight to the record of the game with the byte offsets of the sidecar index, see shard_utils.
+"""
+
+import numpy as np
+
+from concurrent import futures
+import collections
+import threading
+
+from utils import shard_utils
+
+
+class PositionSampler:
+    """Samples (serialized record, position index) pairs uniformly from all positions of a set of shards.
+
+    Calling the sampler returns a generator of one epoch, as many samples as there are positions, to be used with
+    tf.data.Dataset.from_generator. The records are read by a thread pool, every thread keeps its own open file of
+    every shard.
+    """
+    def __init__(self, shard_paths, min_length=0, max_length=0, max_positions=0, num_threads=4, chunk_size=64,
+                 seed=None):
+        """Loads the sidecar indices of the shards.
+
+        Args:
+            shard_paths: list of (str), paths of uncompressed shards
+            min_length: (int), games shorter than min_length are skipped
+            max_length: (int), games longer than max_length are skipped, no limit if 0
+            max_positions: (int), only the first max_positions positions of every game are sampled, all if 0
+            num_threads: (int), number of threads reading records
+            chunk_size: (int), number of records read by a thread at once
+            seed: (int) optional, seed of the drawn positions
+        """
+        self._shard_paths = shard_paths
+        self._num_threads = max(1, num_threads)
+        self._chunk_size = max(1, chunk_size)
+        self._random = np.random.RandomState(seed)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open_files = []
+
+        shard_ids, offsets, lengths, num_positions = [], [], [], []
+        for shard_id, path in enumerate(shard_paths):
+            index = shard_utils.load_shard_index(path)
+
+            game_lengths = index['game_length'].astype(np.int64)
+            mask = game_lengths >= min_length
+            if max_length:
+                mask &= game_lengths <= max_length
+
+            shard_ids.append(np.full(int(mask.sum()), shard_id, dtype=np.int32))
+            offsets.append(index['offset'][mask])
+            lengths.append(index['length'][mask])
+            positions = game_lengths[mask]
+            num_positions.append(np.minimum(positions, max_positions) if max_positions else positions)
+
+        self._shard_ids = np.concatenate(shard_ids) if shard_ids else np.zeros([0], dtype=np.int32)
+        self._offsets = np.concatenate(offsets) if offsets else np.zeros([0], dtype=np.int64)
+        self._lengths = np.concatenate(lengths) if lengths else np.zeros([0], dtype=np.int64)
+        self._num_positions = np.concatenate(num_positions) if num_positions else np.zeros([0], dtype=np.int64)
+        # number of positions of all games up to and including every game
+        self._cumulative = np.cumsum(self._num_positions)
+
+    @property
+    def num_games(self):
+        return len(self._num_positions)
+
+    @property
+    def num_positions(self):
+        return int(self._cumulative[-1]) if self.num_games else 0
+
+    def sample(self, num_samples):
+        """Draws positions uniformly from all positions, with replacement.
+
+        Returns:
+            (np.array, np.array) [num_samples] game indices and position indices in the games
+        """
+        draws = self._random.randint(0, self.num_positions, size=num_samples, dtype=np.int64)
+        games = np.searchsorted(self._cumulative, draws, side='right')
+        return games, draws - (self._cumulative[games] - self._num_positions[games])
+
+    def _open(self, shard_id):
+        """Opened file of a shard of the current thread."""
+        if not hasattr(self._local, 'files'):
+            self._local.files = {}
+
+        f = self._local.files.get(shard_id)
+        if f is None:
+            f = open(self._shard_paths[shard_id], 'rb')
+            self._local.files[shard_id] = f
+            with self._lock:
+                self._open_files.append(f)
+        return f
+
+    def _read_records(self, games):
+        records = []
+        for game in games:
+            shard_id = self._shard_ids[game]
+            records.append(shard_utils.read_record(self._shard_paths[shard_id], self._offsets[game],
+                                                   self._lengths[game], self._open(shard_id)))
+        return records
+
+    def _close(self):
+        with self._lock:
+            for f in self._open_files:
+                f.close()
+            self._open_files = []
+        self._local = threading.local()
+
+    def __call__(self):
+        """Yields num_positions (bytes, int) samples, the serialized tf.train.Example of the game and the position."""
+        num_samples = self.num_positions
+        max_pending = 2 * self._num_threads
+
+        with futures.ThreadPoolExecutor(self._num_threads) as executor:
+            try:
+                pending = collections.deque()
+                for start in range(0, num_samples, self._chunk_size):
+                    games, positions = self.sample(min(self._chunk_size, num_samples - start))
+                    pending.append((executor.submit(self._read_records, games), positions))
+
+                    if len(pending) >= max_pending:
+                        records, positions = pending.popleft()
+                        for record, position in zip(records.result(), positions):
+                            yield record, position
+
+                while pending:
+                    records, positions = pending.popleft()
+                    for record, position in zip(records.result(), positions):
+                        yield record, position
+            finally:
+                for records, _ in pending:
+                    records.cancel()
+                executor.shutdown(wait=True)
+                self._close()
@@ -1,11 +1,55 @@
 import numpy as np
 import tensorflow as tf
 
+import collections
+import hashlib
+import re
+
 from sgfmill import sgf
+from sgfmill import sgf_grammar
 from sgfmill import sgf_moves
 
 from go_game import go
 from go_game import coordinates
+from utils import archive_utils, record_utils
+
+# Version of the arrays returned by replay_sgf, increase it whenever they change to invalidate cached games
+PARSER_VERSION = 1
+
+# Subset of an sgf needed for training, coordinates and colours in the sgfmill format:
+# * board_size: (int)
+# * setup_black, setup_white: (frozenset) of (row, col) setup stones in the root node
+# * plays: list of (colour, move) tuples of the main line, move is (row, col) or None for a pass
+# * winner: 'b', 'w' or None
+SgfGame = collections.namedtuple('SgfGame', ['board_size', 'setup_black', 'setup_white', 'plays', 'winner'])
+
+# Root properties read by read_game_info
+GAME_INFO_PROPERTIES = {
+    'black_player': 'PB',
+    'white_player': 'PW',
+    'black_rank': 'BR',
+    'white_rank': 'WR',
+    'date': 'DT',
+    'komi': 'KM',
+    'handicap': 'HA',
+    'result': 'RE',
+    'board_size': 'SZ'
+}
+
+# Byte level tokens of the fast sgf scanner: an upper case property with all its values or a delimiter
+_SGF_START_RE = re.compile(br"\(\s*;")
+_SGF_TOKEN_RE = re.compile(br"""
+\s*
+(?:
+    (?P<I> [A-Z]{1,64} ) (?P<V> (?: \s* \[ [^\\\]]* (?: \\. [^\\\]]* )* \] )+ )
+    |
+    (?P<D> [;()] )
+)
+""", re.VERBOSE | re.DOTALL)
+_SGF_VALUE_RE = re.compile(br"\[ ( [^\\\]]* (?: \\. [^\\\]]* )* ) \]", re.VERBOSE | re.DOTALL)
+_SGF_SETUP_PROPERTIES = (b'AB', b'AW', b'AE')
+# Charsets that encode the properties read by the fast scanner as plain ascii
+_SGF_FAST_CHARSETS = (b'UTF-8', b'UTF8', b'ISO-8859-1', b'ISO8859-1', b'LATIN-1', b'LATIN1', b'US-ASCII', b'ASCII')
 
 
 def print_legal_moves(legal_moves):
@@ -36,13 +80,14 @@ def print_go_position(board):
     print(go_game)
 
 
-def parse_sgf(filename, board_size, dataset_name):
+def parse_sgf(filename, board_size, dataset_name, sgf_src=None):
     """Parses a sgf file to a game dict.
 
     Args:
-        filename: (str), path of the sgf file
+        filename: (str), path of the sgf file, may point into an archive, see archive_utils
         board_size: (int), board size
         dataset_name: (str) optional, name of the dataset
+        sgf_src: (bytes) optional, content of the sgf file, read from filename if None
     Returns:
         A dictionary representing a go game with the following fields:
         * positions: (str) of np.array [game_length, board_size, board_size] , encoded game positions,
@@ -64,42 +109,98 @@ def parse_sgf(filename, board_size, dataset_name):
     """
     assert dataset_name in ["gogod", "kgs"]
 
+    game = replay_sgf(filename, board_size, sgf_src)
+    if game is None:
+        return None
+
+    return game_to_features(game, dataset_name)
+
+
+def replay_sgf(filename, board_size, sgf_src=None, aux_planes=False):
+    """Replays a sgf file to the numpy arrays of a game.
+
+    Args:
+        filename: (str), path of the sgf file, may point into an archive, see archive_utils
+        board_size: (int), board size
+        sgf_src: (bytes) optional, content of the sgf file, read from filename if None
+        aux_planes: (bool), also computes the auxiliary feature planes of every position, see replay_plays
+    Returns:
+        A dictionary representing a go game with the following fields:
+        * positions: np.array [game_length, board_size, board_size] of int8, stones BLACK: 1 and WHITE: -1
+        * p_targets: np.array [game_length] of int16, index of the played move (incl. pass move)
+        * legal_moves: np.array [game_length, num_moves] of uint8, legal_moves at every position
+        * to_play: np.array [game_length] of int8, current player at each position, BLACK: 1, WHITE: -1
+        * winner: (int), winner of the game, BLACK: 1, WHITE: -1, DRAW: 0
+        * aux_planes: np.array [game_length, num_aux_planes, board_size, board_size] of bool, only if aux_planes
+
+        or
+
+        None for the same errors as parse_sgf
+    """
     go.set_board_size(board_size)
 
     # read the sgf
-    sgf_board, plays, sgf_game = read_sgf(filename)
-
-    size = sgf_board.side
+    if sgf_src is None:
+        sgf_src = read_sgf_bytes(filename)
+    sgf_game = read_game(sgf_src)
 
-    assert size == go.BOARD_SIZE, "Wrong Board Size in SGF"
+    assert sgf_game.board_size == go.BOARD_SIZE, "Wrong Board Size in SGF"
 
-    # prepare sgf_board and plays
-    np_board = np.array(sgf_board.board)
-    initial_board = _prep_board(np_board)
-    plays = _prep_plays(plays)
+    # prepare setup stones and plays
+    initial_board = _prep_setup(sgf_game.setup_black, sgf_game.setup_white)
+    plays = _prep_plays(sgf_game.plays)
 
-    # get first player
+    # check that there is a first player
     try:
-        first_player = _get_first_player(plays)
+        _get_first_player(plays)
     except IndexError:
         tf.logging.error("Skipped reading Go game from sgf '{}' because no moves were found!".format(filename))
         return None
 
+    # save winner
+    winner = _get_winner(sgf_game.winner)
+
+    try:
+        game = replay_plays(initial_board, plays, aux_planes)
+    except go.IllegalMove:
+        tf.logging.error("Skipped reading Go game from sgf '{}' because IllegalMove error occurred!"
+                         .format(filename))
+        return None
+
+    game['winner'] = winner
+
+    return game
+
+
+def replay_plays(initial_board, plays, aux_planes=False):
+    """Replays plays in minigo format from an initial board.
+
+    Args:
+        initial_board: np.array [board_size, board_size] of int8, setup stones in minigo format
+        plays: list of (colour, move) tuples in minigo format, see _prep_plays
+        aux_planes: (bool), also computes the auxiliary feature planes of every position from the groups of the
+            go engine, see record_utils.AUX_PLANES
+    Returns:
+        dict with the positions, p_targets, legal_moves, to_play and optional aux_planes np.arrays of replay_sgf
+    Raises:
+        go.IllegalMove: if a move is illegal
+    """
     # calculate the number of different possible moves
     num_moves = go.BOARD_SIZE * go.BOARD_SIZE + 1
 
-    # save game_length and winner
+    # save game_length
     game_length = len(plays)
-    winner = _get_winner(sgf_game)
 
     # create numpy arrays to hold the parsed data
     to_play = np.zeros([game_length], dtype=np.int8)
     positions = np.zeros([game_length, go.BOARD_SIZE, go.BOARD_SIZE], dtype=np.int8)
     p_targets = np.zeros([game_length], dtype=np.int16)
     legal_moves = np.zeros([game_length, num_moves], dtype=np.uint8)
+    if aux_planes:
+        planes = np.zeros([game_length, len(record_utils.AUX_PLANES), go.BOARD_SIZE, go.BOARD_SIZE], dtype=np.bool_)
 
     # initialize go environment
-    go_game = go.GoEnvironment(None, initial_board, to_play=first_player)
+    go_game = go.GoEnvironment(None, initial_board, to_play=_get_first_player(plays))
 
     for i, play in enumerate(plays):
         # colour: (int) 1 if the current player is BLACK else -1 for WHITE
@@ -119,33 +220,155 @@ def parse_sgf(filename, board_size, dataset_name):
         legal_move = go_game.all_legal_moves()
         legal_moves[i] = legal_move
 
+        # create auxiliary feature planes [num_aux_planes, board_size, board_size]
+        if aux_planes:
+            if i == 0:
+                planes[i] = compute_aux_planes(go_game)
+            else:
+                planes[i] = compute_aux_planes(go_game, positions[i - 1], plays[i - 1][1])
+
         # play move to update board for next iteration
-        try:
-            go_game.play_move(move, colour, True)
-        except go.IllegalMove:
-            tf.logging.error("Skipped reading Go game from sgf '{}' because IllegalMove error occurred!"
-                             .format(filename))
-            return None
+        go_game.play_move(move, colour, True)
+
+    game = {
+        'positions': positions,
+        'p_targets': p_targets,
+        'legal_moves': legal_moves,
+        'to_play': to_play,
+    }
+    if aux_planes:
+        game['aux_planes'] = planes
+
+    return game
+
+
+def compute_aux_planes(go_game, previous_board=None, previous_move=None):
+    """Computes the auxiliary feature planes of the current position of a go environment.
+
+    Args:
+        go_game: go.GoEnvironment, current position
+        previous_board: np.array [board_size, board_size] optional, position before the previous move
+        previous_move: (tuple) or (None), coordinate of the previous move, None if it was a pass or there is none
+    Returns:
+        np.array [num_aux_planes, board_size, board_size] of bool, see record_utils.AUX_PLANES
+    """
+    planes = np.zeros([len(record_utils.AUX_PLANES), go.BOARD_SIZE, go.BOARD_SIZE], dtype=np.bool_)
+    plane = {name: planes[i] for i, name in enumerate(record_utils.AUX_PLANES)}
+
+    # number of liberties of the group of every stone, 0 on empty points
+    liberties = go_game.lib_tracker.liberty_cache
+    plane['liberties_1'][:] = liberties == 1
+    plane['liberties_2'][:] = liberties == 2
+    plane['liberties_3'][:] = liberties >= 3
+
+    for group in go_game.lib_tracker.groups.values():
+        if len(group.liberties) == 1:
+            plane['atari'][next(iter(group.liberties))] = True
+
+    if go_game.ko is not None:
+        plane['ko'][go_game.ko] = True
+
+    if previous_move is not None:
+        plane['last_move'][previous_move] = True
+
+    if previous_board is not None:
+        # stones of the previous position that were removed by the previous move
+        plane['captures'][:] = (previous_board != go.EMPTY) & (go_game.board == go.EMPTY)
+
+    return planes
+
+
+def replay_move_list(setup, p_targets, to_play, board_size):
+    """Replays the move list of a 'moves' record to its positions and legal_moves, see record_utils.RECORD_FORMATS.
+
+    Args:
+        setup: np.array [num_stones, 2] of int16, flat index and colour of the setup stones
+        p_targets: np.array [game_length], flat index of the played moves (incl. pass move)
+        to_play: np.array [game_length] of int8, current player at each position, BLACK: 1, WHITE: -1
+        board_size: (int), board size
+    Returns:
+        (np.array, np.array) positions [game_length, board_size, board_size] of int8 and
+        legal_moves [game_length, num_moves] of uint8, the same as replay_sgf
+    """
+    if go.BOARD_SIZE != board_size:
+        go.set_board_size(board_size)
+
+    initial_board = np.copy(go.EMPTY_BOARD)
+    initial_board.ravel()[setup[:, 0]] = setup[:, 1]
+
+    plays = [(int(colour), coordinates.from_flat(int(p_target))) for colour, p_target in zip(to_play, p_targets)]
+    game = replay_plays(initial_board, plays)
+
+    return game['positions'], game['legal_moves']
+
+
+def game_to_features(game, dataset_name, legal_moves_encoding='raw', positions_encoding='raw',
+                     record_format='positions', aux_planes=False):
+    """Encodes the numpy arrays of replay_sgf to the game dict of parse_sgf for the tf_record writer.
+
+    Args:
+        game: dict of np.arrays, see replay_sgf
+        dataset_name: (str), either 'kgs' or 'gogod'
+        legal_moves_encoding: (str), record encoding of legal_moves, see record_utils.LEGAL_MOVES_ENCODINGS
+        positions_encoding: (str), record encoding of positions, see record_utils.POSITIONS_ENCODINGS
+        record_format: (str), 'positions' stores positions and legal_moves, 'moves' only the setup stones and
+            the moves, see record_utils.RECORD_FORMATS
+        aux_planes: (bool), stores the auxiliary feature planes of the game in both record formats, the game must
+            be replayed with aux_planes
+    """
+    p_targets = game['p_targets']
 
-    # prepare data for the tf_record reader
     data = {
-        'positions': [positions.tostring()],
         'p_targets': p_targets.tolist(),
-        'legal_moves': [legal_moves.tostring()],
-        'to_play': [to_play.tostring()],
-        'game_length': [game_length],
-        'winner': [winner],
-        'dataset_name': [dataset_name]
+        'to_play': [game['to_play'].tostring()],
+        'game_length': [len(p_targets)],
+        'winner': [int(game['winner'])],
+        'dataset_name': [dataset_name],
+        'record_format': [record_utils.RECORD_FORMATS[record_format]]
     }
 
+    if record_format == 'moves':
+        data['setup'] = [record_utils.encode_setup(game['positions'][0])]
+    else:
+        data['positions'] = [record_utils.encode_positions(game['positions'], positions_encoding)]
+        data['positions_encoding'] = [record_utils.POSITIONS_ENCODINGS[positions_encoding]]
+        data['legal_moves'] = [record_utils.encode_legal_moves(game['legal_moves'], legal_moves_encoding,
+                                                               game['positions'])]
+        data['legal_moves_encoding'] = [record_utils.LEGAL_MOVES_ENCODINGS[legal_moves_encoding]]
+
+    if aux_planes:
+        data['aux_planes'] = [record_utils.encode_aux_planes(game['aux_planes'])]
+
     return data
 
 
-def read_sgf(filename):
-    """Parse sgf."""
+def read_sgf_bytes(filename):
+    """Reads the content of a sgf file on disk or inside a GoGoD zip or KGS tar.gz archive."""
+    if archive_utils.is_archive_member(filename):
+        return archive_utils.read_member(filename)
+
     with open(filename, "rb") as f:
-        sgf_src = f.read()
+        return f.read()
+
+
+def read_game(sgf_src):
+    """Reads the board size, setup stones, main line and winner of an sgf.
+
+    Uses the fast byte level scanner scan_sgf and falls back to sgfmill for every sgf it doesn't accept.
+
+    Args:
+        sgf_src: (bytes), content of the sgf file
+    Returns:
+        SgfGame
+    """
+    sgf_game = scan_sgf(sgf_src)
+    if sgf_game is None:
+        sgf_game = read_game_sgfmill(sgf_src)
+    return sgf_game
+
 
+def read_game_sgfmill(sgf_src):
+    """Reads an SgfGame by building the full sgfmill game tree."""
     try:
         sgf_game = sgf.Sgf_game.from_bytes(sgf_src)
     except ValueError:
@@ -156,23 +379,262 @@ def read_sgf(filename):
     except ValueError as e:
         raise Exception(str(e))
 
-    return sgf_board, plays, sgf_game
+    setup_black = frozenset(point for colour, point in sgf_board.list_occupied_points() if colour == 'b')
+    setup_white = frozenset(point for colour, point in sgf_board.list_occupied_points() if colour == 'w')
 
+    return SgfGame(sgf_game.get_size(), setup_black, setup_white, plays, sgf_game.get_winner())
 
-def _prep_board(board):
-    """Create initial board from sgf format for minigo format.
 
-    sgf_mill is a [19, 19] array with stone colors BLACK = 'b' and WHITE = 'w'.
-    minigo is a [19, 19] array with stone colors BLACK = 1 and WHITE = -1.
+def scan_sgf(sgf_src):
+    """Fast byte level scanner for the main line of simple sgf files.
+
+    Only reads the properties needed for training (SZ, CA, RE, AB, AW, B and W) without building a game tree.
+
+    Args:
+        sgf_src: (bytes), content of the sgf file
+    Returns:
+        SgfGame identical to read_game_sgfmill,
+
+        or
+
+        None if the sgf is outside the subset handled by the scanner, e.g. it has variations, lower case or
+        repeated properties, compressed point lists, AE properties, an unusual charset or malformed values.
+        These sgf's must be read with sgfmill.
+    """
+    nodes = scan_sgf_nodes(sgf_src)
+    if nodes is None:
+        return None
+
+    root = nodes[0]
+
+    if b'CA' in root:
+        charset = root[b'CA']
+        if len(charset) != 1 or charset[0].strip().upper() not in _SGF_FAST_CHARSETS:
+            return None
+
+    board_size = 19
+    if b'SZ' in root:
+        try:
+            board_size = int(root[b'SZ'][0])
+        except ValueError:
+            return None
+        if len(root[b'SZ']) != 1 or not 1 <= board_size <= 26:
+            return None
+
+    winner = None
+    if b'RE' in root:
+        result = root[b'RE']
+        if len(result) != 1 or result[0].startswith(b'\\'):
+            return None
+        colour = result[0][:1].lower()
+        if colour in (b'b', b'w'):
+            winner = colour.decode('ascii')
+
+    if b'AE' in root or any(p in node for node in nodes[1:] for p in _SGF_SETUP_PROPERTIES):
+        return None
+
+    setup_black = _scan_points(root.get(b'AB', []), board_size)
+    setup_white = _scan_points(root.get(b'AW', []), board_size)
+    if setup_black is None or setup_white is None or not setup_black.isdisjoint(setup_white):
+        return None
+
+    if setup_black or setup_white:
+        if b'B' in root or b'W' in root or not _is_legal_setup(setup_black, setup_white, board_size):
+            return None
+        nodes = nodes[1:]
+
+    plays = []
+    for node in nodes:
+        if b'B' in node and b'W' in node:
+            return None
+        for identifier, colour in ((b'B', 'b'), (b'W', 'w')):
+            if identifier in node:
+                values = node[identifier]
+                if len(values) != 1:
+                    return None
+                if values[0] == b'' or (values[0] == b'tt' and board_size <= 19):
+                    plays.append((colour, None))
+                else:
+                    point = _scan_point(values[0], board_size)
+                    if point is None:
+                        return None
+                    plays.append((colour, point))
+
+    return SgfGame(board_size, setup_black, setup_white, plays, winner)
+
+
+def scan_sgf_nodes(sgf_src):
+    """Collects the raw property maps of all nodes of a sgf without variations.
+
+    Args:
+        sgf_src: (bytes), content of the sgf file
+    Returns:
+        list of dict<bytes, list of bytes>, property identifiers and raw values of every node starting at the root,
+        or None if the sgf has variations, lower case or repeated properties or can't be tokenised
+    """
+    start = _SGF_START_RE.search(sgf_src)
+    if start is None:
+        return None
+
+    nodes = []
+    properties = None
+    i = start.start() + 1
+    while True:
+        token = _SGF_TOKEN_RE.match(sgf_src, i)
+        if token is None:
+            return None
+        i = token.end()
+
+        delimiter = token.group('D')
+        if delimiter == b';':
+            properties = {}
+            nodes.append(properties)
+        elif delimiter == b')':
+            break
+        elif delimiter == b'(':
+            # variation
+            return None
+        else:
+            identifier = token.group('I')
+            if identifier in properties:
+                return None
+            properties[identifier] = _SGF_VALUE_RE.findall(token.group('V'))
+
+    return nodes
+
+
+def read_game_info(sgf_src):
+    """Reads the game info properties of the root node and the number of moves in the main line.
+
+    Uses scan_sgf_nodes and falls back to sgfmill for sgf's it doesn't accept.
+
+    Args:
+        sgf_src: (bytes), content of the sgf file
+    Returns:
+        dict<str, str> of the GAME_INFO_PROPERTIES names and their text values ('' if missing)
+            and 'move_count': (int), number of B and W moves in the main line
+    """
+    nodes = scan_sgf_nodes(sgf_src)
+
+    if nodes is not None:
+        root = {identifier.decode('ascii'): values[0] for identifier, values in nodes[0].items()}
+        move_count = sum(1 for node in nodes if b'B' in node or b'W' in node)
+    else:
+        try:
+            sgf_game = sgf.Sgf_game.from_bytes(sgf_src)
+        except ValueError:
+            raise Exception("bad sgf file")
+        root_node = sgf_game.get_root()
+        root = {identifier: root_node.get_raw(identifier) for identifier in root_node.properties()}
+        move_count = sum(1 for node in sgf_game.get_main_sequence() if node.get_raw_move()[0] is not None)
+
+    info = {name: sgf_grammar.simpletext_value(root.get(identifier, b'')).decode('utf-8', 'replace').strip()
+            for name, identifier in GAME_INFO_PROPERTIES.items()}
+    info['move_count'] = move_count
+
+    return info
+
+
+def game_hash(sgf_game):
+    """Symmetry normalised hash of the setup stones and main line moves of an SgfGame.
+
+    The hash is the smallest sha1 of the game under all 8 board symmetries, so rotated or mirrored copies of a
+    game have the same hash.
+
+    Returns:
+        (str), hex digest or '' for games without moves
+    """
+    if not sgf_game.plays:
+        return ''
+
+    board_size = sgf_game.board_size
+    _, inverse_permutations = coordinates.symmetry_permutations(board_size)
+
+    def _flat(points):
+        return np.array([board_size * board_size if point is None else point[0] * board_size + point[1]
+                         for point in points], dtype=np.int64)
+
+    setup_black = _flat(sgf_game.setup_black)
+    setup_white = _flat(sgf_game.setup_white)
+    moves = _flat([move for _, move in sgf_game.plays])
+    colours = ''.join(colour for colour, _ in sgf_game.plays).encode('ascii')
+    header = "{}:{}:{}:{}:".format(board_size, len(setup_black), len(setup_white), len(moves)).encode('ascii')
+
+    hashes = []
+    for k in range(coordinates.NUM_SYMMETRIES):
+        sha1 = hashlib.sha1(header)
+        sha1.update(np.sort(inverse_permutations[k][setup_black]).tostring())
+        sha1.update(np.sort(inverse_permutations[k][setup_white]).tostring())
+        sha1.update(colours)
+        sha1.update(inverse_permutations[k][moves].tostring())
+        hashes.append(sha1.hexdigest())
+
+    return min(hashes)
+
+
+def _scan_point(value, board_size):
+    """Converts a raw two letter sgf point to sgfmill coordinates, None if it is malformed."""
+    if len(value) != 2:
+        return None
+    col = value[0] - 97  # 97 == ord("a")
+    row = board_size - value[1] + 96
+    if not ((0 <= col < board_size) and (0 <= row < board_size)):
+        return None
+    return row, col
+
+
+def _scan_points(values, board_size):
+    """Converts raw setup points to a frozenset of sgfmill coordinates, None if one is malformed or compressed."""
+    points = set()
+    for value in values:
+        point = _scan_point(value, board_size)
+        if point is None:
+            return None
+        points.add(point)
+    return frozenset(points)
+
+
+def _is_legal_setup(setup_black, setup_white, board_size):
+    """Checks that every group of setup stones has at least one liberty."""
+    stones = {point: 'b' for point in setup_black}
+    stones.update((point, 'w') for point in setup_white)
+
+    visited = set()
+    for point in stones:
+        if point in visited:
+            continue
+        colour = stones[point]
+        frontier = [point]
+        visited.add(point)
+        has_liberty = False
+        while frontier:
+            row, col = frontier.pop()
+            for neighbor in ((row + 1, col), (row - 1, col), (row, col + 1), (row, col - 1)):
+                if not (0 <= neighbor[0] < board_size and 0 <= neighbor[1] < board_size):
+                    continue
+                neighbor_colour = stones.get(neighbor)
+                if neighbor_colour is None:
+                    has_liberty = True
+                elif neighbor_colour == colour and neighbor not in visited:
+                    visited.add(neighbor)
+                    frontier.append(neighbor)
+        if not has_liberty:
+            return False
+    return True
+
+
+def _prep_setup(setup_black, setup_white):
+    """Create initial board from sgfmill setup stones for minigo format.
+
+    sgfmill has coordinate (0, 0) in the bottom left corner and minigo in the top left corner,
+    the black stones are go.BLACK = 1 and the white stones go.WHITE = -1.
     """
     new_board = np.copy(go.EMPTY_BOARD)
 
-    mask_black = board == 'b'
-    mask_white = board == 'w'
+    for stones, colour in ((setup_black, go.BLACK), (setup_white, go.WHITE)):
+        for stone in stones:
+            new_board[coordinates.from_sgfmill(stone)] = colour
 
-    new_board[mask_black] = go.BLACK
-    new_board[mask_white] = go.WHITE
-    new_board = np.flip(new_board, 0)
     return new_board
 
 
@@ -208,17 +670,15 @@ def _flip_row_coordinates(move):
     return row, col
 
 
-def _get_winner(sgf_game):
-    """Reads the games winner from an sgf.
+def _get_winner(sgf_winner):
+    """Converts the games winner from an sgf.
     Args:
-        sgf_game: from bytes parsed sgf
+        sgf_winner: 'b', 'w' or None, see sgfmill.sgf.Sgf_game.get_winner
     Returns:
         1 if BLACK won
        -1 if WHITE won
         0 if it was a DRAW
     """
-    sgf_winner = sgf_game.get_winner()
-
     if sgf_winner == 'b':
         winner = 1
     elif sgf_winner == 'w':
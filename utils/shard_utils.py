@@ -0,0 +1,368 @@
+"""Writers of sharded TFRecord files with optional GZIP or ZLIB compression and their sidecar indices.
+
+Equivalents of generator_utils.generate_files and generator_utils.shuffle_dataset of tensor2tensor,
+which only write uncompressed records.
+
+generate_shard writes one shard at a time and is deterministic, so the shards of an interrupted generation
+can be generated one by one again, see manifest_utils. external_shuffle shuffles the records across all shards of a
+split with bounded memory.
+
+Every shuffled shard gets a sidecar index shard + '.index' with the byte offset, record length, game_length,
+dataset_name and winner of every record, so stats and random access don't need to parse the records.
+"""
+
+import tensorflow as tf
+import numpy as np
+
+from tensor2tensor.data_generators import generator_utils
+
+import random
+import math
+import os
+
+# compression type of tf.data.TFRecordDataset -> tf.python_io.TFRecordCompressionType
+COMPRESSION_TYPES = {
+    '': tf.python_io.TFRecordCompressionType.NONE,
+    'GZIP': tf.python_io.TFRecordCompressionType.GZIP,
+    'ZLIB': tf.python_io.TFRecordCompressionType.ZLIB,
+}
+
+INDEX_SUFFIX = '.index'
+
+# suffix of the files that are being written
+INCOMPLETE_SUFFIX = '.incomplete'
+
+# default memory budget of external_shuffle in bytes
+DEFAULT_SHUFFLE_MEMORY = 2 * 1024 ** 3
+
+# file in the temporary directory of external_shuffle written once all outputs are written
+_SHUFFLE_COMPLETE = 'COMPLETE'
+
+# column name -> numpy dtype of the sidecar index columns
+INDEX_COLUMNS = {
+    'offset': np.int64,
+    'length': np.int64,
+    'game_length': np.int32,
+    'dataset_name': np.str_,
+    'winner': np.int8,
+}
+
+# bytes of the TFRecord framing around the data of a record:
+# uint64 length, uint32 masked crc of the length, data, uint32 masked crc of the data
+_RECORD_HEADER_SIZE = 12
+_RECORD_FOOTER_SIZE = 4
+
+
+def record_options(compression=''):
+    """TFRecordOptions of the compression type, '', 'GZIP' or 'ZLIB'."""
+    return tf.python_io.TFRecordOptions(COMPRESSION_TYPES[compression])
+
+
+def generate_files(generator, output_filenames, compression='', cycle_every_n=1):
+    """Generates cases from a generator and saves them as TFRecord files, see generator_utils.generate_files.
+
+    The cases are written round robin to the output files, switching the file every cycle_every_n cases.
+
+    Args:
+        generator: a generator yielding (string -> int/float/str list) dictionaries
+        output_filenames: list of (str), output filenames
+        compression: (str), compression type, '', 'GZIP' or 'ZLIB'
+        cycle_every_n: (int), number of cases written to a file before switching to the next one
+    """
+    if generator_utils.outputs_exist(output_filenames):
+        tf.logging.info("Skipping generator because outputs files exist")
+        return
+
+    tmp_filenames = [filename + INCOMPLETE_SUFFIX for filename in output_filenames]
+    options = record_options(compression)
+    writers = [tf.python_io.TFRecordWriter(filename, options=options) for filename in tmp_filenames]
+
+    counter, shard = 0, 0
+    for case in generator:
+        if case is None:
+            continue
+        if counter % 100000 == 0:
+            tf.logging.info("Generating case %d." % counter)
+        counter += 1
+
+        example = generator_utils.to_example(case)
+        writers[shard].write(example.SerializeToString())
+        if counter % cycle_every_n == 0:
+            shard = (shard + 1) % len(output_filenames)
+
+    for writer in writers:
+        writer.close()
+
+    for tmp_filename, filename in zip(tmp_filenames, output_filenames):
+        tf.gfile.Rename(tmp_filename, filename)
+
+    tf.logging.info("Generated %s Examples", counter)
+
+
+def read_records(filename, compression=''):
+    """Reads all serialized records of a TFRecord file."""
+    return list(tf.python_io.tf_record_iterator(filename, options=record_options(compression)))
+
+
+def shuffle_dataset(filenames, compression='', memory_budget=DEFAULT_SHUFFLE_MEMORY):
+    """Shuffles the records of the unshuffled files across all files and removes them, see external_shuffle and
+    generator_utils.shuffle_dataset.
+
+    Args:
+        filenames: list of (str), unshuffled filenames ending with generator_utils.UNSHUFFLED_SUFFIX
+        compression: (str), compression type, '', 'GZIP' or 'ZLIB'
+        memory_budget: (int), bytes of records held in memory at once
+    """
+    if generator_utils.outputs_exist(filenames):
+        tf.logging.info("Skipping shuffle because output files exist")
+        return
+
+    out_filenames = [filename.replace(generator_utils.UNSHUFFLED_SUFFIX, "") for filename in filenames]
+    external_shuffle(filenames, out_filenames, compression, memory_budget)
+
+
+def _records_size(filename, compression):
+    """Bytes of the records of a file, from its sidecar index if it has one, else its size on disk, which
+    underestimates compressed files."""
+    if tf.gfile.Exists(index_path(filename)):
+        return int(load_shard_index(filename, compression)['length'].sum())
+    return tf.gfile.Stat(filename).length
+
+
+def external_shuffle(input_filenames, output_filenames, compression='', memory_budget=DEFAULT_SHUFFLE_MEMORY,
+                     seed=None, resume=False):
+    """Shuffles the records of all input files across the output files in two passes with bounded memory.
+
+    The first pass scatters the records at random to temporary bucket files, as many as needed for a bucket to fit
+    in memory_budget and a multiple of the number of output files. The second pass shuffles every bucket in memory
+    and appends it to output file bucket % num_outputs, so every record ends up at a random position of a random
+    output file. The outputs and their sidecar indices are written to a temporary directory next to the first
+    output file and renamed when all are written, so the input files can be the output files.
+
+    Args:
+        input_filenames: list of (str), files to shuffle
+        output_filenames: list of (str), shuffled files
+        compression: (str), compression type of the input and output files, '', 'GZIP' or 'ZLIB'
+        memory_budget: (int), bytes of records held in memory at once
+        seed: (str) optional, seed of the shuffle, the same seed, inputs and memory_budget give the same outputs
+        resume: (bool), if an interrupted shuffle already wrote all outputs only renames them, the inputs must not
+            have changed since
+    Returns:
+        (int), number of shuffled records
+    """
+    out_dir, out_basename = os.path.split(output_filenames[0])
+    tmp_dir = os.path.join(out_dir, '.shuffle-' + out_basename)
+    tmp_filenames = [os.path.join(tmp_dir, os.path.basename(filename)) for filename in output_filenames]
+
+    if resume and tf.gfile.Exists(os.path.join(tmp_dir, _SHUFFLE_COMPLETE)):
+        tf.logging.info("Resuming the interrupted shuffle of {}".format(tmp_dir))
+        # the index of an output is renamed before the output, so it is either still in tmp_dir or already final
+        num_records = 0
+        for tmp_filename, filename in zip(tmp_filenames, output_filenames):
+            path = tmp_filename if tf.gfile.Exists(index_path(tmp_filename)) else filename
+            with np.load(index_path(path)) as index:
+                num_records += len(index['offset'])
+    else:
+        if tf.gfile.Exists(tmp_dir):
+            tf.gfile.DeleteRecursively(tmp_dir)
+        tf.gfile.MakeDirs(tmp_dir)
+
+        num_outputs = len(output_filenames)
+        total_size = sum(_records_size(filename, compression) for filename in input_filenames)
+        num_buckets = num_outputs * max(1, int(math.ceil(total_size / (memory_budget * num_outputs))))
+        bucket_filenames = [os.path.join(tmp_dir, "bucket-{:05d}".format(bucket)) for bucket in range(num_buckets)]
+        rng = random.Random(seed)
+
+        tf.logging.info("Shuffling {} MB of {} files into {} files with {} buckets"
+                        .format(total_size // 1024 ** 2, len(input_filenames), num_outputs, num_buckets))
+
+        # first pass: scatter the records to uncompressed buckets
+        writers = [tf.python_io.TFRecordWriter(filename) for filename in bucket_filenames]
+        for filename in input_filenames:
+            for record in tf.python_io.tf_record_iterator(filename, options=record_options(compression)):
+                writers[rng.randrange(num_buckets)].write(record)
+        for writer in writers:
+            writer.close()
+
+        # second pass: shuffle every bucket in memory and append it to its output file
+        def _bucket_records(output):
+            for bucket in range(output, num_buckets, num_outputs):
+                records = read_records(bucket_filenames[bucket])
+                rng.shuffle(records)
+                tf.gfile.Remove(bucket_filenames[bucket])
+                for record in records:
+                    yield record
+
+        num_records = 0
+        for output, tmp_filename in enumerate(tmp_filenames):
+            num_records += write_shard(_bucket_records(output), tmp_filename, compression)
+
+        with open(os.path.join(tmp_dir, _SHUFFLE_COMPLETE), 'w') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    # the outputs that were renamed before an interruption are skipped
+    for tmp_filename, filename in zip(tmp_filenames, output_filenames):
+        if tf.gfile.Exists(index_path(tmp_filename)):
+            tf.gfile.Rename(index_path(tmp_filename), index_path(filename), overwrite=True)
+        if tf.gfile.Exists(tmp_filename):
+            tf.gfile.Rename(tmp_filename, filename, overwrite=True)
+
+    for filename in set(input_filenames) - set(output_filenames):
+        if tf.gfile.Exists(filename):
+            tf.gfile.Remove(filename)
+    tf.gfile.DeleteRecursively(tmp_dir)
+
+    tf.logging.info("Shuffled {} records".format(num_records))
+    return num_records
+
+
+def fsync_file(path):
+    """Flushes a written file to disk, so it is complete after a crash once it is renamed."""
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def write_shard(records, filename, compression=''):
+    """Writes serialized records to a shard and its sidecar index and flushes both to disk.
+
+    Args:
+        records: iterable of (bytes), serialized tf.train.Example, only iterated once
+        filename: (str), filename of the shard
+        compression: (str), compression type, '', 'GZIP' or 'ZLIB'
+    Returns:
+        (int), number of records of the shard
+    """
+    with tf.python_io.TFRecordWriter(filename, options=record_options(compression)) as writer:
+        def _written():
+            for record in records:
+                writer.write(record)
+                yield record
+
+        index = build_shard_index(_written())
+    fsync_file(filename)
+
+    save_shard_index(index, filename)
+    fsync_file(index_path(filename))
+
+    return len(index['offset'])
+
+
+def generate_shard(generator, filename, compression='', shuffle=True):
+    """Generates one shard and its sidecar index, the shard only exists once it is complete.
+
+    If shuffle the records are shuffled in memory with the shard filename as seed, else they are streamed to the
+    shard in the order of the generator, e.g. to shuffle them with external_shuffle later. Generating a shard
+    again from the same cases gives the same shard in both cases. The shard and its index are written to
+    temporary files, flushed to disk and renamed, the index first.
+
+    Args:
+        generator: a generator yielding (string -> int/float/str list) dictionaries
+        filename: (str), filename of the shard
+        compression: (str), compression type, '', 'GZIP' or 'ZLIB'
+        shuffle: (bool), shuffle the records of the shard in memory
+    Returns:
+        (int), number of records of the shard
+    """
+    records = (generator_utils.to_example(case).SerializeToString() for case in generator if case is not None)
+    if shuffle:
+        records = list(records)
+        random.Random(os.path.basename(filename)).shuffle(records)
+
+    tmp_filename = filename + INCOMPLETE_SUFFIX
+    num_records = write_shard(records, tmp_filename, compression)
+
+    tf.gfile.Rename(index_path(tmp_filename), index_path(filename), overwrite=True)
+    tf.gfile.Rename(tmp_filename, filename, overwrite=True)
+
+    tf.logging.info("Generated {} with {} examples".format(filename, num_records))
+    return num_records
+
+
+def index_path(shard_path):
+    return shard_path + INDEX_SUFFIX
+
+
+def is_data_file(path):
+    """False for the sidecar files next to the shards and for shards that are being written."""
+    return not path.endswith(INDEX_SUFFIX) and not path.endswith(INCOMPLETE_SUFFIX)
+
+
+def data_files(filepattern):
+    """Sorted data files matching filepattern without the sidecar files, see get_data_files of slim.
+
+    Raises:
+        ValueError: if no data files are found
+    """
+    files = [path for path in tf.contrib.slim.parallel_reader.get_data_files(filepattern) if is_data_file(path)]
+    if not files:
+        raise ValueError("No data files found in {}".format(filepattern))
+    return sorted(files)
+
+
+def build_shard_index(records):
+    """Builds the index of the serialized records of a shard.
+
+    The offsets are byte offsets in the uncompressed record stream, so they are file offsets of
+    uncompressed shards only.
+
+    Args:
+        records: list of (bytes), serialized tf.train.Example of the shard in order
+    Returns:
+        dict<str, np.array> of the INDEX_COLUMNS
+    """
+    index = {column: [] for column in INDEX_COLUMNS}
+
+    offset = 0
+    for record in records:
+        example = tf.train.Example()
+        example.ParseFromString(record)
+        feature = example.features.feature
+
+        index['offset'].append(offset)
+        index['length'].append(len(record))
+        index['game_length'].append(feature['game_length'].int64_list.value[0])
+        index['dataset_name'].append(feature['dataset_name'].bytes_list.value[0].decode('utf-8'))
+        index['winner'].append(feature['winner'].int64_list.value[0])
+
+        offset += _RECORD_HEADER_SIZE + len(record) + _RECORD_FOOTER_SIZE
+
+    return {column: np.array(values, dtype=INDEX_COLUMNS[column]) for column, values in index.items()}
+
+
+def save_shard_index(index, shard_path):
+    with open(index_path(shard_path), 'wb') as f:
+        np.savez(f, **index)
+
+
+def load_shard_index(shard_path, compression=''):
+    """Loads the sidecar index of a shard, builds it from the records if the shard has no index.
+
+    Returns:
+        dict<str, np.array> of the INDEX_COLUMNS
+    """
+    path = index_path(shard_path)
+    if tf.gfile.Exists(path):
+        with np.load(path) as index:
+            return {column: index[column] for column in INDEX_COLUMNS}
+
+    return build_shard_index(read_records(shard_path, compression))
+
+
+def read_record(shard_path, offset, length, f=None):
+    """Reads one serialized record of an uncompressed shard at a byte offset of its index.
+
+    Args:
+        shard_path: (str), path of the shard
+        offset: (int), offset of the record, see build_shard_index
+        length: (int), length of the record
+        f: opened file of the shard optional, avoids opening the shard for every record
+    Returns:
+        (bytes), serialized tf.train.Example
+    """
+    if f is None:
+        with open(shard_path, 'rb') as f:
+            return read_record(shard_path, offset, length, f)
+
+    f.seek(offset + _RECORD_HEADER_SIZE)
+    return f.read(length)